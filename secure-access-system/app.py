@@ -1,30 +1,75 @@
 # app.py
 # Main application entry point
-from flask import Flask, render_template
+import hmac
+from flask import Flask, render_template, request, jsonify
 from flask import Flask
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-from models import db, User
+from models import db, init_db
 from routes.auth import auth_bp
 from routes.users import users_bp
 from routes.protected import protected_bp
 from routes.web import web_bp 
-from routes.dashboard import dashboard_bp
+from routes.keys import keys_bp
+from routes.policies import policies_bp
+from routes.presence import presence_bp
+from services.stats import register_counter_hooks
+from services.rollups import register_rollup_hooks
+from services.data_version import register_version_hooks, init_fragment_cache, fragment_cache
+from services.change_feed import register_feed_hooks, stream_slots
+from services.hashing import init_hash_pool, get_hash_pool, HashingBusy
+from services.identity_cache import identity_cache, init_identity_cache
+from services.bootstrap import bootstrap as bootstrap_database
+from services.audit import init_audit
+from services.login_guard import init_login_guard
+from services.revocation import init_revocation
+from services.virtual_keys import init_virtual_keys
+from services.access_policy import init_access_policy
+from services.presence import init_presence
+from services.detector import detector, init_detector
+from services.sessions import session_store, init_sessions
+from services.metrics import metrics, init_metrics
+from services.audit import audit_log
 
 
 from flask_login import LoginManager
 
-def create_app():
+def create_app(config_class=Config, bootstrap=None):
     app = Flask(__name__, template_folder='templates')
-    app.config.from_object(Config)
-    app.register_blueprint(dashboard_bp)
+    app.config.from_object(config_class)
+
+    # Behind the reverse proxy every request comes from its address; use the
+    # client's from X-Forwarded-For / X-Forwarded-Proto instead (only when
+    # TRUSTED_PROXY_HOPS is set, see config.py)
+    proxy_hops = app.config.get("TRUSTED_PROXY_HOPS", 0)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
 
     
 
 
     # Initialize extensions
-    db.init_app(app)
-    JWTManager(app)
+    init_db(app)
+    jwt = JWTManager(app)
+    register_counter_hooks()
+    register_rollup_hooks()
+    register_feed_hooks()
+    register_version_hooks()
+    init_fragment_cache(app.config)
+    init_hash_pool(app.config)
+    init_identity_cache(app.config)
+    init_login_guard(app.config)
+    init_virtual_keys(app)
+
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(e):
+        # Back-pressure from the bcrypt pool: ask the client to retry shortly
+        if request.path.startswith("/api/"):
+            response = jsonify({"error": "Server busy, please try again"})
+        else:
+            response = render_template("error.html", error="Server busy, please try again")
+        return response, 503, {"Retry-After": "1"}
 
     # --- Flask-Login setup ---
     login_manager = LoginManager()
@@ -33,8 +78,8 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        
-        return User.query.get(int(user_id))
+        # Cached snapshot; no query unless the entry is missing or expired
+        return identity_cache.get(user_id)
     # ------------------------
 
     # Register blueprints
@@ -42,51 +87,66 @@ def create_app():
     app.register_blueprint(users_bp)
     app.register_blueprint(protected_bp)
     app.register_blueprint(web_bp)
+    app.register_blueprint(keys_bp)
+    app.register_blueprint(policies_bp)
+    app.register_blueprint(presence_bp)
 
-    # Create tables + seed demo management user
     with app.app_context():
-       # if app.config.get('RESET_DB'):
-        #    print("🔄 Resetting database...")
-         #   db.drop_all()
-        
-        db.create_all()
-
-        # Demo user
-        demo_user = User.query.filter_by(email=Config.DEMO_USER_EMAIL).first()
-        if not demo_user:
-            demo_user = User(
-                first_name="Building",
-                last_name="Management",
-                username="building.management",
-                email=Config.DEMO_USER_EMAIL,
-                role="management"
-            )
-            demo_user.set_password(Config.DEMO_USER_PASSWORD)
-            db.session.add(demo_user)
-            print("✅ Demo management account created")
-
-        # Backup admin
-        backup_admin = User.query.filter_by(email="admin@backup.local").first()
-        if not backup_admin:
-            backup_admin = User(
-                first_name="Backup",
-                last_name="Admin",
-                username="backup.admin",
-                email="admin@backup.local",
-                role="management"
-            )
-            backup_admin.set_password("BackupPass123")
-            db.session.add(backup_admin)
-            print("✅ Backup admin account created")
-
-        db.session.commit()
+        init_audit(app, db.engine)
+        init_sessions(app, db.engine)
+        if app.config.get("METRICS_ENABLED", True):
+            init_metrics(app, db.engine)
+
+    # Schema + seed data normally come from scripts/bootstrap.py; doing it
+    # here is a development convenience (BOOTSTRAP_ON_STARTUP)
+    if bootstrap is None:
+        bootstrap = app.config.get("BOOTSTRAP_ON_STARTUP", True)
+    if bootstrap:
+        bootstrap_database(app)
+
+    # Revoked API tokens, door access rules and presence (loaded on first use),
+    # and the suspicious-access detector watching the audit stream
+    init_revocation(app, jwt)
+    init_access_policy(app)
+    init_presence(app)
+    init_detector(app)
 
     @app.route("/")
     def home():
         return "Secure Access System – Phase 1 Step 1 Running"
 
+    @app.route("/metrics")
+    def metrics_endpoint():
+        # Prometheus scrape target: bearer token if one is configured, else
+        # local clients only. Behind a proxy remote_addr comes from a header
+        # and the socket peer is the proxy itself, so neither proves a local
+        # scraper: there the token is required
+        if not app.config.get("METRICS_ENABLED", True):
+            return "Not Found", 404
+        token = app.config.get("METRICS_TOKEN")
+        if token:
+            supplied = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+                return "Unauthorized", 401
+        elif not app.config.get("METRICS_ALLOW_REMOTE"):
+            if proxy_hops or request.remote_addr not in ("127.0.0.1", "::1"):
+                return "Forbidden", 403
+        body = metrics.render([
+            ("bcrypt_pool_pending", "gauge", "bcrypt jobs running or queued", get_hash_pool().pending),
+            ("audit_events_written_total", "counter", "Audit events written by this process", audit_log.written),
+            ("audit_events_dropped_total", "counter", "Audit events dropped on overflow", audit_log.dropped),
+            ("fragment_cache_hits_total", "counter", "Rendered fragments served from cache", fragment_cache.hits),
+            ("fragment_cache_misses_total", "counter", "Rendered fragments rendered afresh", fragment_cache.misses),
+            ("session_cache_hits_total", "counter", "Web sessions served from memory", session_store.hits),
+            ("session_cache_misses_total", "counter", "Web sessions read from storage", session_store.misses),
+            ("security_alerts_total", "counter", "Security alerts raised by this process", detector.alerts_raised),
+            ("dashboard_streams_open", "gauge", "Live dashboard streams held open by this process", stream_slots.active),
+        ])
+        return body, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
     return app
 
 if __name__ == "__main__":
+    # Development only (single process, debugger on); production: python serve.py
     app = create_app()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Bulk unlock vs one request per user
+Run: python benchmarks/bench_bulk_admin.py [--users 2000] [--residents 20000] [--json out.json]
+
+Seeds a temporary database with `residents` residents of which `users`
+are locked, then unlocks them twice (re-locking in between):
+
+  per_user   what clicking Unlock on every row costs: for each user a
+             POST /api/users/unlock through the test client (ORM load,
+             change, commit, cache invalidation, audit)
+  bulk       one POST /api/users/bulk/unlock with the same ids (one
+             set-based UPDATE in one transaction)
+
+Reports the wall time and users/sec of each and the speed-up.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from models import db, User
+from bench_endpoints import make_app, seed
+
+
+def lock(app, user_ids):
+    with app.app_context():
+        db.session.execute(
+            User.__table__.update().where(User.id.in_(user_ids)).values(is_locked=True, failed_login_attempts=3)
+        )
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="locked users to unlock")
+    parser.add_argument("--residents", type=int, default=20000, help="resident accounts to seed")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_bulk_admin_")
+    try:
+        app = make_app(workdir, 4)
+        demo_id = seed(app, 2, 5, max(args.residents, args.users))
+        with app.app_context():
+            token = create_access_token(identity=str(demo_id), additional_claims={"role": "management"})
+            targets = (
+                db.session.query(User.id, User.email)
+                .filter(User.role == "resident")
+                .order_by(User.id)
+                .limit(args.users)
+                .all()
+            )
+        user_ids = [user_id for user_id, _ in targets]
+        headers = {"Authorization": f"Bearer {token}"}
+        client = app.test_client()
+
+        lock(app, user_ids)
+        started = time.perf_counter()
+        for _, email in targets:
+            client.post("/api/users/unlock", json={"email": email}, headers=headers)
+        per_user = time.perf_counter() - started
+
+        lock(app, user_ids)
+        started = time.perf_counter()
+        response = client.post("/api/users/bulk/unlock", json={"ids": user_ids}, headers=headers)
+        bulk = time.perf_counter() - started
+        updated = response.get_json()["updated"]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "per_user_seconds": round(per_user, 3),
+        "per_user_users_per_sec": round(len(user_ids) / per_user, 1),
+        "bulk_seconds": round(bulk, 3),
+        "bulk_users_per_sec": round(len(user_ids) / bulk, 1),
+        "bulk_updated": updated,
+        "speedup": round(per_user / bulk, 1),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"BULK UNLOCK ({len(user_ids)} locked of {args.residents} residents)")
+    print("=" * 60)
+    print(f"{'mode':<10} {'seconds':>9} {'users/s':>10}")
+    print(f"{'per_user':<10} {results['per_user_seconds']:>9} {results['per_user_users_per_sec']:>10}")
+    print(f"{'bulk':<10} {results['bulk_seconds']:>9} {results['bulk_users_per_sec']:>10}")
+    print(f"\n✅ {updated} users unlocked in one request, {results['speedup']}x faster")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "bulk_admin", "settings": {k: v for k, v in vars(args).items() if k != "json_path"}, "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Endpoint load test: latency percentiles and throughput per endpoint
+Run: python benchmarks/bench_endpoints.py [--residents 2000] [--concurrency 8] [--requests 400] [--json out.json]
+
+Seeds a temporary SQLite database with the requested number of
+management / concierge / resident users, then drives each scenario with
+`concurrency` threads until `requests` requests have been made:
+
+  api_login        POST /api/login            (demo management account)
+  api_users_list   GET  /api/users/list       (management JWT, first page)
+  api_users_search GET  /api/users/search     (management JWT, mix of narrow and broad prefixes)
+  api_users_create POST /api/users/create     (management JWT, new resident each time)
+  api_stats        GET  /api/dashboard/stats  (web session)
+  web_dashboard    GET  /dashboard            (web session)
+
+Requests go through the Flask test client by default (one client per
+thread), or over HTTP to a local threaded server with --server. Reports
+p50 / p95 / p99 latency, mean latency, requests/sec and non-2xx counts.
+
+--json writes the results (with the git commit and settings) so runs can
+be compared; --baseline compares against an earlier JSON file and exits
+with status 1 if any scenario's p95 got worse by more than --tolerance.
+
+--session-backend picks the web session store ("server": opaque id
+cookie, the default; "cookie": Flask's signed cookie) to compare the two.
+
+Login throttling is switched off (every request comes from one client)
+and bcrypt uses --rounds (default 4) unless you pass --rounds 12 to
+measure production-cost logins.
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+from models import db, User
+from services.hashing import get_hash_pool
+from services.stats import rebuild_counters
+from services.sessions import BACKENDS
+
+SCENARIOS = ["api_login", "api_users_list", "api_users_search", "api_users_create", "api_stats", "web_dashboard"]
+
+# Broad ("bench", "res") and narrow searches; {n} varies the narrow ones
+SEARCH_TERMS = ["bench", "res", "resident{n}", "bench resident1{n}", "concierge{n}@building"]
+
+
+def parse_list(value):
+    return [v for v in value.split(",") if v]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+# ---------------- SETUP ----------------
+
+def make_app(workdir, rounds, session_backend="server"):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        VIRTUAL_KEY_DIR = os.path.join(workdir, "keys")
+        BCRYPT_ROUNDS = rounds
+        LOGIN_THROTTLE_ENABLED = False
+        SESSION_BACKEND = session_backend
+
+    return create_app(BenchConfig)
+
+
+def seed(app, management, concierge, residents):
+    """Insert users in bulk; every seeded user shares one password hash"""
+    with app.app_context():
+        password_hash = get_hash_pool().hash_password("BenchPass123")
+        counts = (("management", management), ("concierge", concierge), ("resident", residents))
+        rows = []
+        for role, count in counts:
+            for i in range(count):
+                rows.append({
+                    "first_name": "Bench",
+                    "last_name": f"{role.title()}{i}",
+                    "username": f"bench.{role}{i}",
+                    "email": f"bench.{role}{i}@building.local",
+                    "role": role,
+                    "password_hash": password_hash,
+                    "is_active": True,
+                    "is_locked": False,
+                    "failed_login_attempts": 0,
+                })
+        for start in range(0, len(rows), 1000):
+            db.session.execute(User.__table__.insert(), rows[start:start + 1000])
+        db.session.commit()
+
+        rebuild_counters()
+
+        demo = User.query.filter_by(email=app.config["DEMO_USER_EMAIL"]).first()
+        return demo.id
+
+
+# ---------------- CLIENTS ----------------
+
+class TestClientSession:
+    """One Flask test client, logged in to the web UI and the API"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        app_config = app.config
+        self.client.post("/login", data={
+            "email": app_config["DEMO_USER_EMAIL"],
+            "password": app_config["DEMO_USER_PASSWORD"],
+        })
+        token = self.client.post("/api/login", json={
+            "email": app_config["DEMO_USER_EMAIL"],
+            "password": app_config["DEMO_USER_PASSWORD"],
+        }).get_json()["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def request(self, method, path, json_body=None, auth=False):
+        response = self.client.open(path, method=method, json=json_body,
+                                    headers=self.headers if auth else None)
+        response.close()
+        return response.status_code
+
+
+class HttpSession:
+    """Same as TestClientSession, over real HTTP with a cookie jar"""
+
+    def __init__(self, base_url, app):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+            _NoRedirect()
+        )
+        app_config = app.config
+        form = urllib.parse.urlencode({
+            "email": app_config["DEMO_USER_EMAIL"],
+            "password": app_config["DEMO_USER_PASSWORD"],
+        }).encode()
+        self._send("POST", "/login", body=form, content_type="application/x-www-form-urlencoded")
+        token = json.loads(self._send("POST", "/api/login", body=json.dumps({
+            "email": app_config["DEMO_USER_EMAIL"],
+            "password": app_config["DEMO_USER_PASSWORD"],
+        }).encode(), content_type="application/json")[1])["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _send(self, method, path, body=None, content_type=None, headers=None):
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        if content_type:
+            req.add_header("Content-Type", content_type)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def request(self, method, path, json_body=None, auth=False):
+        body = json.dumps(json_body).encode() if json_body is not None else None
+        return self._send(method, path, body=body,
+                          content_type="application/json" if body else None,
+                          headers=self.headers if auth else None)[0]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request log lines
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ---------------- SCENARIOS ----------------
+
+def scenario_request(name, session, app, n):
+    if name == "api_login":
+        return session.request("POST", "/api/login", {
+            "email": app.config["DEMO_USER_EMAIL"],
+            "password": app.config["DEMO_USER_PASSWORD"],
+        })
+    if name == "api_users_list":
+        return session.request("GET", "/api/users/list?limit=50", auth=True)
+    if name == "api_users_search":
+        term = SEARCH_TERMS[n % len(SEARCH_TERMS)].format(n=abs(n) % 1000)
+        return session.request("GET", "/api/users/search?" + urllib.parse.urlencode({"q": term, "limit": 20}), auth=True)
+    if name == "api_users_create":
+        return session.request("POST", "/api/users/create", {
+            "first_name": "Load",
+            "last_name": f"Test{n}",
+            "email": f"load.test{n}.{os.getpid()}.{time.time_ns()}@building.local",
+            "role": "resident",
+        }, auth=True)
+    if name == "api_stats":
+        return session.request("GET", "/api/dashboard/stats")
+    if name == "web_dashboard":
+        return session.request("GET", "/dashboard")
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def run_scenario(name, sessions, app, total, warmup):
+    for i in range(warmup):
+        scenario_request(name, sessions[0], app, -1 - i)
+
+    latencies = []
+    statuses = {}
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker(session):
+        local = []
+        local_statuses = {}
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            start = time.perf_counter()
+            status = scenario_request(name, session, app, n)
+            local.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in sessions]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not 200 <= status < 300),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "req_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+# ---------------- REPORTING ----------------
+
+def compare(results, baseline_path, tolerance):
+    """Print p95 changes against a baseline file; return the regressed scenarios"""
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%} on p95)")
+    regressed = []
+    for r in results:
+        before = baseline.get(r["scenario"])
+        if not before or not before["p95_ms"]:
+            continue
+        change = (r["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        flag = "❌" if change > tolerance else "✅"
+        print(f"{flag} {r['scenario']:<18} p95 {before['p95_ms']:>8} -> {r['p95_ms']:>8} ms ({change:+.0%})")
+        if change > tolerance:
+            regressed.append(r["scenario"])
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--management", type=int, default=5, help="seeded management users")
+    parser.add_argument("--concierge", type=int, default=20, help="seeded concierge users")
+    parser.add_argument("--residents", type=int, default=2000, help="seeded resident users")
+    parser.add_argument("--scenarios", type=parse_list, default=SCENARIOS, help="comma separated subset to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads per scenario")
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario")
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt cost factor for the run")
+    parser.add_argument("--server", action="store_true", help="go over HTTP to a local threaded server")
+    parser.add_argument("--session-backend", choices=BACKENDS, default="server", help="web session store")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed p95 slowdown vs baseline (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_endpoints_")
+    server = None
+    try:
+        app = make_app(workdir, args.rounds, args.session_backend)
+        seed(app, args.management, args.concierge, args.residents)
+
+        if args.server:
+            server, base_url = start_server(app)
+            sessions = [HttpSession(base_url, app) for _ in range(args.concurrency)]
+        else:
+            sessions = [TestClientSession(app) for _ in range(args.concurrency)]
+
+        print("\n" + "=" * 78)
+        print(f"ENDPOINT LOAD TEST ({'HTTP server' if args.server else 'test client'}, "
+              f"{args.concurrency} threads, {args.management}/{args.concierge}/{args.residents} users)")
+        print("=" * 78)
+        print(f"{'scenario':<18} {'reqs':>6} {'errors':>7} {'req/s':>9} {'mean ms':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+        results = []
+        for name in args.scenarios:
+            r = run_scenario(name, sessions, app, args.requests, args.warmup)
+            results.append(r)
+            print(f"{r['scenario']:<18} {r['requests']:>6} {r['errors']:>7} {r['req_per_sec']:>9} "
+                  f"{r['mean_ms']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "benchmark": "endpoints",
+                "commit": git_commit(),
+                "settings": {
+                    "management": args.management,
+                    "concierge": args.concierge,
+                    "residents": args.residents,
+                    "concurrency": args.concurrency,
+                    "requests": args.requests,
+                    "rounds": args.rounds,
+                    "transport": "http" if args.server else "test_client",
+                    "session_backend": args.session_backend,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Login throughput vs. bcrypt pool size and cost factor
+Run: python benchmarks/bench_hashing.py [--workers 1,2,4,8] [--rounds 10,12] [--clients 32]
+
+Simulates a burst of logins: `clients` threads each verify a password
+through HashPool, the same path User.check_password takes. Reports
+verifications/second and how many attempts were turned away with
+HashingBusy (back-pressure) for each pool size / cost combination.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hashing import HashPool, HashingBusy
+
+
+def parse_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def run_case(workers, rounds, clients, attempts, max_pending):
+    pool = HashPool(workers=workers, max_pending=max_pending, timeout=60, rounds=rounds)
+    password_hash = pool.hash_password("ResidentPass123")
+
+    ok = 0
+    busy = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal ok, busy
+        for _ in range(attempts):
+            try:
+                pool.check_password("ResidentPass123", password_hash)
+                result = "ok"
+            except HashingBusy:
+                result = "busy"
+            with lock:
+                if result == "ok":
+                    ok += 1
+                else:
+                    busy += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    return {
+        "workers": workers,
+        "rounds": rounds,
+        "clients": clients,
+        "verified": ok,
+        "rejected_busy": busy,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(ok / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=parse_list, default=[1, 2, 4, 8], help="pool sizes, comma separated")
+    parser.add_argument("--rounds", type=parse_list, default=[10, 12], help="bcrypt cost factors, comma separated")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent login threads")
+    parser.add_argument("--attempts", type=int, default=4, help="logins per client thread")
+    parser.add_argument("--max-pending", type=int, default=1000, help="pool queue limit (lower it to see back-pressure)")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("BCRYPT POOL BENCHMARK")
+    print("=" * 60)
+    print(f"{'workers':>8} {'rounds':>7} {'verified':>9} {'busy':>6} {'seconds':>8} {'logins/s':>9}")
+
+    results = []
+    for rounds in args.rounds:
+        for workers in args.workers:
+            r = run_case(workers, rounds, args.clients, args.attempts, args.max_pending)
+            results.append(r)
+            print(f"{r['workers']:>8} {r['rounds']:>7} {r['verified']:>9} {r['rejected_busy']:>6} "
+                  f"{r['seconds']:>8} {r['logins_per_sec']:>9}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "hashing", "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
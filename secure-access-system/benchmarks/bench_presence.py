@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Presence ingestion throughput and on-site check latency
+Run: python benchmarks/bench_presence.py [--residents 5000] [--events 100000] [--batch 500] [--checks 200000]
+
+Against a temporary database, ingests `events` Wi-Fi / beacon sightings
+for `residents` residents in batches of `batch` (validation, insert and
+in-memory update, as POST /api/presence/events does), then times
+`checks` random is_on_site() lookups, the check key verification makes.
+Also reports how long a fresh worker takes to load the window from the
+database on its first check.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+from services.bootstrap import ensure_schema
+from services.presence import presence
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--residents", type=int, default=5000, help="distinct residents sighted")
+    parser.add_argument("--events", type=int, default=100000, help="sightings to ingest")
+    parser.add_argument("--batch", type=int, default=500, help="sightings per ingestion request")
+    parser.add_argument("--checks", type=int, default=200000, help="is_on_site() lookups to time")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_presence_")
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        VIRTUAL_KEY_DIR = os.path.join(workdir, "keys")
+        PRESENCE_MAX_BATCH = args.batch
+
+    try:
+        app = create_app(BenchConfig, bootstrap=False)
+        with app.app_context():
+            ensure_schema(verbose=False)
+
+            ingest_seconds = 0.0
+            for start in range(0, args.events, args.batch):
+                now = time.time()
+                batch = [
+                    {
+                        "user_id": random.randrange(args.residents),
+                        "kind": random.choice(("wifi", "beacon")),
+                        "ts": now - random.random() * 10,
+                        "source": f"ap-{random.randrange(20)}",
+                    }
+                    for _ in range(min(args.batch, args.events - start))
+                ]
+                t = time.perf_counter()
+                rows, _ = presence.parse_events(batch, now)
+                presence.record(rows)
+                ingest_seconds += time.perf_counter() - t
+
+            user_ids = [random.randrange(args.residents) for _ in range(args.checks)]
+            on_site = 0
+            t = time.perf_counter()
+            for user_id in user_ids:
+                on_site += presence.is_on_site(user_id)
+            check_seconds = time.perf_counter() - t
+
+            # A worker that has never seen the table loads the window on first use
+            presence.reset()
+            t = time.perf_counter()
+            presence.is_on_site(0)
+            load_seconds = time.perf_counter() - t
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "ingest_events_per_sec": round(args.events / ingest_seconds, 1),
+        "ingest_ms_per_batch": round(ingest_seconds / max(1, args.events // args.batch) * 1000, 2),
+        "check_mean_us": round(check_seconds / args.checks * 1e6, 2),
+        "checks_per_sec": round(args.checks / check_seconds, 1),
+        "on_site_fraction": round(on_site / args.checks, 3),
+        "cold_load_ms": round(load_seconds * 1000, 2),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"PRESENCE BENCHMARK ({args.residents} residents, {args.events} events, batch {args.batch})")
+    print("=" * 60)
+    print(f"Ingestion:        {results['ingest_events_per_sec']:>12} events/s "
+          f"({results['ingest_ms_per_batch']} ms per batch)")
+    print(f"is_on_site():     {results['check_mean_us']:>12} µs mean "
+          f"({results['checks_per_sec']} checks/s, {results['on_site_fraction']:.0%} on site)")
+    print(f"Cold worker load: {results['cold_load_ms']:>12} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "presence", "settings": {k: v for k, v in vars(args).items() if k != "json_path"}, "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Trend chart data: grouping raw rows vs reading the daily rollups
+Run: python benchmarks/bench_rollups.py [--users 20000] [--events 500000] [--repeat 20] [--json out.json]
+
+Fills a temporary database with `users` users and `events` audit events
+spread over the last 400 days, backfills daily_rollups, then builds the
+30- and 365-day trend series two ways, `repeat` times each:
+
+  raw       GROUP BY date(created_at) over users and access_events, what
+            the chart API would have to do without rollups
+  rollups   services.rollups.daily_trends(), a primary-key range read of
+            at most 365 rows
+
+Also reports how long the one-off backfill took. Both ways return the
+same totals.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select
+from models import db, User, AccessEvent
+from services.rollups import backfill, daily_trends, EVENT_METRICS, SIGNUP_METRICS, TREND_RANGES
+from bench_endpoints import make_app
+
+SPAN_DAYS = 400
+
+
+def fill(app, users, events):
+    now = datetime.utcnow()
+    event_types = list(EVENT_METRICS) + ["door_access_granted", "user_created"]
+    with app.app_context():
+        rows = [
+            {
+                "first_name": "Bench", "last_name": f"User{i}", "username": f"bench.user{i}",
+                "email": f"bench.user{i}@building.local", "role": random.choice(list(SIGNUP_METRICS)),
+                "password_hash": "x", "is_active": True, "is_locked": False, "failed_login_attempts": 0,
+                "created_at": now - timedelta(seconds=random.randrange(SPAN_DAYS * 86400)),
+            }
+            for i in range(users)
+        ]
+        for start in range(0, len(rows), 5000):
+            db.session.execute(User.__table__.insert(), rows[start:start + 5000])
+        for start in range(0, events, 5000):
+            db.session.execute(AccessEvent.__table__.insert(), [
+                {
+                    "event_type": random.choice(event_types),
+                    "user_id": random.randrange(1, users + 1),
+                    "channel": "web",
+                    "created_at": now - timedelta(seconds=random.randrange(SPAN_DAYS * 86400)),
+                }
+                for _ in range(min(5000, events - start))
+            ])
+        db.session.commit()
+
+
+def raw_totals(days):
+    """The trend totals straight from the raw tables"""
+    since = datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time())
+    totals = dict.fromkeys(list(SIGNUP_METRICS.values()) + list(EVENT_METRICS.values()), 0)
+    signups = db.session.execute(
+        select(func.date(User.created_at), User.role, func.count())
+        .where(User.created_at >= since)
+        .group_by(func.date(User.created_at), User.role)
+    )
+    for _, role, n in signups:
+        totals[SIGNUP_METRICS[role]] += n
+    activity = db.session.execute(
+        select(func.date(AccessEvent.created_at), AccessEvent.event_type, func.count())
+        .where(AccessEvent.created_at >= since, AccessEvent.event_type.in_(EVENT_METRICS))
+        .group_by(func.date(AccessEvent.created_at), AccessEvent.event_type)
+    )
+    for _, event_type, n in activity:
+        totals[EVENT_METRICS[event_type]] += n
+    return totals
+
+
+def timed(build, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = build()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000, help="users spread over the period")
+    parser.add_argument("--events", type=int, default=500000, help="audit events spread over the period")
+    parser.add_argument("--repeat", type=int, default=20, help="builds per measurement")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_rollups_")
+    results = {}
+    try:
+        app = make_app(workdir, 4)
+        fill(app, args.users, args.events)
+        with app.app_context():
+            started = time.perf_counter()
+            days_written = backfill()
+            results["backfill_seconds"] = round(time.perf_counter() - started, 3)
+            results["rollup_rows"] = days_written
+
+            for days in TREND_RANGES:
+                raw_ms, raw = timed(lambda: raw_totals(days), args.repeat)
+                rollup_ms, trends = timed(lambda: daily_trends(days), args.repeat)
+                results[f"{days}d"] = {
+                    "raw_ms": round(raw_ms, 2),
+                    "rollups_ms": round(rollup_ms, 2),
+                    "speedup": round(raw_ms / rollup_ms, 1),
+                    "totals_match": raw == trends["totals"],
+                }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    print(f"TREND DATA ({args.users} users, {args.events} events over {SPAN_DAYS} days)")
+    print("=" * 60)
+    print(f"Backfill: {results['backfill_seconds']}s for {results['rollup_rows']} days")
+    print(f"{'range':<8} {'raw ms':>10} {'rollups ms':>12} {'speed-up':>10} {'match':>7}")
+    for days in TREND_RANGES:
+        row = results[f"{days}d"]
+        print(f"{str(days) + 'd':<8} {row['raw_ms']:>10} {row['rollups_ms']:>12} {row['speedup']:>9}x "
+              f"{'✅' if row['totals_match'] else '❌':>6}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "rollups", "settings": {k: v for k, v in vars(args).items() if k != "json_path"}, "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
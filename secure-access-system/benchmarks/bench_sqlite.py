@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+SQLite read/write concurrency: "default" vs "production" engine profile
+Run: python benchmarks/bench_sqlite.py [--users 2000] [--readers 8] [--writers 4] [--seconds 5]
+
+For each profile a fresh temporary database is seeded, then reader
+threads run the dashboard/list queries while writer threads bump
+failed_login_attempts (the login-failure write path) for a fixed time.
+Reports reads/s, writes/s and how many operations failed with
+"database is locked".
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from config import Config
+from models import db, User
+from services.pagination import fetch_page, parse_list_args
+from services.stats import get_user_stats
+
+
+def make_app(profile, db_path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        DB_PROFILE = profile
+        BCRYPT_ROUNDS = 4
+
+    return create_app(BenchConfig)
+
+
+def seed(app, count):
+    with app.app_context():
+        roles = ["resident"] * 8 + ["concierge"]
+        for i in range(count):
+            db.session.add(User(
+                first_name="Bench",
+                last_name=f"User{i}",
+                username=f"bench.user{i}",
+                email=f"bench{i}@building.local",
+                role=random.choice(roles),
+                password_hash="x"
+            ))
+        db.session.commit()
+        return [uid for (uid,) in db.session.query(User.id).all()]
+
+
+def run_profile(profile, args):
+    workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    try:
+        app = make_app(profile, os.path.join(workdir, "bench.db"))
+        user_ids = seed(app, args.users)
+        options = parse_list_args({"limit": "50"})
+
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = time.perf_counter() + args.seconds
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            with app.app_context():
+                while time.perf_counter() < stop:
+                    try:
+                        get_user_stats()
+                        fetch_page(User.query, options)
+                        bump("reads")
+                    except OperationalError:
+                        db.session.rollback()
+                        bump("locked")
+
+        def writer():
+            with app.app_context():
+                while time.perf_counter() < stop:
+                    try:
+                        user = db.session.get(User, random.choice(user_ids))
+                        user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
+                        db.session.commit()
+                        bump("writes")
+                    except OperationalError:
+                        db.session.rollback()
+                        bump("locked")
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with app.app_context():
+            db.engine.dispose()
+
+        return {
+            "profile": profile,
+            "reads_per_sec": round(counts["reads"] / args.seconds, 1),
+            "writes_per_sec": round(counts["writes"] / args.seconds, 1),
+            "locked_errors": counts["locked"],
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="users to seed")
+    parser.add_argument("--readers", type=int, default=8, help="reader threads")
+    parser.add_argument("--writers", type=int, default=4, help="writer threads")
+    parser.add_argument("--seconds", type=float, default=5, help="duration per profile")
+    parser.add_argument("--profiles", default="default,production", help="profiles to compare, comma separated")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("SQLITE ENGINE PROFILE BENCHMARK")
+    print("=" * 60)
+    print(f"{'profile':>12} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+
+    results = []
+    for profile in [p for p in args.profiles.split(",") if p]:
+        r = run_profile(profile, args)
+        results.append(r)
+        print(f"{r['profile']:>12} {r['reads_per_sec']:>10} {r['writes_per_sec']:>10} {r['locked_errors']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "sqlite_profiles", "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for web workers and CLI tools
+Run: python benchmarks/bench_startup.py [--repeat 5] [--worker-budget-ms 1500] [--json out.json]
+
+Bootstraps a temporary database once, then times fresh interpreters:
+
+  import app       `import app` (framework + our modules)
+  worker start     import + create_app(bootstrap=False), what a worker does
+  cli start        worker start + the schema check the scripts run
+  dev start        import + create_app() with BOOTSTRAP_ON_STARTUP on an
+                   already bootstrapped database (for comparison)
+
+Each case runs --repeat times and the median is reported. The slowest of
+our own modules under `python -X importtime` are listed too, so a new
+heavy import shows up by name. Exits with status 1 if import, worker or
+CLI start exceeds its budget.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OWN_MODULES = ("app", "config", "models", "utils", "routes", "services")
+
+# Runs in a fresh interpreter; prints elapsed milliseconds
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import config
+config.Config.SQLALCHEMY_DATABASE_URI = {uri!r}
+config.Config.VIRTUAL_KEY_DIR = {keys!r}
+config.Config.BCRYPT_ROUNDS = 4
+import app
+mode = {mode!r}
+if mode != "import":
+    flask_app = app.create_app(bootstrap=(mode == "dev"))
+    if mode == "cli":
+        from services.bootstrap import schema_ready
+        with flask_app.app_context():
+            assert schema_ready()
+    elif mode == "setup":
+        from services.bootstrap import bootstrap
+        bootstrap(flask_app, verbose=False)
+print((time.perf_counter() - start) * 1000)
+"""
+
+CASES = [
+    ("import app", "import"),
+    ("worker start", "worker"),
+    ("cli start", "cli"),
+    ("dev start", "dev"),
+]
+
+
+def run_snippet(mode, uri, keys, extra_args=()):
+    code = SNIPPET.format(root=ROOT, uri=uri, keys=keys, mode=mode)
+    env = dict(os.environ, GATEKEEPER_BOOTSTRAP="0")
+    result = subprocess.run([sys.executable, *extra_args, "-c", code], capture_output=True,
+                            text=True, cwd=ROOT, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_own_imports(uri, keys, top):
+    _, stderr = run_snippet("import", uri, keys, extra_args=("-X", "importtime"))
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not self_us.isdigit():
+            continue
+        if name.split(".")[0] in OWN_MODULES:
+            rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per case")
+    parser.add_argument("--import-budget-ms", type=float, default=1200, help="max median `import app` time")
+    parser.add_argument("--worker-budget-ms", type=float, default=1500, help="max median worker start time")
+    parser.add_argument("--cli-budget-ms", type=float, default=1500, help="max median CLI start time")
+    parser.add_argument("--top", type=int, default=8, help="slowest own modules to list")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    keys = os.path.join(workdir, "keys")
+    budgets = {"import": args.import_budget_ms, "worker": args.worker_budget_ms, "cli": args.cli_budget_ms}
+
+    try:
+        run_snippet("setup", uri, keys)
+
+        print("\n" + "=" * 60)
+        print(f"COLD START ({args.repeat} runs each, median)")
+        print("=" * 60)
+        print(f"{'case':<14} {'median ms':>10} {'min ms':>9} {'max ms':>9} {'budget':>9}")
+
+        results = []
+        over_budget = []
+        for name, mode in CASES:
+            timings = [run_snippet(mode, uri, keys)[0] for _ in range(args.repeat)]
+            median = statistics.median(timings)
+            budget = budgets.get(mode)
+            ok = budget is None or median <= budget
+            if not ok:
+                over_budget.append(name)
+            results.append({
+                "case": name,
+                "median_ms": round(median, 1),
+                "min_ms": round(min(timings), 1),
+                "max_ms": round(max(timings), 1),
+                "budget_ms": budget,
+                "ok": ok,
+            })
+            flag = "" if budget is None else ("✅" if ok else "❌")
+            print(f"{name:<14} {median:>10.1f} {min(timings):>9.1f} {max(timings):>9.1f} "
+                  f"{budget if budget is not None else '-':>9} {flag}")
+
+        imports = slowest_own_imports(uri, keys, args.top)
+        print("\nSlowest own modules (self / cumulative ms):")
+        for name, self_ms, cumulative_ms in imports:
+            print(f"  {name:<32} {self_ms:>7.1f} {cumulative_ms:>8.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "benchmark": "startup",
+                "results": results,
+                "slowest_imports": [
+                    {"module": name, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+                    for name, self_ms, cumulative_ms in imports
+                ],
+            }, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+    if over_budget:
+        print(f"\n❌ Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+    print("\n✅ All startup budgets met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Virtual key issue / verification throughput
+Run: python benchmarks/bench_virtual_keys.py [--keys 2000] [--presentations 20000]
+
+Issues `keys` signed virtual keys with a throwaway Ed25519 key, then
+verifies `presentations` random presentations of them with KeyVerifier,
+the same check POST /api/keys/verify and door controllers run. Reports
+per-operation latency (mean / p99) for issuing, first-time verification
+(signature check) and repeat presentations (served from the verifier
+cache), plus verifications/second.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from services.virtual_keys import KeySigner, KeyVerifier, export_public_keys
+
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    total = sum(timings)
+    return {
+        "operation": name,
+        "count": len(timings),
+        "mean_us": round(total / len(timings) * 1e6, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1] * 1e6, 1),
+        "ops_per_sec": round(len(timings) / total, 1) if total else 0.0,
+    }
+
+
+def timed(fn, items):
+    timings = []
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=2000, help="distinct keys to issue")
+    parser.add_argument("--presentations", type=int, default=20000, help="repeat verifications of random keys")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    signer = KeySigner(Ed25519PrivateKey.generate())
+    # Build the verifier the way a door controller would: from exported public keys
+    verifier = KeyVerifier.from_exported(export_public_keys([signer]), cache_size=args.keys)
+
+    print("\n" + "=" * 60)
+    print("VIRTUAL KEY BENCHMARK")
+    print("=" * 60)
+
+    issue_timings, issued = timed(lambda i: signer.issue(i, "main-entrance")[0], range(args.keys))
+    first_timings, _ = timed(lambda token: verifier.verify(token, "main-entrance"), issued)
+    repeats = [random.choice(issued) for _ in range(args.presentations)]
+    repeat_timings, _ = timed(lambda token: verifier.verify(token, "main-entrance"), repeats)
+
+    no_cache = KeyVerifier.from_signers([signer], cache_size=0)
+    uncached_timings, _ = timed(lambda token: no_cache.verify(token, "main-entrance"), repeats[:args.keys])
+
+    results = [
+        summarize("issue", issue_timings),
+        summarize("verify (first)", first_timings),
+        summarize("verify (cached)", repeat_timings),
+        summarize("verify (no cache)", uncached_timings),
+    ]
+
+    print(f"{'operation':<20} {'count':>7} {'mean µs':>9} {'p99 µs':>9} {'ops/s':>11}")
+    for r in results:
+        print(f"{r['operation']:<20} {r['count']:>7} {r['mean_us']:>9} {r['p99_us']:>9} {r['ops_per_sec']:>11}")
+    print(f"\n🔑 Key size: {len(issued[0])} bytes")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "virtual_keys", "key_bytes": len(issued[0]), "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
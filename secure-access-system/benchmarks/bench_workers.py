@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Throughput scaling of the production server (serve.py) with worker count
+Run: python benchmarks/bench_workers.py [--workers 1,2,4] [--threads 4] [--clients 16] [--duration 10] [--json out.json]
+
+Bootstraps and seeds a temporary SQLite database once, then for each
+worker count starts `serve.py` on it (real gunicorn, real sockets) and
+drives it for --duration seconds from --clients client processes, each
+holding one keep-alive connection. Requests rotate through:
+
+  list      GET /api/users/list?limit=20          (management JWT)
+  search    GET /api/users/search?q=resident<n>   (management JWT)
+  protected GET /api/protected                    (JWT check only)
+
+Reports requests/sec, p50 / p95 / p99 latency, errors and the speed-up
+over the first worker count. Client processes share the machine with the
+server, so the speed-up is bounded by the CPU count (printed with the
+results); run the clients elsewhere for a clean server-only number.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ["list", "search", "protected"]
+
+
+def parse_list(value):
+    return [v for v in value.split(",") if v]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------------- SETUP ----------------
+
+def prepare_database(env, residents):
+    """Bootstrap + seed in this process; returns a management JWT"""
+    os.environ.update(env)
+    from app import create_app
+    from services.bootstrap import bootstrap
+    from bench_endpoints import seed
+    from flask_jwt_extended import create_access_token
+
+    app = create_app(bootstrap=False)
+    bootstrap(app, verbose=False)
+    demo_id = seed(app, 2, 5, residents)
+    with app.app_context():
+        return create_access_token(identity=str(demo_id), additional_claims={"role": "management"})
+
+
+def start_server(env, port, workers, threads):
+    command = [
+        sys.executable, os.path.join(ROOT, "serve.py"),
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--max-requests", "0",
+        "--no-bootstrap",
+    ]
+    process = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, **env),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/protected")
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("serve.py did not start listening within 30s")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ---------------- CLIENTS ----------------
+
+def request_for(name, n):
+    if name == "list":
+        return "/api/users/list?limit=20"
+    if name == "search":
+        return f"/api/users/search?q=resident{n % 1000}&limit=20"
+    if name == "protected":
+        return "/api/protected"
+    raise ValueError(f"Unknown path: {name}")
+
+
+def client(args):
+    """One client process: loop for `duration` seconds on one keep-alive connection"""
+    port, token, paths, duration, index = args
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    n = index
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        path = request_for(paths[n % len(paths)], n)
+        n += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 300:
+                errors += 1
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+def run_load(port, token, paths, clients, duration):
+    with multiprocessing.Pool(clients) as pool:
+        started = time.perf_counter()
+        results = pool.map(client, [(port, token, paths, duration, i) for i in range(clients)])
+        elapsed = time.perf_counter() - started
+    latencies = sorted(l for lat, _ in results for l in lat)
+    errors = sum(e for _, e in results)
+    return latencies, errors, elapsed
+
+
+# ---------------- MAIN ----------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=parse_list, default=["1", "2", "4"], help="comma separated worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per worker count")
+    parser.add_argument("--residents", type=int, default=2000, help="resident accounts to seed")
+    parser.add_argument("--paths", type=parse_list, default=PATHS, help="comma separated subset of: " + ",".join(PATHS))
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    unknown = set(args.paths) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+    worker_counts = [int(w) for w in args.workers]
+
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    env = {
+        "GATEKEEPER_DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "GATEKEEPER_KEY_DIR": os.path.join(workdir, "keys"),
+        "GATEKEEPER_BOOTSTRAP": "0",
+    }
+
+    results = []
+    try:
+        print("🌱 Seeding database...")
+        token = prepare_database(env, args.residents)
+
+        print("\n" + "=" * 72)
+        print(f"WORKER SCALING ({args.threads} threads/worker, {args.clients} clients, "
+              f"{args.duration:g}s each, {os.cpu_count()} CPUs)")
+        print("=" * 72)
+        print(f"{'workers':>7} {'reqs':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'speed-up':>9}")
+
+        base_rps = None
+        for workers in worker_counts:
+            port = free_port()
+            process = start_server(env, port, workers, args.threads)
+            try:
+                run_load(port, token, args.paths, min(args.clients, 4), 1)  # warm-up
+                latencies, errors, elapsed = run_load(port, token, args.paths, args.clients, args.duration)
+            finally:
+                stop_server(process)
+
+            rps = len(latencies) / elapsed
+            base_rps = base_rps or rps
+            row = {
+                "workers": workers,
+                "requests": len(latencies),
+                "errors": errors,
+                "rps": round(rps, 1),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "speedup": round(rps / base_rps, 2),
+            }
+            results.append(row)
+            print(f"{workers:>7} {row['requests']:>8} {errors:>7} {rps:>9.1f} {row['p50_ms']:>8.2f} "
+                  f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['speedup']:>8.2f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "benchmark": "workers",
+                "settings": {
+                    "threads": args.threads,
+                    "clients": args.clients,
+                    "duration": args.duration,
+                    "residents": args.residents,
+                    "paths": args.paths,
+                    "cpus": os.cpu_count(),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\n📄 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,16 @@ import os
 import sys
 from app import create_app
 from models import db, User
+from services.migrations import current_version, check_query_plans
+from services.bootstrap import schema_ready
+
+app = create_app(bootstrap=False)
 
-app = create_app()
 with app.app_context():
+    if not schema_ready():
+        print("❌ Database not set up. Run: python scripts/bootstrap.py")
+        sys.exit(1)
+
     print("🔍 Database Check")
     print("=" * 50)
     
@@ -36,4 +43,15 @@ with app.app_context():
     for user in User.query.all():
         print(f"ID: {user.id}, Username: {user.username}, Role: {user.role}, Email: {user.email}")
     
+    # Schema version and index usage
+    with db.engine.connect() as conn:
+        print(f"\n🗂️  Schema version: {current_version(conn)}")
+
+    print("\n📈 Query plans:")
+    print("-" * 50)
+    for name, index, plan, ok in check_query_plans():
+        print(f"{'✅' if ok else '❌'} {name}: {plan}")
+        if not ok:
+            print(f"   expected index: {index}")
+    
     print("\n✅ Database check complete!")
\ No newline at end of file
@@ -1,5 +1,6 @@
 # config.py
 # Central configuration file
+import os
 
 class Config:
     SECRET_KEY = "dev-secret-key-change-later"
@@ -19,16 +20,170 @@ class Config:
 class Config:
     SECRET_KEY = "dev-secret-key-change-later"
 
-    SQLALCHEMY_DATABASE_URI = "sqlite:///secure_access.db"
+    # GATEKEEPER_DATABASE_URL points a deployment (or serve.py) elsewhere
+    SQLALCHEMY_DATABASE_URI = os.environ.get("GATEKEEPER_DATABASE_URL", "sqlite:///secure_access.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite engine profile (applied by models.init_db)
+    # "production": WAL journaling so readers don't block behind writers,
+    # a busy timeout instead of instant "database is locked" errors, and
+    # a larger page cache / memory map. "default": SQLite's own settings.
+    DB_PROFILE = "production"
+    DB_PROFILES = {
+        "default": {
+            "pragmas": {},
+            "engine_options": {},
+        },
+        "production": {
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",  # safe with WAL, far fewer fsyncs
+                "busy_timeout": 5000,  # ms to wait for a lock before failing
+                "cache_size": -64000,  # negative = KiB, so 64 MB
+                "mmap_size": 268435456,  # 256 MB
+                "temp_store": "MEMORY",
+                "foreign_keys": "ON",
+            },
+            "engine_options": {
+                "pool_size": 10,
+                "max_overflow": 20,
+                "pool_timeout": 10,
+                "pool_recycle": 3600,
+                "connect_args": {"timeout": 5},  # seconds, matches busy_timeout
+            },
+        },
+    }
+
     # JWT Configuration
     JWT_SECRET_KEY = "jwt-secret-key"
     JWT_ACCESS_TOKEN_EXPIRES = 60 * 60  # 1 hour
 
+    # How often each worker checks for token revocations made elsewhere
+    REVOCATION_SYNC_SECONDS = 5
+
     # Demo Management Account (DEV ONLY)
     DEMO_USER_EMAIL = "demo@building.local"
     DEMO_USER_PASSWORD = "DemoPass123"
 
+    # Dashboard statistics
+    # When True, user create/toggle/lock/unlock keep the user_stats table
+    # up to date so dashboard reads don't have to scan the users table.
+    USE_STATS_COUNTERS = True
+
+    # Password hashing pool (see services/hashing.py)
+    BCRYPT_ROUNDS = 12  # bcrypt cost factor for new hashes
+    HASH_POOL_WORKERS = 4  # concurrent bcrypt jobs
+    HASH_POOL_MAX_PENDING = 32  # running + queued jobs before returning 503
+    HASH_TIMEOUT = 5.0  # seconds a request waits for its hash result
+
+    # Bulk user import (see services/bulk_import.py). Each row is a bcrypt
+    # hash (~0.3s of CPU at 12 rounds), so 200 rows keep a request to about
+    # 15s on 4 pool workers; larger files: python scripts/import_users.py
+    BULK_IMPORT_MAX_ROWS = 200  # rows per POST /api/users/import, else 413
+
+    # Identity cache for logged-in users (see services/identity_cache.py)
+    IDENTITY_CACHE_TTL = 300  # seconds before a cached user is re-read
+    IDENTITY_CACHE_SYNC_SECONDS = 1  # how often each worker checks for user changes made elsewhere
+
+    # Audit log writer (see services/audit.py)
+    AUDIT_ENABLED = True
+    AUDIT_QUEUE_SIZE = 10000  # events buffered in memory before overflow
+    AUDIT_BATCH_SIZE = 200  # events per INSERT transaction
+    AUDIT_FLUSH_INTERVAL = 0.5  # seconds the writer waits for more events
+    AUDIT_OVERFLOW = "drop_oldest"  # or "drop_newest" when the buffer is full
+
+    # Reverse proxies in front of the app. With N > 0 the client IP used for
+    # login throttling, the audit log and the detector is taken from
+    # X-Forwarded-For, trusting the last N entries. Only set it (through
+    # GATEKEEPER_TRUSTED_PROXY_HOPS) where every request comes through the
+    # proxy, as behind serve.py: a client that connects directly could
+    # otherwise pick its own IP. 0 = the header is ignored
+    TRUSTED_PROXY_HOPS = int(os.environ.get("GATEKEEPER_TRUSTED_PROXY_HOPS", "0"))
+
+    # Login throttling and lockout (see services/login_guard.py)
+    LOGIN_THROTTLE_ENABLED = True
+    LOGIN_EMAIL_BURST = 5  # attempts per email before throttling...
+    LOGIN_EMAIL_REFILL_SECONDS = 60  # ...then one more per minute
+    LOGIN_IP_BURST = 30  # attempts per client IP before throttling...
+    LOGIN_IP_REFILL_SECONDS = 2  # ...then one more every 2 seconds
+    LOGIN_THROTTLE_MAX_KEYS = 100000  # cap on tracked emails / IPs each
+    LOCKOUT_THRESHOLD = 3  # wrong passwords before the account is locked
+
+    # Signed virtual door keys (see services/virtual_keys.py)
+    VIRTUAL_KEY_DIR = os.environ.get("GATEKEEPER_KEY_DIR")  # signing keys; None = <instance>/keys
+    VIRTUAL_KEY_TTL = 24 * 60 * 60  # seconds an issued key stays valid
+    VIRTUAL_KEY_CACHE_SIZE = 50000  # verified keys remembered by the verifier
+    VIRTUAL_KEY_CLOCK_SKEW = 30  # seconds of leeway on issue / expiry times
+    DOOR_GROUPS = ["main-entrance", "parking", "amenities", "mailroom"]
+    # Shared token door controllers send to POST /api/keys/verify
+    # (X-Door-Token); None disables server-side verification
+    DOOR_CONTROLLER_TOKEN = os.environ.get("GATEKEEPER_DOOR_TOKEN")
+
+    # Door access policy (see services/access_policy.py)
+    POLICY_SYNC_SECONDS = 5  # how often each worker checks for policy edits
+
+    # Request / SQL / bcrypt metrics at /metrics (see services/metrics.py)
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.environ.get("GATEKEEPER_METRICS_TOKEN")  # if set, scrapers send "Authorization: Bearer <token>"; required with TRUSTED_PROXY_HOPS
+    METRICS_ALLOW_REMOTE = False  # without a token only direct 127.0.0.1 / ::1 clients may scrape
+    SLOW_REQUEST_SECONDS = None  # e.g. 0.5 to log slow requests with their queries
+    SLOW_REQUEST_MAX_QUERIES = 20  # statements listed per slow request
+
+    # Startup work (see services/bootstrap.py)
+    # True: create_app() creates tables, applies migrations and seeds the
+    # demo accounts itself (handy in development). Production workers and
+    # CLI tools should skip it and rely on `python scripts/bootstrap.py`;
+    # GATEKEEPER_BOOTSTRAP=0 in the environment does that.
+    BOOTSTRAP_ON_STARTUP = os.environ.get("GATEKEEPER_BOOTSTRAP", "1") != "0"
+
+    # Rendered dashboard / user-list fragments kept per process (LRU)
+    FRAGMENT_CACHE_SIZE = 500
+
+    # Proximity validation (see services/presence.py). Network gear posts
+    # Wi-Fi association / beacon sightings with this shared token; None
+    # disables ingestion.
+    PRESENCE_INGEST_TOKEN = os.environ.get("GATEKEEPER_PRESENCE_TOKEN")
+    PRESENCE_WINDOW_SECONDS = 120  # a sighting counts as "on site" for this long
+    PRESENCE_REQUIRED_SIGNALS = ("wifi", "beacon")  # all needed within the window
+    PRESENCE_REQUIRED_FOR_ACCESS = False  # door key verification also checks presence
+    PRESENCE_SYNC_SECONDS = 1  # how often workers pick up sightings ingested elsewhere
+    PRESENCE_MAX_BATCH = 1000  # events per ingestion request
+    PRESENCE_CLOCK_SKEW = 30  # seconds a sighting may be in the future
+
+    # Web sessions (see services/sessions.py). "server": the cookie holds an
+    # opaque id and the data stays in memory + the web_sessions table;
+    # "cookie": Flask's signed-cookie sessions
+    SESSION_BACKEND = "server"
+    SESSION_IDLE_TIMEOUT = 12 * 60 * 60  # seconds since last use before a session ends
+    SESSION_REFRESH_SECONDS = 300  # how often that expiry is written back
+    SESSION_SYNC_SECONDS = 5  # how long a cached session is trusted without re-reading it
+    SESSION_CACHE_SIZE = 10000  # sessions kept in memory per process (LRU)
+
+    # Live dashboard stream (see services/change_feed.py); each open stream
+    # holds one request thread, so keep this well below SERVER_THREADS
+    DASHBOARD_STREAMS_PER_WORKER = 2  # more get 503 and the page polls instead
+    DASHBOARD_STREAM_MAX_SECONDS = 300  # a stream then ends and the browser reconnects
+    DASHBOARD_STREAM_POLL_SECONDS = 5  # how often a stream checks for other workers' changes
+
+    # Suspicious-access detection over login / door events (see services/detector.py)
+    DETECTOR_ENABLED = True
+    DETECTOR_WINDOW_SECONDS = 300  # sliding window for the burst / spread rules
+    DETECTOR_BURST_THRESHOLD = 5  # failed logins for one account within the window
+    DETECTOR_SPREAD_THRESHOLD = 5  # accounts failing from one client IP within the window
+    DETECTOR_OFF_HOURS = (60, 300)  # local (start_minute, end_minute): 01:00-05:00
+    DETECTOR_SEQUENCE_SECONDS = 5  # one key granted at two door controllers this close
+    DETECTOR_COOLDOWN_SECONDS = None  # between repeats of an alert; None = the window
+    DETECTOR_MAX_KEYS = 10000  # cap on tracked accounts / IPs / residents each
+
+    # Production server (serve.py); GATEKEEPER_* environment variables and
+    # command-line flags override these
+    SERVER_BIND = "127.0.0.1:8000"
+    SERVER_WORKERS = 2  # processes; SQLite allows one writer at a time anyway
+    SERVER_THREADS = 4  # request threads per worker; DASHBOARD_STREAMS_PER_WORKER of them may be held by live dashboards
+    SERVER_TIMEOUT = 30  # seconds before a stuck worker is killed and replaced
+    SERVER_GRACEFUL_TIMEOUT = 30  # seconds for in-flight requests on reload / stop
+    SERVER_MAX_REQUESTS = 10000  # recycle each worker after this many requests (0 = never)
+    SERVER_MAX_REQUESTS_JITTER = 1000  # so workers don't all restart at once
+
     # Database reset flag (development only)
     RESET_DB = True  # Set to False once database is stable
\ No newline at end of file
@@ -5,9 +5,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app
 from models import db, User
+from services.bootstrap import schema_ready
+
+app = create_app(bootstrap=False)
 
-app = create_app()
 with app.app_context():
+    if not schema_ready():
+        print("❌ Database not set up. Run: python scripts/bootstrap.py")
+        sys.exit(1)
+
     user = User.query.filter_by(email='demo@building.local').first()
     if user:
         user.is_locked = False
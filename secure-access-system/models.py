@@ -1,10 +1,47 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import bcrypt
+from sqlalchemy import event
 from flask_login import UserMixin  # <-- Add this
+from services.hashing import get_hash_pool
 
 db = SQLAlchemy()
 
+# Pragmas that make no sense for an in-memory database
+_FILE_ONLY_PRAGMAS = ("journal_mode", "mmap_size")
+
+
+def init_db(app):
+    """Bind db to the app, applying the selected SQLite engine profile"""
+    profile_name = app.config.get("DB_PROFILE", "default")
+    profile = app.config.get("DB_PROFILES", {}).get(profile_name)
+    if profile is None:
+        raise ValueError(f"Unknown DB_PROFILE: {profile_name}")
+
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    in_memory = uri in ("sqlite://", "sqlite:///:memory:")
+    if uri.startswith("sqlite") and not in_memory:
+        options = dict(profile.get("engine_options", {}))
+        options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    db.init_app(app)
+
+    pragmas = profile.get("pragmas", {})
+    if not pragmas or not uri.startswith("sqlite"):
+        return
+    if in_memory:
+        pragmas = {k: v for k, v in pragmas.items() if k not in _FILE_ONLY_PRAGMAS}
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", set_pragmas)
+
+
 class User(db.Model, UserMixin):  # <-- Inherit from UserMixin
     __tablename__ = "users"
 
@@ -24,13 +61,142 @@ class User(db.Model, UserMixin):  # <-- Inherit from UserMixin
     is_locked = db.Column(db.Boolean, default=False)
     temporary_password = db.Column(db.String(100), nullable=True)
 
+    # Password reset (see web.forgot_password)
+    reset_token = db.Column(db.String(100), nullable=True, index=True)
+    reset_token_expiry = db.Column(db.DateTime, nullable=True)
+
+    # Indexes for the dashboard / user list filters. Existing databases get
+    # them from services/migrations.py, so keep the names in sync there.
+    __table_args__ = (
+        db.Index("ix_users_created_at", "created_at"),
+        db.Index("ix_users_role_created_at", "role", "created_at"),
+        db.Index("ix_users_active_created_at", "is_active", "created_at"),
+        db.Index("ix_users_locked_created_at", "is_locked", "created_at"),
+        db.Index("ix_users_role_active_locked", "role", "is_active", "is_locked", "created_at"),
+    )
+
+    # Hashing runs on the bounded bcrypt pool; both may raise HashingBusy
     def set_password(self, password):
-        hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-        self.password_hash = hashed.decode()
+        self.password_hash = get_hash_pool().hash_password(password)
         self.temporary_password = password
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode(), self.password_hash.encode())
+        return get_hash_pool().check_password(password, self.password_hash)
 
     def __repr__(self):
         return f"<User {self.username} ({self.role})>"
+
+
+class AccessEvent(db.Model):
+    """Append-only audit trail (written in batches by services/audit.py)"""
+    __tablename__ = "access_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(40), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    email = db.Column(db.String(120), nullable=True)
+    actor_id = db.Column(db.Integer, nullable=True)  # who performed it, if not the user
+    channel = db.Column(db.String(10), nullable=True)  # "api" / "web" / "cli"
+    ip_address = db.Column(db.String(45), nullable=True)
+    detail = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_access_events_created_at", "created_at"),
+        db.Index("ix_access_events_user_created_at", "user_id", "created_at"),
+        db.Index("ix_access_events_event_type", "event_type"),
+    )
+
+    def __repr__(self):
+        return f"<AccessEvent {self.event_type} user={self.user_id}>"
+
+
+class TokenRevocation(db.Model):
+    """API tokens for user_id issued before revoked_before are invalid (see services/revocation.py)"""
+    __tablename__ = "token_revocations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    revoked_before = db.Column(db.Integer, nullable=False)  # unix time, compared with the JWT "iat"
+    reason = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # no live token can be older
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Workers sync on id > last seen, so ids must never be reused after a purge
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class PresenceEvent(db.Model):
+    """Wi-Fi / beacon sightings of a resident on site (see services/presence.py)"""
+    __tablename__ = "presence_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # "wifi" or "beacon"
+    seen_at = db.Column(db.Float, nullable=False, index=True)  # unix time reported by the gear
+    source = db.Column(db.String(64), nullable=True)  # access point / beacon id
+
+    # Workers sync on id > last seen while others purge, so ids must never be reused
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class WebSession(db.Model):
+    """Server-side web sessions; the browser only holds the id (see services/sessions.py)"""
+    __tablename__ = "web_sessions"
+
+    sid = db.Column(db.String(43), primary_key=True)  # opaque random id from the cookie
+    user_id = db.Column(db.Integer, nullable=True, index=True)  # for per-user invalidation
+    data = db.Column(db.Text, nullable=False)  # compact JSON
+    expires_at = db.Column(db.Float, nullable=False, index=True)  # unix time
+
+
+class SchemaVersion(db.Model):
+    """Applied schema migrations (see services/migrations.py)"""
+    __tablename__ = "schema_version"
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class UserStat(db.Model):
+    """Pre-computed dashboard counters and the users data version (one row per key)"""
+    __tablename__ = "user_stats"
+
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserStat {self.key}={self.value}>"
+
+
+class DailyRollup(db.Model):
+    """Per-day (UTC) signups and login activity for trend charts (see services/rollups.py)"""
+    __tablename__ = "daily_rollups"
+
+    day = db.Column(db.Date, primary_key=True)
+    signups_management = db.Column(db.Integer, nullable=False, default=0)
+    signups_concierge = db.Column(db.Integer, nullable=False, default=0)
+    signups_resident = db.Column(db.Integer, nullable=False, default=0)
+    logins = db.Column(db.Integer, nullable=False, default=0)
+    login_failures = db.Column(db.Integer, nullable=False, default=0)
+    lockouts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyRollup {self.day}>"
+
+
+class AccessPolicy(db.Model):
+    """Role may open doors in door_group during a weekly time window (see services/access_policy.py)"""
+    __tablename__ = "access_policies"
+
+    id = db.Column(db.Integer, primary_key=True)
+    role = db.Column(db.String(20), nullable=False)
+    door_group = db.Column(db.String(50), nullable=False)
+    days = db.Column(db.String(7), nullable=False, default="0123456")  # weekdays, Monday = 0
+    start_minute = db.Column(db.Integer, nullable=False, default=0)  # minutes after midnight
+    end_minute = db.Column(db.Integer, nullable=False, default=1440)  # exclusive; < start wraps past midnight
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AccessPolicy {self.role} -> {self.door_group} {self.days} {self.start_minute}-{self.end_minute}>"
@@ -3,8 +3,11 @@
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
-from models import db, User
+from models import User
 from config import Config
+from services import audit as events
+from services.audit import audit
+from services.login_guard import throttle_login, record_failed_login, record_successful_login
 
 # Define blueprint FIRST
 auth_bp = Blueprint("auth", __name__, url_prefix="/api")
@@ -22,32 +25,34 @@ def login():
     if not email or not password:
         return jsonify({"error": "Email and password required"}), 400
 
+    # Rate limit per email / client IP before any lookup or bcrypt work
+    wait = throttle_login(email, request.remote_addr)
+    if wait:
+        return jsonify({"error": "Too many login attempts. Try again later."}), 429, {"Retry-After": str(int(wait) + 1)}
+
     user = User.query.filter_by(email=email).first()
 
     # PHASE 1 RESTRICTION: Only demo management can log in
     if email != Config.DEMO_USER_EMAIL:
+        audit(events.LOGIN_FAILURE, user=user, email=email, detail="API login restricted to demo account")
         return jsonify({"error": "Invalid credentials"}), 401
     
     if not user or not user.is_active:
+        audit(events.LOGIN_BLOCKED if user else events.LOGIN_FAILURE, user=user, email=email,
+              detail="inactive account" if user else "unknown account")
         return jsonify({"error": "Invalid credentials"}), 401
 
     # Check if account is locked
     if user.is_locked:
+        audit(events.LOGIN_BLOCKED, user=user, detail="locked account")
         return jsonify({"error": "Account is locked. Contact management."}), 401
 
     if not user.check_password(password):
         # For demo account, don't lock it - just return error
-        if email != Config.DEMO_USER_EMAIL:
-            # For non-demo accounts, track failed attempts
-            user.failed_login_attempts += 1
-            if user.failed_login_attempts >= 3:
-                user.is_locked = True
-        db.session.commit()
+        record_failed_login(user, lockable=email != Config.DEMO_USER_EMAIL)
         return jsonify({"error": "Invalid credentials"}), 401
 
-    # Reset failed attempts on successful login
-    user.failed_login_attempts = 0
-    db.session.commit()
+    record_successful_login(user)
 
     access_token = create_access_token(
         identity=str(user.id),
@@ -0,0 +1,116 @@
+# routes/keys.py
+# Virtual door keys: issuance, public keys and door-side verification
+
+import hmac
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from models import db, User
+from services.virtual_keys import InvalidKey, export_public_keys, get_signers, get_verifier
+from services.revocation import revocation_list
+from services.access_policy import policy, ISSUE_KEYS_FOR_OTHERS
+from services.presence import presence
+from services import audit as events
+from services.audit import audit
+
+keys_bp = Blueprint("keys", __name__, url_prefix="/api/keys")
+
+@keys_bp.route("/issue", methods=["POST"])
+@jwt_required()
+def issue_key():
+    requester_id = int(get_jwt_identity())
+    requester_role = get_jwt()["role"]
+
+    data = request.get_json(silent=True) or {}
+    door_group = data.get("door_group")
+    if door_group not in current_app.config["DOOR_GROUPS"]:
+        return jsonify({"error": "Unknown door group"}), 400
+
+    # Residents get keys for themselves; staff may issue for anyone
+    target_id = data.get("user_id", requester_id)
+    try:
+        target_id = int(target_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid user_id"}), 400
+    if target_id != requester_id and not policy.allows(requester_role, ISSUE_KEYS_FOR_OTHERS):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    user = db.session.get(User, target_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    if not user.is_active or user.is_locked:
+        return jsonify({"error": "Account is inactive or locked"}), 403
+    if door_group not in policy.door_groups_for(user.role):
+        return jsonify({"error": "No access to this door group"}), 403
+
+    token, key = get_signers()[0].issue(user.id, door_group, user.role)
+    audit(events.VIRTUAL_KEY_ISSUED, user=user, actor_id=requester_id,
+          detail=f"door_group={door_group} key={key.key_id}")
+
+    return jsonify({
+        "key": token,
+        "key_id": key.key_id,
+        "user_id": user.id,
+        "door_group": door_group,
+        "expires_at": key.expires_at
+    }), 201
+
+@keys_bp.route("/public-keys", methods=["GET"])
+def public_keys():
+    # Door controllers fetch these once and verify keys offline
+    return jsonify({"keys": export_public_keys(get_signers())})
+
+@keys_bp.route("/verify", methods=["POST"])
+def verify_key():
+    """
+    Door-side check of a presented key (X-Door-Token header):
+    {"key": "...", "door_group": "main-entrance"}
+    """
+    # Only door controllers may ask: every answer is an audited door event
+    # that the detector and the daily rollups count
+    expected = current_app.config.get("DOOR_CONTROLLER_TOKEN")
+    if not expected:
+        return jsonify({"error": "Door verification is not configured"}), 503
+    supplied = request.headers.get("X-Door-Token", "")
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    token = data.get("key")
+    if not token:
+        return jsonify({"valid": False, "reason": "missing key"}), 400
+    # The door asking must say which group it belongs to, or a key for any
+    # door would open it
+    door_group = data.get("door_group")
+    if door_group not in current_app.config["DOOR_GROUPS"]:
+        return jsonify({"valid": False, "reason": "unknown door group"}), 400
+
+    # Signature + expiry + door check against cached public keys, then the
+    # in-memory revocation cutoffs (deactivation / password reset), the
+    # compiled access policy for the key's role at this time of day and,
+    # if required, the in-memory presence table. Every decision is audited
+    # so the suspicious-access detector sees the door stream.
+    try:
+        key = get_verifier().verify(token, door_group=door_group)
+    except InvalidKey as e:
+        return _deny(str(e))
+    if revocation_list.is_revoked(key.user_id, key.issued_at):
+        return _deny("key revoked", key)
+    if not policy.can_role(key.role, key.door_group):
+        return _deny("outside access hours", key)
+    if current_app.config.get("PRESENCE_REQUIRED_FOR_ACCESS") and not presence.is_on_site(key.user_id):
+        return _deny("resident not on site", key)
+
+    audit(events.DOOR_ACCESS_GRANTED, user_id=key.user_id, detail=f"door_group={key.door_group}")
+    return jsonify({
+        "valid": True,
+        "user_id": key.user_id,
+        "door_group": key.door_group,
+        "expires_at": key.expires_at
+    })
+
+def _deny(reason, key=None):
+    if key is None:
+        audit(events.DOOR_ACCESS_DENIED, detail=reason)
+    else:
+        audit(events.DOOR_ACCESS_DENIED, user_id=key.user_id, detail=f"{reason} door_group={key.door_group}")
+    return jsonify({"valid": False, "reason": reason}), 403
@@ -0,0 +1,79 @@
+# routes/policies.py
+# Door access policy rows (management only); edits apply without a restart
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt
+from models import db, AccessPolicy
+from services.access_policy import policy, MANAGE_POLICIES, MINUTES_PER_DAY
+
+policies_bp = Blueprint("policies", __name__, url_prefix="/api/policies")
+
+def _policy_to_dict(row):
+    return {
+        "id": row.id,
+        "role": row.role,
+        "door_group": row.door_group,
+        "days": row.days,
+        "start_minute": row.start_minute,
+        "end_minute": row.end_minute
+    }
+
+def _forbidden():
+    if not policy.allows(get_jwt()["role"], MANAGE_POLICIES):
+        return jsonify({"error": "Only management can manage access policies"}), 403
+    return None
+
+@policies_bp.route("", methods=["GET"])
+@jwt_required()
+def list_policies():
+    denied = _forbidden()
+    if denied:
+        return denied
+    rows = AccessPolicy.query.order_by(AccessPolicy.role, AccessPolicy.door_group, AccessPolicy.id).all()
+    return jsonify({"policies": [_policy_to_dict(row) for row in rows]})
+
+@policies_bp.route("", methods=["POST"])
+@jwt_required()
+def create_policy():
+    denied = _forbidden()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    role = data.get("role")
+    door_group = data.get("door_group")
+    days = str(data.get("days", "0123456"))
+    try:
+        start_minute = int(data.get("start_minute", 0))
+        end_minute = int(data.get("end_minute", MINUTES_PER_DAY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "start_minute and end_minute must be integers"}), 400
+
+    if not role or not door_group:
+        return jsonify({"error": "Missing required fields"}), 400
+    if door_group != "*" and door_group not in current_app.config["DOOR_GROUPS"]:
+        return jsonify({"error": "Unknown door group"}), 400
+    if not days or any(d not in "0123456" for d in days):
+        return jsonify({"error": "days must be weekday digits 0-6 (Monday = 0)"}), 400
+    if not (0 <= start_minute <= MINUTES_PER_DAY and 0 <= end_minute <= MINUTES_PER_DAY):
+        return jsonify({"error": f"Minutes must be between 0 and {MINUTES_PER_DAY}"}), 400
+
+    row = AccessPolicy(role=role, door_group=door_group, days=days,
+                       start_minute=start_minute, end_minute=end_minute)
+    db.session.add(row)
+    db.session.commit()
+    return jsonify({"message": "Policy created", "policy": _policy_to_dict(row)}), 201
+
+@policies_bp.route("/<int:policy_id>", methods=["DELETE"])
+@jwt_required()
+def delete_policy(policy_id):
+    denied = _forbidden()
+    if denied:
+        return denied
+
+    row = AccessPolicy.query.get(policy_id)
+    if not row:
+        return jsonify({"error": "Policy not found"}), 404
+    db.session.delete(row)
+    db.session.commit()
+    return jsonify({"message": "Policy deleted"})
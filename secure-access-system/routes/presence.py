@@ -0,0 +1,42 @@
+# routes/presence.py
+# Presence ingestion from on-site network gear, and presence lookups
+
+import hmac
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt
+from services.presence import presence
+from services.access_policy import policy, LIST_USERS
+
+presence_bp = Blueprint("presence", __name__, url_prefix="/api/presence")
+
+@presence_bp.route("/events", methods=["POST"])
+def ingest_events():
+    """
+    Batch of sightings from the gear (X-Presence-Token header):
+    {"events": [{"user_id": 12, "kind": "wifi" | "beacon", "ts": 1760000000.5, "source": "ap-lobby"}]}
+    "ts" is unix time and defaults to now.
+    """
+    expected = current_app.config.get("PRESENCE_INGEST_TOKEN")
+    if not expected:
+        return jsonify({"error": "Presence ingestion is not configured"}), 503
+    supplied = request.headers.get("X-Presence-Token", "")
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    events = data.get("events")
+    if not isinstance(events, list):
+        return jsonify({"error": "'events' must be a list"}), 400
+    if len(events) > presence.max_batch:
+        return jsonify({"error": f"At most {presence.max_batch} events per request"}), 413
+
+    rows, errors = presence.parse_events(events)
+    accepted = presence.record(rows)
+    return jsonify({"accepted": accepted, "rejected": len(errors), "errors": errors[:20]}), 200
+
+@presence_bp.route("/<int:user_id>", methods=["GET"])
+@jwt_required()
+def presence_status(user_id):
+    if not policy.allows(get_jwt()["role"], LIST_USERS):
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(presence.status(user_id))
@@ -1,31 +1,20 @@
 # routes/users.py
 # Management / Concierge user creation
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from models import db, User
-import secrets
-import string
+from services.pagination import parse_list_args, fetch_page, stream_users_json, user_to_dict
+from services.identity_cache import identity_cache
+from services.access_policy import policy, CREATE_USERS, IMPORT_USERS, LIST_USERS, UNLOCK_USERS
+from services import audit as events
+from services.audit import audit
+from services.bulk_import import import_users, read_rows, detect_format, ImportFormatError, ImportTooLarge, FORMATS
+from services.bulk_admin import bulk_update, parse_targets, ACTIONS
+from utils import generate_password, generate_username, save_new_user
 
 users_bp = Blueprint("users", __name__, url_prefix="/api/users")
 
-def generate_password(length=10):
-    chars = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(length))
-
-def generate_username(first_name, last_name):
-    """Generate username as first.last"""
-    base = f"{first_name.lower()}.{last_name.lower()}"
-    username = base
-    
-    # Check if username exists, add number if it does
-    counter = 1
-    while User.query.filter_by(username=username).first():
-        username = f"{base}{counter}"
-        counter += 1
-    
-    return username
-
 @users_bp.route("/create", methods=["POST"])
 @jwt_required()
 def create_user():
@@ -46,14 +35,10 @@ def create_user():
         return jsonify({"error": "Missing required fields"}), 400
 
     # Role enforcement
-    if creator_role == "management":
-        allowed_roles = ["concierge", "resident"]
-    elif creator_role == "concierge":
-        allowed_roles = ["resident"]
-    else:
+    if not policy.allows(creator_role, CREATE_USERS):
         return jsonify({"error": "Unauthorized"}), 403
 
-    if role not in allowed_roles:
+    if role not in policy.creatable_roles(creator_role):
         return jsonify({"error": "Role not permitted"}), 403
 
     if User.query.filter_by(email=email).first():
@@ -72,8 +57,8 @@ def create_user():
     )
     user.set_password(temp_password)  # This also stores temp_password in DB
 
-    db.session.add(user)
-    db.session.commit()
+    save_new_user(user)
+    audit(events.USER_CREATED, user=user, actor_id=int(user_id), detail=f"role={role}")
 
     return jsonify({
         "message": "User created successfully",
@@ -88,43 +73,99 @@ def create_user():
         }
     }), 201
 
+@users_bp.route("/import", methods=["POST"])
+@jwt_required()
+def bulk_import():
+    """
+    Bulk-create users from CSV or NDJSON (columns: first_name, last_name, email, role)
+
+    Send the file as the request body, or as a multipart field named "file".
+    The format comes from ?format=csv|ndjson, else from the content type.
+    Files over BULK_IMPORT_MAX_ROWS rows get 413; import those with
+    scripts/import_users.py.
+    """
+    claims = get_jwt()
+    creator_role = claims["role"]
+    if not policy.allows(creator_role, IMPORT_USERS):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    upload = request.files.get("file")
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get("format") or detect_format(upload.mimetype, upload.filename)
+    else:
+        stream = request.stream
+        fmt = request.args.get("format") or detect_format(request.content_type)
+
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Format must be one of: {', '.join(FORMATS)}"}), 400
+
+    try:
+        report = import_users(read_rows(stream, fmt), creator_role, actor_id=int(get_jwt_identity()),
+                              max_rows=current_app.config["BULK_IMPORT_MAX_ROWS"])
+    except ImportTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ImportFormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = 201 if report["created"] else 200
+    return jsonify(report), status
+
 @users_bp.route("/list", methods=["GET"])
 @jwt_required()
 def list_users():
-    """List all users (management can see all, concierge only see residents)"""
+    """
+    List users one page at a time (management can see all, concierge only see residents)
+
+    Query params: q, role, active, locked, sort (created_at|id), limit, cursor.
+    With q, results are ranked search matches (see search_users).
+    Pass stream=1 to stream every matching user instead of a single page.
+    """
     claims = get_jwt()
     role = claims["role"]
     
-    if role == "management":
-        users = User.query.all()
-    elif role == "concierge":
-        users = User.query.filter_by(role="resident").all()
-    else:
+    if not policy.allows(role, LIST_USERS):
         return jsonify({"error": "Unauthorized"}), 403
-    
-    user_list = []
-    for user in users:
-        user_list.append({
-            "id": user.id,
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "email": user.email,
-            "role": user.role,
-            "is_active": user.is_active,
-            "is_locked": user.is_locked,
-            "failed_login_attempts": user.failed_login_attempts,
-            "created_at": user.created_at.isoformat() if user.created_at else None
-        })
-    
-    return jsonify({"users": user_list}), 200
+    query = User.query
+    visible = policy.visible_roles(role)
+    if visible is not None:
+        query = query.filter(User.role.in_(visible))
+
+    try:
+        options = parse_list_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("stream") in ("1", "true"):
+        return Response(
+            stream_with_context(stream_users_json(query, options)),
+            mimetype="application/json"
+        )
+
+    users, next_cursor = fetch_page(query, options)
+    return jsonify({
+        "users": [user_to_dict(user) for user in users],
+        "next_cursor": next_cursor
+    }), 200
+
+@users_bp.route("/search", methods=["GET"])
+@jwt_required()
+def search_users():
+    """
+    Find users by partial name, username or email, best match first
+
+    Query params: q (required), role, active, locked, limit, cursor.
+    """
+    if not (request.args.get("q") or "").strip():
+        return jsonify({"error": "Missing search text 'q'"}), 400
+    return list_users()
 
 @users_bp.route("/unlock", methods=["POST"])
 @jwt_required()
 def unlock_user():
     """Unlock a locked user account (management only)"""
     claims = get_jwt()
-    if claims["role"] != "management":
+    if not policy.allows(claims["role"], UNLOCK_USERS):
         return jsonify({"error": "Only management can unlock accounts"}), 403
     
     data = request.get_json()
@@ -140,6 +181,8 @@ def unlock_user():
     user.is_locked = False
     user.failed_login_attempts = 0
     db.session.commit()
+    identity_cache.invalidate(user.id)
+    audit(events.ACCOUNT_UNLOCKED, user=user, actor_id=int(get_jwt_identity()))
     
     return jsonify({
         "message": "Account unlocked successfully",
@@ -149,4 +192,23 @@ def unlock_user():
             "is_locked": user.is_locked,
             "failed_attempts": user.failed_login_attempts
         }
-    }), 200
\ No newline at end of file
+    }), 200
+
+@users_bp.route("/bulk/<action>", methods=["POST"])
+@jwt_required()
+def bulk_action(action):
+    """
+    Unlock, activate or deactivate many users in one transaction:
+    {"ids": [12, 13]} or {"filters": {"q": ..., "role": ..., "active": ..., "locked": ...}}
+    Only users the action changes are updated; returns their count and ids.
+    """
+    if action not in ACTIONS:
+        return jsonify({"error": f"Action must be one of: {', '.join(ACTIONS)}"}), 404
+    try:
+        ids, filters = parse_targets(request.get_json(silent=True))
+        result = bulk_update(action, int(get_jwt_identity()), get_jwt()["role"], ids=ids, filters=filters)
+    except PermissionError:
+        return jsonify({"error": "Unauthorized"}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result), 200
@@ -1,10 +1,25 @@
 # routes/web.py
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, Response, current_app
 from models import db, User
 from datetime import datetime, timedelta
 from flask_jwt_extended import create_access_token
+from services.stats import get_user_stats
+from services.change_feed import dashboard_event_stream, stream_slots
+from services.pagination import parse_list_args, fetch_page
+from services.data_version import users_version, clock_bucket, conditional_json, fragment_cache
+from services.identity_cache import identity_cache
+from services.revocation import revoke_user_tokens
+from services import audit as events
+from services.audit import audit
+from services.access_policy import policy, CREATE_USERS, UNLOCK_USERS, TOGGLE_USERS, VIEW_SECURITY_ALERTS, VIEW_TRENDS
+from services.detector import recent_alerts
+from services.rollups import daily_trends, TREND_RANGES
+from services.sessions import start_session, end_user_sessions
+from services.bulk_admin import bulk_update, parse_targets, allowed_actions, ACTIONS
+from services.login_guard import throttle_login, record_failed_login, record_successful_login
+from utils import generate_password, generate_username, save_new_user
 import secrets
-import string
+from markupsafe import Markup
 
 web_bp = Blueprint("web", __name__)
 
@@ -15,27 +30,15 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('web.login'))
+
+        # Deactivated or deleted accounts are signed out on their next request
+        user = identity_cache.get(session['user_id'])
+        if not user or not user.is_active:
+            session.clear()
+            return redirect(url_for('web.login'))
         return f(*args, **kwargs)
     return decorated_function
 
-# Helper functions for password and username generation
-def generate_password(length=10):
-    chars = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(length))
-
-def generate_username(first_name, last_name):
-    """Generate username as first.last"""
-    base = f"{first_name.lower()}.{last_name.lower()}"
-    username = base
-    
-    # Check if username exists, add number if it does
-    counter = 1
-    while User.query.filter_by(username=username).first():
-        username = f"{base}{counter}"
-        counter += 1
-    
-    return username
-
 @web_bp.route("/")
 def home():
     return redirect(url_for("web.login"))
@@ -52,29 +55,36 @@ def login():
     if not email or not password:
         return render_template("login.html", error="Email and password required")
 
+    # Rate limit per email / client IP before any lookup or bcrypt work
+    wait = throttle_login(email, request.remote_addr)
+    if wait:
+        return render_template(
+            "login.html",
+            error=f"Too many login attempts. Try again in {int(wait) + 1} seconds."
+        ), 429
+
     user = User.query.filter_by(email=email).first()
 
     if not user:
+        audit(events.LOGIN_FAILURE, email=email, detail="unknown account")
         return render_template("login.html", error="Invalid credentials")
     
     if not user.is_active:
+        audit(events.LOGIN_BLOCKED, user=user, detail="inactive account")
         return render_template("login.html", error="Account is deactivated")
     
     if user.is_locked:
+        audit(events.LOGIN_BLOCKED, user=user, detail="locked account")
         return render_template("login.html", error="Account is locked. Contact management.")
 
     # Check password
     if not user.check_password(password):
-        # Increment failed attempts
-        user.failed_login_attempts += 1
-        if user.failed_login_attempts >= 3:
-            user.is_locked = True
-        db.session.commit()
+        # Count the failure; locks the account at the threshold
+        record_failed_login(user)
         return render_template("login.html", error="Invalid credentials")
     
     # SUCCESSFUL LOGIN
-    user.failed_login_attempts = 0
-    db.session.commit()
+    record_successful_login(user)
     
     # Create JWT token (for API if needed)
     access_token = create_access_token(
@@ -82,12 +92,15 @@ def login():
         additional_claims={"role": user.role}
     )
     
-    # Store user info in session (OUR method, not Flask-Login)
-    session['user_id'] = user.id
-    session['user_role'] = user.role
-    session['user_name'] = f"{user.first_name} {user.last_name}"
-    session['user_email'] = user.email
-    session['jwt_token'] = access_token
+    # Store user info in session (OUR method, not Flask-Login); server-side
+    # sessions get a new id here
+    start_session(
+        user_id=user.id,
+        user_role=user.role,
+        user_name=f"{user.first_name} {user.last_name}",
+        user_email=user.email,
+        jwt_token=access_token,
+    )
     
     return redirect(url_for("web.dashboard"))
 
@@ -95,57 +108,106 @@ def login():
 @web_bp.route("/dashboard")
 @login_required
 def dashboard():
-    users = User.query.order_by(User.created_at.desc()).all()
-
-    # Initial values (page loads instantly, JS updates later)
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    locked_users = User.query.filter_by(is_locked=True).count()
-
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_users = User.query.filter(User.created_at >= week_ago).count()
+    # Stats cards and the recent-users table are rendered once per data
+    # version (the stats also per minute, "new in 7 days" moves with time)
+    version = users_version()
+    stats_cards = fragment_cache.get_or_render(
+        "dashboard_stats", version, (clock_bucket(),),
+        lambda: Markup(render_template("_dashboard_stats.html", **get_user_stats()))
+    )
+    recent_user_rows = fragment_cache.get_or_render(
+        "recent_user_rows", version, (),
+        lambda: Markup(render_template("_recent_user_rows.html", users=_latest_users()))
+    )
     
     # Get current user role for display
     user_role = session.get('user_role', 'guest')
     user_name = session.get('user_name', 'User')
 
+    # Security alerts are for management only (one indexed query)
+    alerts = recent_alerts() if policy.allows(user_role, VIEW_SECURITY_ALERTS) else None
+    # Trend charts are filled in by the browser from /api/dashboard/trends
+    trend_ranges = TREND_RANGES if policy.allows(user_role, VIEW_TRENDS) else None
+
     return render_template(
         "dashboard.html",
-        users=users,
-        total_users=total_users,
-        active_users=active_users,
-        locked_users=locked_users,
-        recent_users=recent_users,
+        stats_cards=stats_cards,
+        recent_user_rows=recent_user_rows,
+        alerts=alerts,
+        trend_ranges=trend_ranges,
         user_role=user_role,
         user_name=user_name
     )
 
 
+def _latest_users():
+    # Only the latest few rows are shown on the dashboard
+    return User.query.order_by(User.created_at.desc()).limit(5).all()
+
+
 # ---------------- API ENDPOINTS ----------------
 
 @web_bp.route("/api/dashboard/stats")
 @login_required
 def dashboard_stats():
-    week_ago = datetime.utcnow() - timedelta(days=7)
+    return conditional_json("stats", get_user_stats, clock_bucket())
 
-    return jsonify({
-        "total_users": User.query.count(),
-        "active_users": User.query.filter_by(is_active=True).count(),
-        "locked_users": User.query.filter_by(is_locked=True).count(),
-        "recent_users": User.query.filter(User.created_at >= week_ago).count(),
-        "management_count": User.query.filter_by(role="management").count(),
-        "concierge_count": User.query.filter_by(role="concierge").count(),
-        "resident_count": User.query.filter_by(role="resident").count()
-    })
+
+@web_bp.route("/api/dashboard/stream")
+@login_required
+def dashboard_stream():
+    """Push stat changes, new users and security alerts to the dashboard (Server-Sent Events)"""
+    config = current_app.config
+    # Each open stream holds a request thread; beyond the limit the page polls
+    if not stream_slots.acquire(config.get("DASHBOARD_STREAMS_PER_WORKER", 2)):
+        return jsonify({"error": "Too many live dashboards, poll instead"}), 503, {"Retry-After": "30"}
+
+    include_alerts = policy.allows(session.get('user_role'), VIEW_SECURITY_ALERTS)
+    stream = dashboard_event_stream(
+        current_app._get_current_object(), get_user_stats, users_version,
+        poll_seconds=config.get("DASHBOARD_STREAM_POLL_SECONDS", 5),
+        max_seconds=config.get("DASHBOARD_STREAM_MAX_SECONDS", 300),
+        include_alerts=include_alerts,
+    )
+    response = Response(
+        stream,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(stream_slots.release)
+    return response
+
+
+@web_bp.route("/api/dashboard/alerts")
+@login_required
+def security_alerts_api():
+    if not policy.allows(session.get('user_role'), VIEW_SECURITY_ALERTS):
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify({"alerts": recent_alerts()})
+
+
+@web_bp.route("/api/dashboard/trends")
+@login_required
+def trends_api():
+    """Per-day signups and login activity for the trend charts (?days=30 or 365)"""
+    if not policy.allows(session.get('user_role'), VIEW_TRENDS):
+        return jsonify({"error": "Unauthorized"}), 403
+    days = request.args.get("days", TREND_RANGES[0], type=int)
+    if days not in TREND_RANGES:
+        return jsonify({"error": f"days must be one of: {', '.join(map(str, TREND_RANGES))}"}), 400
+    # At most a year of pre-aggregated rows, read by primary key
+    return jsonify(daily_trends(days))
 
 
 @web_bp.route("/api/dashboard/recent-users")
 @login_required
 def recent_users_api():
-    users = User.query.order_by(User.created_at.desc()).limit(5).all()
+    return conditional_json("recent_users_web", _recent_users_payload)
+
 
+def _recent_users_payload():
     result = []
-    for user in users:
+    for user in _latest_users():
         if user.is_locked:
             status = "locked"
         elif not user.is_active:
@@ -161,15 +223,62 @@ def recent_users_api():
             "created": user.created_at.strftime("%Y-%m-%d") if user.created_at else "N/A"
         })
 
-    return jsonify({"users": result})
+    return {"users": result}
 
 
 @web_bp.route("/users")
 @login_required
 def users_list():
-    users = User.query.all()
-    return render_template("users.html", users=users)
+    try:
+        options = parse_list_args(request.args)
+    except ValueError as e:
+        return render_template("error.html", error=str(e))
+
+    # First page only; the rest is fetched on demand from web.users_page
+    version = users_version()
+    # Rows get a selection checkbox when the bulk controls are shown
+    bulk_actions = allowed_actions(session.get('user_role'))
+    user_rows, next_cursor = _cached_user_rows(version, options, bool(bulk_actions))
+    stats_cards = fragment_cache.get_or_render(
+        "user_stats", version, (),
+        lambda: Markup(render_template("_user_stats.html", stats=get_user_stats()))
+    )
+    return render_template(
+        "users.html",
+        user_rows=user_rows,
+        next_cursor=next_cursor,
+        bulk_actions=bulk_actions,
+        stats_cards=stats_cards,
+        filters=request.args
+    )
+
+
+@web_bp.route("/users/page")
+@login_required
+def users_page():
+    """Next page of rows for users.html, as an HTML fragment plus cursor"""
+    try:
+        options = parse_list_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    selectable = bool(allowed_actions(session.get('user_role')))
+    html, next_cursor = _cached_user_rows(users_version(), options, selectable)
+    return jsonify({
+        "html": html,
+        "next_cursor": next_cursor
+    })
+
 
+def _cached_user_rows(version, options, selectable=False):
+    """Rendered rows + next cursor for one page, cached per data version and filters"""
+    def render():
+        users, next_cursor = fetch_page(User.query, options)
+        html = render_template("_user_rows.html", users=users, selectable=selectable)
+        return Markup(html), next_cursor
+
+    parts = (repr(sorted(options.items())), selectable)
+    return fragment_cache.get_or_render("user_rows", version, parts, render)
 
 @web_bp.route("/users/toggle/<int:user_id>")
 @login_required
@@ -177,8 +286,7 @@ def toggle_user(user_id):  # CHANGED FROM toggle_user_activation
     user = User.query.get_or_404(user_id)
     
     # Check if current user has permission (only management)
-    current_user_role = session.get('user_role')
-    if current_user_role != 'management':
+    if not policy.allows(session.get('user_role'), TOGGLE_USERS):
         return render_template("error.html", 
                              error="Only management can activate/deactivate users")
     
@@ -191,9 +299,32 @@ def toggle_user(user_id):  # CHANGED FROM toggle_user_activation
         user.failed_login_attempts = 0
 
     db.session.commit()
+    identity_cache.invalidate(user.id)
+    if not user.is_active:
+        # Cut off API access and web sessions now rather than when they expire
+        revoke_user_tokens(user.id, reason="deactivated")
+        end_user_sessions(user.id)
+    audit(events.USER_ACTIVATED if user.is_active else events.USER_DEACTIVATED,
+          user=user, actor_id=session.get('user_id'))
     return redirect(url_for("web.users_list"))
 
 
+@web_bp.route("/users/bulk/<action>", methods=["POST"])
+@login_required
+def bulk_users(action):
+    """Bulk controls on users.html (JSON body as for /api/users/bulk/<action>)"""
+    if action not in ACTIONS:
+        return jsonify({"error": f"Action must be one of: {', '.join(ACTIONS)}"}), 404
+    try:
+        ids, filters = parse_targets(request.get_json(silent=True))
+        result = bulk_update(action, session.get('user_id'), session.get('user_role'), ids=ids, filters=filters)
+    except PermissionError:
+        return jsonify({"error": "Only management can change accounts in bulk"}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
 @web_bp.route("/create-user", methods=["GET", "POST"])
 @login_required
 def create_user():
@@ -201,13 +332,14 @@ def create_user():
     current_user_role = session.get('user_role')
     
     # Check permissions
-    if current_user_role not in ['management', 'concierge']:
+    if not policy.allows(current_user_role, CREATE_USERS):
         return render_template("error.html", 
                              error="You don't have permission to create users")
 
+    # Roles the current user may create
+    allowed_roles = policy.creatable_roles(current_user_role)
+
     if request.method == "GET":
-        # Determine allowed roles based on current user's role
-        allowed_roles = ['resident'] if current_user_role == 'concierge' else ['concierge', 'resident']
         return render_template("create_user.html", allowed_roles=allowed_roles)
 
     # Handle POST request
@@ -218,23 +350,21 @@ def create_user():
 
     # Validate inputs
     if not all([first_name, last_name, email, role]):
-        allowed_roles = ['resident'] if current_user_role == 'concierge' else ['concierge', 'resident']
         return render_template("create_user.html", 
                              error="All fields required",
                              allowed_roles=allowed_roles)
 
     # Check if user already exists
     if User.query.filter_by(email=email).first():
-        allowed_roles = ['resident'] if current_user_role == 'concierge' else ['concierge', 'resident']
         return render_template("create_user.html", 
                              error="User already exists",
                              allowed_roles=allowed_roles)
     
     # Enforce role permissions
-    if current_user_role == 'concierge' and role != 'resident':
+    if role not in allowed_roles:
         return render_template("create_user.html", 
-                             error="Concierge can only create resident accounts",
-                             allowed_roles=['resident'])
+                             error=f"{current_user_role.title()} can only create {' / '.join(allowed_roles)} accounts",
+                             allowed_roles=allowed_roles)
 
     # Generate credentials
     password = generate_password()
@@ -250,16 +380,15 @@ def create_user():
     )
     user.set_password(password)
 
-    db.session.add(user)
-    db.session.commit()
+    save_new_user(user)
+    audit(events.USER_CREATED, user=user, actor_id=session.get('user_id'), detail=f"role={role}")
 
     # Show success with credentials
-    allowed_roles = ['resident'] if current_user_role == 'concierge' else ['concierge', 'resident']
     return render_template(
         "create_user.html",
         success=True,
         user_data={
-            "username": username,
+            "username": user.username,
             "email": email,
             "role": role,
             "temp_password": password
@@ -306,8 +435,7 @@ def reset_password_with_token(token):
 @web_bp.route("/profile")
 @login_required
 def profile():
-    user_id = session.get('user_id')
-    user = User.query.get(user_id)
+    user = identity_cache.get(session.get('user_id'))
     
     if not user:
         session.clear()
@@ -351,6 +479,11 @@ def reset_password():
     user.set_password(new_password)
     user.temporary_password = None  # Clear temporary password
     db.session.commit()
+    identity_cache.invalidate(user.id)
+    revoke_user_tokens(user.id, reason="password changed")
+    # Sign out every other browser; this one stays signed in
+    end_user_sessions(user.id, keep_current=True)
+    audit(events.PASSWORD_CHANGED, user=user)
     
     return render_template("reset_password.html", 
                          success="Password updated successfully!")
@@ -360,8 +493,7 @@ def reset_password():
 @login_required
 def unlock_user(user_id):
     # Check if current user has permission (only management)
-    current_user_role = session.get('user_role')
-    if current_user_role != 'management':
+    if not policy.allows(session.get('user_role'), UNLOCK_USERS):
         return render_template("error.html", 
                              error="Only management can unlock accounts")
     
@@ -370,6 +502,8 @@ def unlock_user(user_id):
         user.is_locked = False
         user.failed_login_attempts = 0
         db.session.commit()
+        identity_cache.invalidate(user.id)
+        audit(events.ACCOUNT_UNLOCKED, user=user, actor_id=session.get('user_id'))
     return redirect(url_for("web.users_list"))
 
 
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily rollups behind the dashboard trend charts
+Run: python scripts/backfill_rollups.py [--days 365]
+
+Recounts signups by role (from users) and logins, failed logins and
+lockouts (from the audit log) per UTC day and rewrites those days in
+daily_rollups. Without --days every day on record is rebuilt. Normally
+only needed after importing history or restoring a backup; the rollups
+are kept current as events happen. Safe to run while the app is serving.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.bootstrap import schema_ready
+from services.rollups import backfill
+
+parser = argparse.ArgumentParser(description="Rebuild the daily rollups behind the dashboard trend charts")
+parser.add_argument("--days", type=int, help="only the last N days (default: all history)")
+args = parser.parse_args()
+
+if args.days is not None and args.days < 1:
+    parser.error("--days must be at least 1")
+
+start = time.perf_counter()
+app = create_app(bootstrap=False)
+
+with app.app_context():
+    if not schema_ready():
+        print("❌ Database not set up. Run: python scripts/bootstrap.py")
+        sys.exit(1)
+    written = backfill(days=args.days)
+
+print("\n" + "=" * 50)
+print("DAILY ROLLUP BACKFILL")
+print("=" * 50)
+print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+print(f"Range: {'last ' + str(args.days) + ' days' if args.days else 'all history'}")
+print(f"Days with activity: {written}")
+print(f"✅ Done in {time.perf_counter() - start:.2f}s")
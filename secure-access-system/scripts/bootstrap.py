@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Create / upgrade the database and seed it (run once per deploy)
+Run: python scripts/bootstrap.py [--no-seed]
+
+Creates missing tables, applies pending migrations, purges expired token
+revocations, presence sightings and web sessions, backfills the daily
+rollups if that table is empty and, unless --no-seed is given,
+creates the demo / backup admin accounts, the default door access rules
+and the virtual-key signing key. Safe to run repeatedly.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.bootstrap import bootstrap
+
+parser = argparse.ArgumentParser(description="Create / upgrade the database and seed it")
+parser.add_argument("--no-seed", action="store_true", help="schema and migrations only")
+args = parser.parse_args()
+
+start = time.perf_counter()
+app = create_app(bootstrap=False)
+result = bootstrap(app, seed=not args.no_seed)
+
+print("\n" + "=" * 50)
+print("DATABASE BOOTSTRAP")
+print("=" * 50)
+print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+print(f"Migrations applied: {len(result['migrations'])}")
+print(f"Accounts created: {len(result['accounts'])}")
+print(f"Rollup days backfilled: {result['rolled_up_days']}")
+print(f"✅ Done in {time.perf_counter() - start:.2f}s")
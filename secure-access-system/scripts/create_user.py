@@ -8,12 +8,19 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app
-from models import db, User
-from routes.users import generate_password, generate_username
+from models import User
+from utils import generate_password, generate_username, save_new_user
+from services import audit as events
+from services.audit import audit
+from services.bootstrap import schema_ready
 
-app = create_app()
+app = create_app(bootstrap=False)
 
 with app.app_context():
+    if not schema_ready():
+        print("❌ Database not set up. Run: python scripts/bootstrap.py")
+        sys.exit(1)
+
     print("\n" + "="*50)
     print("INTERNAL USER CREATION TOOL")
     print("="*50)
@@ -68,11 +75,11 @@ with app.app_context():
     )
     user.set_password(temp_password)
     
-    db.session.add(user)
-    db.session.commit()
+    save_new_user(user)
+    audit(events.USER_CREATED, user=user, detail=f"role={role} (created as {creator_role})")
     
     print(f"\n✅ User created successfully!")
-    print(f"   Username: {username}")
+    print(f"   Username: {user.username}")
     print(f"   Email: {email}")
     print(f"   Role: {role}")
     print(f"   Temporary Password: {temp_password}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Terminal script for bulk-importing users (internal use only)
+Run: python scripts/import_users.py residents.csv [--as management] [--report report.json]
+
+The file needs the columns first_name, last_name, email, role (CSV header
+or NDJSON keys). Unlike POST /api/users/import there is no row limit; at
+12 bcrypt rounds expect roughly 0.3s per row per hashing worker.
+
+The report contains the temporary password of every created user, so
+store it somewhere safe and delete it after hand-out.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.bulk_import import import_users, read_rows, detect_format, ImportFormatError, FORMATS
+from services.access_policy import PERMISSIONS, IMPORT_USERS
+from services.bootstrap import schema_ready
+
+parser = argparse.ArgumentParser(description="Bulk-import users from CSV or NDJSON")
+parser.add_argument("path", help="CSV or NDJSON file ('-' for stdin)")
+parser.add_argument("--as", dest="creator_role", choices=sorted(role for role, actions in PERMISSIONS.items() if IMPORT_USERS in actions), default="management",
+                    help="role whose permissions apply (default: management)")
+parser.add_argument("--format", choices=FORMATS, help="file format (default: from the file extension)")
+parser.add_argument("--report", help="write the per-row report (JSON) to this file")
+args = parser.parse_args()
+
+fmt = args.format or detect_format(None, args.path)
+
+app = create_app(bootstrap=False)
+
+with app.app_context():
+    if not schema_ready():
+        print("❌ Database not set up. Run: python scripts/bootstrap.py")
+        sys.exit(1)
+
+    print("\n" + "="*50)
+    print("BULK USER IMPORT")
+    print("="*50)
+
+    start = time.perf_counter()
+
+    def progress(rows_done, created):
+        print(f"   ... {rows_done} rows, {created} created ({time.perf_counter() - start:.0f}s)", flush=True)
+
+    try:
+        if args.path == "-":
+            report = import_users(read_rows(sys.stdin, fmt), args.creator_role, progress=progress)
+        else:
+            with open(args.path, encoding="utf-8-sig", newline="") as f:
+                report = import_users(read_rows(f, fmt), args.creator_role, progress=progress)
+    except ImportFormatError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✅ Created: {report['created']}")
+    print(f"❌ Failed:  {report['failed']}")
+    print(f"⏱️  Took {elapsed:.1f}s")
+
+    for result in report["results"]:
+        if result["status"] == "error":
+            print(f"   Row {result['row']} ({result['email'] or 'no email'}): {result['error']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report (with temporary passwords) written to {args.report}")
+    else:
+        print("\n⚠️  No --report given: temporary passwords were not saved")
+    print("="*50)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Production server: the app under gunicorn with pre-forked, threaded workers
+Run: python serve.py [--bind 0.0.0.0:8000] [--workers 4] [--threads 4]
+
+`python app.py` is the single-process debug server, for development only.
+
+It binds 127.0.0.1 and expects a reverse proxy (TLS, static files) in
+front. Start it with GATEKEEPER_TRUSTED_PROXY_HOPS=1 (one proxy) so
+client IPs are read from X-Forwarded-For; it defaults to 0, which is
+right whenever clients can reach the server directly, since they could
+then forge the header. With a proxy hop set, /metrics answers only
+scrapers sending GATEKEEPER_METRICS_TOKEN.
+
+Startup is safe for the SQLite database: the master process runs
+scripts/bootstrap.py (schema, migrations, seed data) in a separate
+interpreter before any worker starts, and never imports the app itself.
+Each worker then builds its own app (wsgi.py, bootstrap=False), so no
+database connection, cache or background thread is shared across fork().
+The production DB profile (WAL, busy_timeout) lets the workers read
+concurrently and queue for the single SQLite writer.
+
+Workers are recycled after --max-requests requests (plus random jitter so
+they don't all restart together) and replaced if stuck for --timeout.
+
+Thread budget: a live dashboard (/api/dashboard/stream, Server-Sent
+Events) holds one request thread while it is open. Each worker keeps at
+most DASHBOARD_STREAMS_PER_WORKER of them (default 2), and a stream is
+closed after DASHBOARD_STREAM_MAX_SECONDS; further dashboards poll. So
+workers x (threads - DASHBOARD_STREAMS_PER_WORKER) threads are always
+left for ordinary requests. --threads must be larger than that limit,
+and should be raised together with it.
+
+Signals to the master process:
+  HUP          graceful reload: re-run the bootstrap, start workers on the
+               code now on disk, let old workers finish their requests
+  TERM / INT   graceful / immediate stop
+  TTIN / TTOU  one worker more / fewer
+
+Defaults come from Config.SERVER_*; GATEKEEPER_BIND, GATEKEEPER_WORKERS,
+GATEKEEPER_THREADS, GATEKEEPER_MAX_REQUESTS and the flags override them.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from config import Config
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Only in newer gunicorn releases; skipped on older ones
+OPTIONAL_SETTINGS = ("control_socket_disable",)
+
+
+def setting(name, cast=str):
+    """GATEKEEPER_<name> from the environment, else Config.SERVER_<name>"""
+    value = os.environ.get(f"GATEKEEPER_{name}")
+    return cast(value) if value is not None else getattr(Config, f"SERVER_{name}")
+
+
+def run_bootstrap(seed):
+    command = [sys.executable, os.path.join(ROOT, "scripts", "bootstrap.py")]
+    if not seed:
+        command.append("--no-seed")
+    subprocess.run(command, cwd=ROOT, check=True)
+
+
+# ---------------- SERVER HOOKS ----------------
+# gunicorn calls these in the master (on_starting, on_reload) or in the
+# worker that is exiting (worker_exit)
+
+def on_starting(server):
+    if os.environ.get("GATEKEEPER_SKIP_BOOTSTRAP") != "1":
+        # Fails the start (non-zero exit) if the database can't be set up
+        run_bootstrap(seed=os.environ.get("GATEKEEPER_SEED") != "0")
+
+
+def on_reload(server):
+    # New code may bring new migrations; apply them before its workers start
+    if os.environ.get("GATEKEEPER_SKIP_BOOTSTRAP") == "1":
+        return
+    try:
+        run_bootstrap(seed=os.environ.get("GATEKEEPER_SEED") != "0")
+    except subprocess.CalledProcessError as e:
+        server.log.error("Bootstrap failed during reload (exit %s); workers start anyway", e.returncode)
+
+
+def worker_exit(server, worker):
+    # Write out queued audit events before the process goes away
+    from services.audit import audit_log
+    audit_log.shutdown()
+
+
+class GatekeeperServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in OPTIONAL_SETTINGS and key not in self.cfg.settings:
+                continue
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Called in each worker (no preload), after the fork
+        from wsgi import app
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default=setting("BIND"), help="host:port (or unix:/path)")
+    parser.add_argument("--workers", type=int, default=setting("WORKERS", int), help="worker processes")
+    parser.add_argument("--threads", type=int, default=setting("THREADS", int), help="request threads per worker")
+    parser.add_argument("--timeout", type=int, default=Config.SERVER_TIMEOUT,
+                        help="seconds before a silent worker is killed and replaced")
+    parser.add_argument("--graceful-timeout", type=int, default=Config.SERVER_GRACEFUL_TIMEOUT,
+                        help="seconds workers get to finish requests on reload / stop")
+    parser.add_argument("--max-requests", type=int, default=setting("MAX_REQUESTS", int),
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=Config.SERVER_MAX_REQUESTS_JITTER,
+                        help="random extra requests before recycling")
+    parser.add_argument("--no-bootstrap", action="store_true",
+                        help="skip scripts/bootstrap.py (already run by the deploy)")
+    parser.add_argument("--no-seed", action="store_true", help="bootstrap schema and migrations only")
+    parser.add_argument("--access-log", action="store_true", help="log every request to stdout")
+    parser.add_argument("--pid", help="write the master pid to this file (for HUP / TERM)")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    streams = Config.DASHBOARD_STREAMS_PER_WORKER
+    if args.threads <= streams:
+        # Open dashboards could then take every thread of a worker
+        parser.error(f"--threads must be more than DASHBOARD_STREAMS_PER_WORKER ({streams})")
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter if args.max_requests else 0,
+        "preload_app": False,
+        "proc_name": "gatekeeper",
+        "pidfile": args.pid,
+        "accesslog": "-" if args.access_log else None,
+        # Managed with signals; no shared ~/.gunicorn socket between instances
+        "control_socket_disable": True,
+        # Seen by the hooks (and by the workers: they never bootstrap)
+        "raw_env": [
+            "GATEKEEPER_BOOTSTRAP=0",
+            f"GATEKEEPER_SKIP_BOOTSTRAP={'1' if args.no_bootstrap else '0'}",
+            f"GATEKEEPER_SEED={'0' if args.no_seed else '1'}",
+        ],
+        "on_starting": on_starting,
+        "on_reload": on_reload,
+        "worker_exit": worker_exit,
+    }
+    GatekeeperServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# services/access_policy.py
+# Compiled access policy: who may do what, and which doors open when
+#
+# Two kinds of rules live here:
+#   * Staff permissions (create / import / list / unlock / activate users,
+#     issue keys for others, edit door rules) are a fixed role -> action table that used to
+#     be spelled out as if/elif chains in routes/users.py and routes/web.py.
+#   * Door access is data: access_policies rows say a role may open a door
+#     group on some weekdays between two times of day.
+#
+# Both are compiled into plain dicts / sets. Door rules become one
+# bytearray per (role, door_group) with a byte for every minute of the
+# week, so can(user, door, now) is two dict lookups and an index.
+#
+# Hot reload: committing a change to access_policies in this process marks
+# the policy stale; other processes notice within POLICY_SYNC_SECONDS via
+# a cheap COUNT / MAX(updated_at) check. The next decision recompiles.
+
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, func
+from models import db, AccessPolicy
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# ---------------- STAFF PERMISSIONS ----------------
+
+CREATE_USERS = "users.create"
+IMPORT_USERS = "users.import"
+LIST_USERS = "users.list"
+UNLOCK_USERS = "users.unlock"
+TOGGLE_USERS = "users.toggle_active"
+ISSUE_KEYS_FOR_OTHERS = "keys.issue_for_others"
+MANAGE_POLICIES = "policies.manage"
+VIEW_SECURITY_ALERTS = "alerts.view"
+VIEW_TRENDS = "dashboard.trends"
+
+PERMISSIONS = {
+    "management": {CREATE_USERS, IMPORT_USERS, LIST_USERS, UNLOCK_USERS, TOGGLE_USERS, ISSUE_KEYS_FOR_OTHERS,
+                   MANAGE_POLICIES, VIEW_SECURITY_ALERTS, VIEW_TRENDS},
+    "concierge": {CREATE_USERS, IMPORT_USERS, LIST_USERS, ISSUE_KEYS_FOR_OTHERS, VIEW_TRENDS},
+    "resident": set(),
+}
+
+# Roles each role may create, and see in user lists (None = everyone)
+MANAGED_ROLES = {
+    "management": ("concierge", "resident"),
+    "concierge": ("resident",),
+}
+VISIBLE_ROLES = {
+    "management": None,
+    "concierge": ("resident",),
+}
+
+# Door rules written to an empty access_policies table
+DEFAULT_DOOR_RULES = [
+    # (role, door_group, days, start_minute, end_minute)
+    ("management", "*", "0123456", 0, MINUTES_PER_DAY),
+    ("concierge", "*", "0123456", 0, MINUTES_PER_DAY),
+    ("resident", "main-entrance", "0123456", 0, MINUTES_PER_DAY),
+    ("resident", "parking", "0123456", 0, MINUTES_PER_DAY),
+    ("resident", "mailroom", "0123456", 0, MINUTES_PER_DAY),
+    ("resident", "amenities", "0123456", 6 * 60, 23 * 60),
+]
+
+
+def minute_of_week(now):
+    return now.weekday() * MINUTES_PER_DAY + now.hour * 60 + now.minute
+
+
+def compile_door_rules(rules, door_groups):
+    """
+    rules: iterable of (role, door_group, days, start_minute, end_minute);
+    door_group "*" means every group in door_groups. Returns
+    {(role, door_group): bytearray(MINUTES_PER_WEEK)}.
+    """
+    index = {}
+    for role, group, days, start, end in rules:
+        groups = door_groups if group == "*" else [group]
+        start = max(0, min(MINUTES_PER_DAY, start))
+        end = max(0, min(MINUTES_PER_DAY, end))
+        # start > end wraps past midnight into the next day
+        spans = [(start, end)] if start <= end else [(start, MINUTES_PER_DAY), (0, end)]
+        for g in groups:
+            table = index.setdefault((role, g), bytearray(MINUTES_PER_WEEK))
+            for day in {int(d) for d in days if d.isdigit() and int(d) < 7}:
+                for i, (s, e) in enumerate(spans):
+                    offset = ((day + i) % 7) * MINUTES_PER_DAY
+                    table[offset + s:offset + e] = b"\x01" * (e - s)
+    return index
+
+
+class AccessPolicyIndex:
+    def __init__(self, door_groups=(), sync_seconds=5.0):
+        self.door_groups = list(door_groups)
+        self.sync_seconds = sync_seconds
+        self.permissions = {(role, action) for role, actions in PERMISSIONS.items() for action in actions}
+        self._doors = {}
+        self._groups_by_role = {}
+        self._signature = None
+        self._stale = True
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    # ---------------- STAFF CHECKS ----------------
+
+    def allows(self, role, action):
+        return (role, action) in self.permissions
+
+    def creatable_roles(self, role):
+        return list(MANAGED_ROLES.get(role, ()))
+
+    def visible_roles(self, role):
+        """Roles whose users `role` may list (None = all)"""
+        return VISIBLE_ROLES.get(role, ())
+
+    # ---------------- DOOR CHECKS ----------------
+
+    def can(self, user, door, now=None):
+        """May `user` open a door in group `door` at `now` (local time)?"""
+        if user is None or not user.is_active or getattr(user, "is_locked", False):
+            return False
+        return self.can_role(user.role, door, now)
+
+    def can_role(self, role, door, now=None):
+        self.sync()
+        table = self._doors.get((role, door))
+        if table is None:
+            return False
+        return bool(table[minute_of_week(now or datetime.now())])
+
+    def door_groups_for(self, role):
+        """Door groups `role` has any access window for"""
+        self.sync()
+        return self._groups_by_role.get(role, [])
+
+    # ---------------- LOADING ----------------
+
+    def _signature_query(self):
+        return db.session.query(func.count(AccessPolicy.id), func.max(AccessPolicy.updated_at)).one()
+
+    def load(self):
+        """Compile the current access_policies rows"""
+        rows = db.session.query(
+            AccessPolicy.role, AccessPolicy.door_group, AccessPolicy.days,
+            AccessPolicy.start_minute, AccessPolicy.end_minute
+        ).all()
+        signature = tuple(self._signature_query())
+        doors = compile_door_rules(rows, self.door_groups)
+        groups_by_role = {}
+        for role, group in sorted(doors):
+            groups_by_role.setdefault(role, []).append(group)
+        with self._lock:
+            self._doors = doors
+            self._groups_by_role = groups_by_role
+            self._signature = signature
+            self._stale = False
+            self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Recompile if the rows changed here or in another process (rate limited)"""
+        now = time.monotonic()
+        if not self._stale and now - self._last_sync < self.sync_seconds:
+            return
+        with self._lock:
+            if not self._stale and now - self._last_sync < self.sync_seconds:
+                return
+            self._last_sync = now
+        if self._stale or tuple(self._signature_query()) != self._signature:
+            self.load()
+
+    def mark_stale(self):
+        self._stale = True
+
+
+policy = AccessPolicyIndex()
+
+
+def _note_policy_changes(session, flush_context):
+    if any(isinstance(obj, AccessPolicy) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["policy_changed"] = True
+
+
+def _reload_after_commit(session):
+    if session.info.pop("policy_changed", False):
+        policy.mark_stale()
+
+
+def _discard_policy_changes(session):
+    session.info.pop("policy_changed", None)
+
+
+def seed_default_policies():
+    if AccessPolicy.query.first() is None:
+        for role, group, days, start, end in DEFAULT_DOOR_RULES:
+            db.session.add(AccessPolicy(role=role, door_group=group, days=days,
+                                        start_minute=start, end_minute=end))
+        db.session.commit()
+
+
+def init_access_policy(app):
+    """Watch for policy changes; rules are compiled on the first decision"""
+    policy.door_groups = list(app.config.get("DOOR_GROUPS", []))
+    policy.sync_seconds = app.config.get("POLICY_SYNC_SECONDS", 5.0)
+    hooks = (
+        ("after_flush", _note_policy_changes),
+        ("after_commit", _reload_after_commit),
+        ("after_rollback", _discard_policy_changes),
+    )
+    for name, fn in hooks:
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
+    policy.mark_stale()
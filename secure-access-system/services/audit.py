@@ -0,0 +1,233 @@
+# services/audit.py
+# Append-only access/audit log with a batched background writer
+#
+# Request handlers call audit() which only puts a row on an in-memory
+# queue. A single writer thread drains the queue and inserts rows in
+# batches (one transaction per batch), so no request ever waits for an
+# audit write. The queue is bounded: when it is full the configured
+# overflow policy either drops the oldest queued event or the new one,
+# and `dropped` counts the loss. Pending events are flushed at exit.
+#
+# Listeners (add_listener) see every event as it is recorded, on the
+# caller's thread; services/detector.py uses this to watch the stream.
+# Batch hooks (add_batch_hook) run inside each batch's write transaction;
+# services/rollups.py uses this to count logins per day.
+
+import atexit
+import os
+import queue
+import threading
+from datetime import datetime
+from flask import has_request_context, request
+from models import AccessEvent
+
+# Event types
+LOGIN_SUCCESS = "login_success"
+LOGIN_FAILURE = "login_failure"
+LOGIN_BLOCKED = "login_blocked"  # attempt on a locked / inactive account
+LOGIN_THROTTLED = "login_throttled"  # rejected by the rate limiter
+ACCOUNT_LOCKED = "account_locked"
+ACCOUNT_UNLOCKED = "account_unlocked"
+USER_ACTIVATED = "user_activated"
+USER_DEACTIVATED = "user_deactivated"
+USER_CREATED = "user_created"
+PASSWORD_CHANGED = "password_changed"
+VIRTUAL_KEY_ISSUED = "virtual_key_issued"
+DOOR_ACCESS_GRANTED = "door_access_granted"
+DOOR_ACCESS_DENIED = "door_access_denied"
+SECURITY_ALERT = "security_alert"  # raised by services/detector.py
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+_STOP = object()
+
+
+class AuditLog:
+    def __init__(self):
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_interval = 0.5
+        self.overflow = "drop_oldest"
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+        self._engine = None
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._batch_hooks = []
+
+    def add_listener(self, listener):
+        """Call listener(row) for every recorded event (must be quick, must not raise)"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def add_batch_hook(self, hook):
+        """Call hook(conn, rows) in the transaction that writes each batch"""
+        if hook not in self._batch_hooks:
+            self._batch_hooks.append(hook)
+
+    def configure(self, engine, enabled=True, queue_size=10000, batch_size=200,
+                  flush_interval=0.5, overflow="drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"AUDIT_OVERFLOW must be one of: {', '.join(OVERFLOW_POLICIES)}")
+
+        # Finish writing anything queued for a previous engine first
+        self.shutdown()
+        with self._lock:
+            self._engine = engine
+            self.enabled = enabled
+            self.batch_size = batch_size
+            self.flush_interval = flush_interval
+            self.overflow = overflow
+            self._queue = queue.Queue(maxsize=queue_size)
+
+    # ---------------- PRODUCER SIDE ----------------
+
+    def record(self, event_type, user_id=None, email=None, actor_id=None,
+               channel=None, ip_address=None, detail=None):
+        row = {
+            "event_type": event_type,
+            "user_id": user_id,
+            "email": email,
+            "actor_id": actor_id,
+            "channel": channel,
+            "ip_address": ip_address,
+            "detail": detail[:255] if detail else None,
+            "created_at": datetime.utcnow(),
+        }
+        for listener in self._listeners:
+            listener(row)
+        if not self.enabled or self._engine is None:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._overflow(row)
+
+    def _overflow(self, row):
+        with self._lock:
+            self.dropped += 1
+        if self.overflow == "drop_newest":
+            return
+        # drop_oldest: make room by discarding the head of the queue
+        try:
+            self._queue.get_nowait()
+            self._queue.task_done()
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            pass
+
+    # ---------------- WRITER THREAD ----------------
+
+    def _ensure_started(self):
+        # Threads don't survive fork(), so a forked worker starts its own
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = first is _STOP
+            if not stop:
+                batch.append(first)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows):
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(AccessEvent.__table__.insert(), rows)
+                for hook in self._batch_hooks:
+                    hook(conn, rows)
+            with self._lock:
+                self.written += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(rows)
+            print(f"⚠️  Audit log: failed to write {len(rows)} events: {e}")
+
+    # ---------------- FLUSH / SHUTDOWN ----------------
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def shutdown(self, timeout=5.0):
+        """Write out pending events and stop the writer thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+
+
+audit_log = AuditLog()
+atexit.register(audit_log.shutdown)
+
+
+def init_audit(app, engine):
+    audit_log.configure(
+        engine,
+        enabled=app.config.get("AUDIT_ENABLED", True),
+        queue_size=app.config.get("AUDIT_QUEUE_SIZE", 10000),
+        batch_size=app.config.get("AUDIT_BATCH_SIZE", 200),
+        flush_interval=app.config.get("AUDIT_FLUSH_INTERVAL", 0.5),
+        overflow=app.config.get("AUDIT_OVERFLOW", "drop_oldest"),
+    )
+
+
+def audit(event_type, user=None, email=None, actor_id=None, detail=None, user_id=None):
+    """Queue an audit event, filling in channel and client IP from the request"""
+    channel = None
+    ip_address = None
+    if has_request_context():
+        channel = "api" if request.path.startswith("/api/") else "web"
+        ip_address = request.remote_addr
+
+    audit_log.record(
+        event_type,
+        user_id=user.id if user is not None else user_id,
+        email=email or (user.email if user is not None else None),
+        actor_id=actor_id,
+        channel=channel or "cli",
+        ip_address=ip_address,
+        detail=detail,
+    )
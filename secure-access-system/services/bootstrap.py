@@ -0,0 +1,96 @@
+# services/bootstrap.py
+# One-off database bootstrap: schema, migrations and seed data
+#
+# This used to run inside create_app(), so every web worker and every CLI
+# tool created tables, looked up the seed accounts and could bcrypt-hash
+# their passwords before doing anything else (and several workers starting
+# together raced each other). Run it once per deploy instead:
+#
+#     python scripts/bootstrap.py
+#
+# create_app() only does it itself when BOOTSTRAP_ON_STARTUP is on (the
+# development default, so `python app.py` keeps working on a fresh
+# checkout). Everything here is idempotent.
+
+from sqlalchemy import inspect
+from models import db, User
+from services.migrations import apply_migrations, current_version, MIGRATIONS
+from services.access_policy import seed_default_policies
+from services import virtual_keys
+from services.revocation import revocation_list
+from services.presence import presence
+from services.sessions import session_store
+from services import rollups
+
+
+def ensure_schema(verbose=True):
+    """Create missing tables and apply pending migrations"""
+    db.create_all()
+    # Bring existing databases up to date (columns / indexes)
+    return apply_migrations(verbose=verbose)
+
+
+def schema_ready():
+    """True if the tables exist and every migration has been applied"""
+    if not inspect(db.engine).has_table("schema_version"):
+        return False
+    with db.engine.connect() as conn:
+        return current_version(conn) >= MIGRATIONS[-1][0]
+
+
+def seed_accounts(app, verbose=True):
+    """Create the demo management and backup admin accounts if missing"""
+    created = []
+
+    # Demo user
+    demo_user = User.query.filter_by(email=app.config["DEMO_USER_EMAIL"]).first()
+    if not demo_user:
+        demo_user = User(
+            first_name="Building",
+            last_name="Management",
+            username="building.management",
+            email=app.config["DEMO_USER_EMAIL"],
+            role="management"
+        )
+        demo_user.set_password(app.config["DEMO_USER_PASSWORD"])
+        db.session.add(demo_user)
+        created.append(demo_user.email)
+        if verbose:
+            print("✅ Demo management account created")
+
+    # Backup admin
+    backup_admin = User.query.filter_by(email="admin@backup.local").first()
+    if not backup_admin:
+        backup_admin = User(
+            first_name="Backup",
+            last_name="Admin",
+            username="backup.admin",
+            email="admin@backup.local",
+            role="management"
+        )
+        backup_admin.set_password("BackupPass123")
+        db.session.add(backup_admin)
+        created.append(backup_admin.email)
+        if verbose:
+            print("✅ Backup admin account created")
+
+    db.session.commit()
+    return created
+
+
+def bootstrap(app, seed=True, verbose=True):
+    """Schema + migrations + cleanup and rollup backfill, then (optionally) seed accounts, door rules and signing key"""
+    with app.app_context():
+        migrations = ensure_schema(verbose=verbose)
+        revocation_list.purge_expired()
+        presence.purge_expired()
+        session_store.purge_expired()
+        # First run after upgrading: fill the trend charts from history
+        rolled_up = rollups.backfill() if rollups.rollups_empty() else 0
+        accounts = []
+        if seed:
+            accounts = seed_accounts(app, verbose=verbose)
+            seed_default_policies()
+            # Create the signing key now rather than in the first worker to need it
+            virtual_keys.get_signers()
+    return {"migrations": migrations, "accounts": accounts, "rolled_up_days": rolled_up}
@@ -0,0 +1,202 @@
+# services/bulk_admin.py
+# Bulk unlock / activate / deactivate
+#
+# The single-user routes load each User, change it and commit, so clearing
+# a lockout storm or an end-of-lease move-out meant hundreds of requests.
+# Here the targets (a list of ids, or the same filters as the user list)
+# become one set-based UPDATE in one transaction. Only rows the action
+# actually changes are touched, so repeating a request is harmless.
+#
+# A bulk UPDATE skips the ORM flush hooks, so this does their work
+# itself: bumps the users data version and drops the stats counters (next
+# read rebuilds them) in the same transaction, then after the commit
+# notifies live dashboards, clears cached identities, audits every
+# affected user and, on deactivation, revokes API tokens and ends web
+# sessions in one statement each.
+
+from sqlalchemy import update
+from models import db, User
+from services.access_policy import policy, UNLOCK_USERS, TOGGLE_USERS
+from services.audit import audit
+from services import audit as events
+from services.change_feed import feed
+from services.data_version import bump_users_version
+from services.identity_cache import identity_cache
+from services.pagination import TRUE_VALUES, FALSE_VALUES
+from services.revocation import revoke_tokens_for_users
+from services.sessions import end_sessions_for_users
+from services.stats import invalidate_counters
+from services.user_search import build_match, matching_ids
+
+MAX_IDS = 10000  # per request; SQLite binds every id as a parameter
+
+# action -> (permission, rows it changes, new values, audit event)
+ACTIONS = {
+    "unlock": (
+        UNLOCK_USERS,
+        User.is_locked.is_(True),
+        {"is_locked": False, "failed_login_attempts": 0},
+        events.ACCOUNT_UNLOCKED,
+    ),
+    "activate": (
+        TOGGLE_USERS,
+        User.is_active.is_(False),
+        {"is_active": True, "is_locked": False, "failed_login_attempts": 0},
+        events.USER_ACTIVATED,
+    ),
+    "deactivate": (
+        TOGGLE_USERS,
+        User.is_active.is_(True),
+        {"is_active": False},
+        events.USER_DEACTIVATED,
+    ),
+}
+
+FILTER_KEYS = ("q", "role", "active", "locked")
+
+
+# ---------------- REQUEST PARSING ----------------
+
+def _as_bool(value, name):
+    # JSON true/false, or the query-string spellings the user list accepts
+    if isinstance(value, bool) or value is None:
+        return value
+    value = str(value).lower()
+    if value == "":
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid value for '{name}'")
+
+
+def parse_targets(data):
+    """
+    Read {"ids": [...]} or {"filters": {"q", "role", "active", "locked"}}.
+
+    Returns (ids, filters), one of them None. Raises ValueError with a
+    user-facing message on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    ids = data.get("ids")
+    filters = data.get("filters")
+    if (ids is None) == (filters is None):
+        raise ValueError("Send either 'ids' or 'filters'")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("'ids' must be a non-empty list")
+        if len(ids) > MAX_IDS:
+            raise ValueError(f"At most {MAX_IDS} ids per request")
+        try:
+            return sorted({int(user_id) for user_id in ids}), None
+        except (TypeError, ValueError):
+            raise ValueError("'ids' must be integers")
+
+    if not isinstance(filters, dict):
+        raise ValueError("'filters' must be an object")
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    q = (filters.get("q") or "").strip() or None
+    if q and build_match(q) is None:
+        raise ValueError("Search text must contain at least one letter or digit")
+    parsed = {
+        "q": q,
+        "role": filters.get("role") or None,
+        "active": _as_bool(filters.get("active"), "active"),
+        "locked": _as_bool(filters.get("locked"), "locked"),
+    }
+    # An empty filter would mean "everyone"; make that a deliberate list of ids
+    if all(value is None for value in parsed.values()):
+        raise ValueError("At least one filter is required")
+    return None, parsed
+
+
+def allowed_actions(role):
+    return [action for action, (permission, _, _, _) in ACTIONS.items() if policy.allows(role, permission)]
+
+
+# ---------------- UPDATE ----------------
+
+def _target_conditions(actor_role, ids, filters):
+    conditions = []
+    visible = policy.visible_roles(actor_role)
+    if visible is not None:
+        conditions.append(User.role.in_(visible))
+    if ids is not None:
+        conditions.append(User.id.in_(ids))
+        return conditions
+    if filters["q"]:
+        conditions.append(User.id.in_(matching_ids(filters["q"])))
+    if filters["role"]:
+        conditions.append(User.role == filters["role"])
+    if filters["active"] is not None:
+        conditions.append(User.is_active.is_(filters["active"]))
+    if filters["locked"] is not None:
+        conditions.append(User.is_locked.is_(filters["locked"]))
+    return conditions
+
+
+def bulk_update(action, actor_id, actor_role, ids=None, filters=None):
+    """
+    Apply `action` to every target user it changes (commits).
+
+    Returns {"action", "requested", "updated", "user_ids"}; "requested" is
+    the number of distinct ids sent (None for filters). Raises
+    PermissionError if actor_role may not do this, ValueError for an
+    unknown action.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Action must be one of: {', '.join(ACTIONS)}")
+    permission, changes_row, values, event_type = ACTIONS[action]
+    if not policy.allows(actor_role, permission):
+        raise PermissionError("Unauthorized")
+
+    conditions = _target_conditions(actor_role, ids, filters)
+    conditions.append(changes_row)
+    if action == "deactivate" and actor_id is not None:
+        conditions.append(User.id != actor_id)  # never lock yourself out
+
+    statement = (
+        update(User)
+        .where(*conditions)
+        .values(**values)
+        .returning(User.id, User.email)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = db.session.execute(statement).all()
+        if updated:
+            connection = db.session.connection()
+            bump_users_version(connection)
+            invalidate_counters(connection)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    user_ids = [user_id for user_id, _ in updated]
+    if user_ids:
+        _after_commit(action, event_type, updated, actor_id)
+    return {
+        "action": action,
+        "requested": len(ids) if ids is not None else None,
+        "updated": len(user_ids),
+        "user_ids": user_ids,
+    }
+
+
+def _after_commit(action, event_type, updated, actor_id):
+    user_ids = [user_id for user_id, _ in updated]
+    feed.publish("users_changed")
+    for user_id in user_ids:
+        identity_cache.invalidate(user_id)
+    if action == "deactivate":
+        # Cut off API access and web sessions now rather than when they expire
+        revoke_tokens_for_users(user_ids, reason="deactivated")
+        end_sessions_for_users(user_ids)
+    for user_id, email in updated:
+        audit(event_type, user_id=user_id, email=email, actor_id=actor_id, detail="bulk")
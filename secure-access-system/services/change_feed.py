@@ -0,0 +1,239 @@
+# services/change_feed.py
+# Shared change feed for the live dashboard (Server-Sent Events)
+#
+# Committed user changes are published once into an in-process feed.
+# Every connected dashboard waits on the same feed, and the stats for a
+# given users version (and clock bucket) are computed once and shared by
+# all streams, so updates arrive as soon as the commit lands. Security alerts from
+# services/detector.py travel through the same feed.
+#
+# The feed only sees this process's commits. Each stream therefore also
+# polls the shared users_version (services/data_version.py; one
+# primary-key read) every DASHBOARD_STREAM_POLL_SECONDS, and picks up
+# changes made by other workers that way.
+#
+# A stream holds a request thread for as long as it is open, so:
+#   * at most DASHBOARD_STREAMS_PER_WORKER are open per process; the rest
+#     get 503 and the page falls back to polling;
+#   * a stream ends after DASHBOARD_STREAM_MAX_SECONDS. EventSource then
+#     reconnects on its own, and a closed tab frees its thread by then at
+#     the latest.
+
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from sqlalchemy import event, inspect
+from models import db, User
+from services.data_version import clock_bucket
+
+FeedEvent = namedtuple("FeedEvent", ["seq", "kind", "data"])
+
+WATCHED_COLUMNS = ("is_active", "is_locked", "role")
+
+
+class ChangeFeed:
+    """Bounded, sequence-numbered event buffer shared by all listeners"""
+
+    def __init__(self, history=200):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._seq = 0
+
+        self._stats_lock = threading.Lock()
+        self._stats = None
+        self._stats_key = None
+
+    @property
+    def latest_seq(self):
+        return self._seq
+
+    def publish(self, kind, data=None):
+        with self._cond:
+            self._seq += 1
+            self._events.append(FeedEvent(self._seq, kind, data or {}))
+            self._cond.notify_all()
+            return self._seq
+
+    def wait(self, after_seq, timeout=None):
+        """Block until there are events newer than after_seq (or timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            return [e for e in self._events if e.seq > after_seq]
+
+    def stats_for(self, version, compute):
+        """
+        Stats for users data version `version`, computed once for everyone.
+
+        "New in the last 7 days" moves with the clock too, so they are also
+        recomputed when the clock bucket changes (as for the ETag of
+        /api/dashboard/stats).
+        """
+        key = (version, clock_bucket())
+        with self._stats_lock:
+            if self._stats is None or self._stats_key != key:
+                self._stats = compute()
+                self._stats_key = key
+            return dict(self._stats)
+
+
+feed = ChangeFeed()
+
+
+class StreamSlots:
+    """Counts open dashboard streams in this process"""
+
+    def __init__(self):
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+
+stream_slots = StreamSlots()
+
+
+# ---------------- SESSION HOOKS ----------------
+
+def _user_summary(user):
+    if user.is_locked:
+        status = "locked"
+    elif user.is_active is False:
+        status = "inactive"
+    else:
+        status = "active"
+
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "role": user.role,
+        "status": status,
+        "created": user.created_at.strftime("%Y-%m-%d") if user.created_at else "N/A"
+    }
+
+
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("feed_pending", {"new_users": [], "changed": False})
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            pending["new_users"].append(_user_summary(obj))
+            pending["changed"] = True
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending["changed"] = True
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in WATCHED_COLUMNS):
+                pending["changed"] = True
+
+
+def _publish_changes(session):
+    pending = session.info.pop("feed_pending", None)
+    if not pending or not pending["changed"]:
+        return
+    for summary in pending["new_users"]:
+        feed.publish("new_user", summary)
+    feed.publish("users_changed")
+
+
+def _discard_changes(session):
+    session.info.pop("feed_pending", None)
+
+
+def register_feed_hooks():
+    """Publish committed user changes into the shared feed"""
+    hooks = (
+        ("after_flush", _collect_changes),
+        ("after_commit", _publish_changes),
+        ("after_rollback", _discard_changes),
+    )
+    for name, fn in hooks:
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
+
+
+# ---------------- SSE STREAM ----------------
+
+def _sse(kind, data, seq=None):
+    message = ""
+    if seq is not None:
+        message += f"id: {seq}\n"
+    message += f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+    return message
+
+
+def dashboard_event_stream(app, compute_stats, current_version, heartbeat=15, poll_seconds=5,
+                           max_seconds=300, include_alerts=False):
+    """
+    Generator for /api/dashboard/stream.
+
+    Sends the full stats once, then only changed stat values when the
+    users version moves, new-user rows committed in this process (other
+    processes' changes arrive as a `users_changed` event; the page then
+    refetches the table), plus security alerts if `include_alerts`. A
+    comment line is sent every `heartbeat` seconds so proxies keep the
+    connection open. Ends after `max_seconds`; EventSource reconnects.
+    """
+    deadline = time.monotonic() + max_seconds
+    seq = feed.latest_seq
+    with app.app_context():
+        version = current_version()
+        bucket = clock_bucket()
+        sent = feed.stats_for(version, compute_stats)
+    # Reconnect quickly once the stream is closed at the deadline
+    yield "retry: 1000\n" + _sse("stats", sent, seq)
+    last_write = time.monotonic()
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = feed.wait(seq, timeout=min(poll_seconds, remaining))
+
+        local_change = False
+        for e in events:
+            seq = e.seq
+            if e.kind == "alert":
+                if include_alerts:
+                    yield _sse("alert", e.data, e.seq)
+                    last_write = time.monotonic()
+                continue
+            local_change = True
+            if e.kind == "new_user":
+                yield _sse("new_user", e.data, e.seq)
+                last_write = time.monotonic()
+
+        # The shared version also moves for commits made by other workers,
+        # and the time-based counts with the clock
+        with app.app_context():
+            latest = current_version()
+        if latest != version or clock_bucket() != bucket:
+            if latest != version and not local_change:
+                yield _sse("users_changed", {})
+            version = latest
+            bucket = clock_bucket()
+            with app.app_context():
+                stats = feed.stats_for(version, compute_stats)
+            delta = {key: value for key, value in stats.items() if sent.get(key) != value}
+            if delta:
+                sent.update(delta)
+                yield _sse("stats", delta, seq)
+            last_write = time.monotonic()
+
+        if time.monotonic() - last_write >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_write = time.monotonic()
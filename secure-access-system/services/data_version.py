@@ -0,0 +1,148 @@
+# services/data_version.py
+# Users data version, ETags and rendered-fragment cache
+#
+# Every flush that inserts, deletes or changes a displayed column of a
+# User (VERSIONED_COLUMNS) also bumps the "users_version" row in
+# user_stats, in the same transaction. Anything derived from those columns
+# (dashboard stats, recent users, the user list, cached identities) is
+# therefore unchanged while that number is unchanged:
+#   * JSON endpoints use it in a strong ETag and answer 304 Not Modified
+#     without recomputing anything;
+#   * HTML pages reuse rendered fragments (stats cards, table rows) keyed
+#     on it, so a repeat view costs one primary-key read.
+# The version lives in the database, so every worker process sees a bump
+# made by any other.
+#
+# "New in the last 7 days" moves with the clock, not with writes, so keys
+# for anything showing it also include the current minute (CLOCK_BUCKET).
+#
+# Bookkeeping writes (failed_login_attempts on every wrong password, reset
+# tokens, password hashes) don't bump it, so a login storm doesn't empty
+# every cache; the "Failed: n" hint in the user list may lag until the next
+# displayed change (a lockout is one).
+#
+# Bulk UPDATE/DELETE statements bypass the flush hook; code issuing them
+# must call bump_users_version(connection) in the same transaction.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import request, jsonify, make_response
+from sqlalchemy import event, select
+from sqlalchemy.orm import attributes
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, User, UserStat
+
+USERS_VERSION_KEY = "users_version"
+CLOCK_BUCKET = 60  # seconds; granularity for time-dependent fragments
+
+# User columns shown by the cached views and identity snapshots
+VERSIONED_COLUMNS = (
+    "username", "first_name", "last_name", "email", "role",
+    "is_active", "is_locked", "created_at", "temporary_password",
+)
+
+
+def clock_bucket():
+    return int(time.time() // CLOCK_BUCKET)
+
+
+def bump_users_version(connection):
+    table = UserStat.__table__
+    connection.execute(
+        sqlite_insert(table)
+        .values(key=USERS_VERSION_KEY, value=1)
+        .on_conflict_do_update(index_elements=[table.c.key], set_={"value": table.c.value + 1})
+    )
+
+
+def users_version():
+    """Current version (0 if nothing has been written yet)"""
+    return db.session.execute(
+        select(UserStat.value).where(UserStat.key == USERS_VERSION_KEY)
+    ).scalar() or 0
+
+
+def _shows_change(user):
+    return any(attributes.get_history(user, name).has_changes() for name in VERSIONED_COLUMNS)
+
+
+def _bump_on_user_changes(session, flush_context):
+    changed = (
+        any(isinstance(obj, User) for obj in session.new)
+        or any(isinstance(obj, User) for obj in session.deleted)
+        or any(isinstance(obj, User) and _shows_change(obj) for obj in session.dirty)
+    )
+    if changed:
+        bump_users_version(session.connection())
+
+
+def register_version_hooks():
+    if not event.contains(db.session, "after_flush", _bump_on_user_changes):
+        event.listen(db.session, "after_flush", _bump_on_user_changes)
+
+
+# ---------------- CONDITIONAL RESPONSES ----------------
+
+def make_etag(name, version, *parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+    return f"{name}-{version}-{digest}"
+
+
+def conditional_json(name, build, *parts):
+    """
+    JSON response for build() with a strong ETag; 304 (without calling
+    build) when the client already has this version.
+    """
+    etag = make_etag(name, users_version(), *parts)
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Let browsers keep a copy but always revalidate with If-None-Match
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# ---------------- FRAGMENT CACHE ----------------
+
+class FragmentCache:
+    """Rendered fragments keyed by (name, data version, parts); LRU bounded"""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, name, version, parts, render):
+        key = (name, version, parts)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+def init_fragment_cache(config):
+    fragment_cache.max_entries = config.get("FRAGMENT_CACHE_SIZE", 500)
+    fragment_cache.clear()
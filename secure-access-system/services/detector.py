@@ -0,0 +1,262 @@
+# services/detector.py
+# Suspicious-access detection over the live login / door event stream
+#
+# The detector listens to every audit event as it is recorded (see
+# AuditLog.add_listener) and keeps small windowed aggregates per key, so
+# each event costs a few dict / deque operations and history is never
+# rescanned:
+#
+#   burst        DETECTOR_BURST_THRESHOLD failed logins for one account
+#                within the window (a deque of the last N failure times)
+#   spread       failed logins for DETECTOR_SPREAD_THRESHOLD different
+#                accounts from one client IP within the window
+#   off_hours    a sign-in or staff action inside DETECTOR_OFF_HOURS
+#   sequence     one resident granted at two different door controllers
+#                within DETECTOR_SEQUENCE_SECONDS, or a revoked key used
+#
+# Every per-key table is an LRU capped at DETECTOR_MAX_KEYS and the
+# per-key state itself is bounded by the thresholds, so memory stays flat
+# under a flood of new accounts or IPs. An alert is raised at most once
+# per (rule, subject) every DETECTOR_COOLDOWN_SECONDS; it is written to
+# the audit log as a security_alert event and pushed to live dashboards
+# through the change feed.
+#
+# NOTE: aggregates are per process, like the login throttle. With N
+# workers each one sees the events it handled itself.
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from models import AccessEvent
+from services import audit as events
+from services.audit import audit_log
+from services.change_feed import feed
+
+FAILURE_EVENTS = {events.LOGIN_FAILURE, events.LOGIN_BLOCKED, events.LOGIN_THROTTLED}
+OFF_HOURS_EVENTS = {
+    events.LOGIN_SUCCESS, events.USER_CREATED, events.ACCOUNT_UNLOCKED,
+    events.USER_ACTIVATED, events.VIRTUAL_KEY_ISSUED,
+}
+
+SEVERITY = {
+    "burst": "medium",
+    "spread": "high",
+    "off_hours": "low",
+    "sequence": "high",
+    "revoked_key": "high",
+}
+
+
+def _touch(table, key, factory, max_keys):
+    """Entry for key in an LRU OrderedDict, created (and the oldest evicted) if new"""
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = factory()
+        if len(table) > max_keys:
+            table.popitem(last=False)
+    else:
+        table.move_to_end(key)
+    return entry
+
+
+def _remember(table, key, value, max_keys):
+    """Set key (as most recent) in an LRU OrderedDict, evicting the oldest past max_keys"""
+    table.pop(key, None)
+    table[key] = value
+    if len(table) > max_keys:
+        table.popitem(last=False)
+
+
+def _in_window(minute, start, end):
+    # start > end wraps past midnight, e.g. (22 * 60, 6 * 60)
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+class SuspiciousAccessDetector:
+    def __init__(self):
+        self.enabled = True
+        self.window_seconds = 300.0
+        self.burst_threshold = 5
+        self.spread_threshold = 5
+        self.off_hours = (60, 300)  # (start_minute, end_minute) local time
+        self.sequence_seconds = 5.0
+        self.cooldown_seconds = 300.0
+        self.max_keys = 10000
+        self.alerts_raised = 0
+
+        self._failures = OrderedDict()  # account -> deque of failure times
+        self._spread = OrderedDict()  # ip -> OrderedDict(account -> last failure time)
+        self._grants = OrderedDict()  # user_id -> (time, door controller ip)
+        self._alerted = OrderedDict()  # (rule, subject) -> time of last alert
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._failures = OrderedDict()
+            self._spread = OrderedDict()
+            self._grants = OrderedDict()
+            self._alerted = OrderedDict()
+            self.alerts_raised = 0
+
+    def tracked_keys(self):
+        """Entries held per table (for monitoring memory)"""
+        return {
+            "failures": len(self._failures),
+            "spread": len(self._spread),
+            "grants": len(self._grants),
+            "cooldowns": len(self._alerted),
+        }
+
+    # ---------------- INPUT ----------------
+
+    def on_audit_event(self, row):
+        """AuditLog listener"""
+        if not self.enabled or row["event_type"] == events.SECURITY_ALERT:
+            return
+        self.observe(row["event_type"], user_id=row["user_id"], email=row["email"],
+                     ip_address=row["ip_address"], detail=row["detail"], actor_id=row["actor_id"])
+
+    def observe(self, event_type, user_id=None, email=None, ip_address=None, detail=None,
+                actor_id=None, now=None):
+        """Update the aggregates with one event; returns the alerts it raised"""
+        now = now or time.time()
+        raised = []
+        with self._lock:
+            if event_type in FAILURE_EVENTS:
+                account = email.lower() if email else (f"user:{user_id}" if user_id is not None else None)
+                if account is not None:
+                    self._check_burst(account, user_id, email, ip_address, now, raised)
+                    if ip_address:
+                        self._check_spread(ip_address, account, now, raised)
+            elif event_type == events.DOOR_ACCESS_GRANTED and user_id is not None:
+                self._check_sequence(user_id, ip_address, now, raised)
+            elif event_type == events.DOOR_ACCESS_DENIED and detail and detail.startswith("key revoked"):
+                self._raise(raised, "revoked_key", f"user:{user_id}", now,
+                            f"revoked key presented for user {user_id}",
+                            user_id=user_id, ip_address=ip_address)
+
+            if event_type in OFF_HOURS_EVENTS:
+                self._check_off_hours(event_type, user_id, email, ip_address, actor_id, now, raised)
+
+        # Emitted outside the lock: recording an alert calls back into the listener
+        for alert in raised:
+            self._emit(alert)
+        return raised
+
+    # ---------------- RULES ----------------
+
+    def _check_burst(self, account, user_id, email, ip_address, now, raised):
+        times = _touch(self._failures, account, lambda: deque(maxlen=self.burst_threshold), self.max_keys)
+        times.append(now)
+        if len(times) == self.burst_threshold and now - times[0] <= self.window_seconds:
+            self._raise(raised, "burst", account, now,
+                        f"{self.burst_threshold} failed logins for {account} "
+                        f"in {int(now - times[0]) + 1}s",
+                        user_id=user_id, email=email, ip_address=ip_address)
+
+    def _check_spread(self, ip_address, account, now, raised):
+        accounts = _touch(self._spread, ip_address, OrderedDict, self.max_keys)
+        accounts[account] = now
+        accounts.move_to_end(account)
+        cutoff = now - self.window_seconds
+        while accounts and next(iter(accounts.values())) < cutoff:
+            accounts.popitem(last=False)
+        # Only the threshold matters, so never hold more accounts than that
+        while len(accounts) > self.spread_threshold:
+            accounts.popitem(last=False)
+        if len(accounts) >= self.spread_threshold:
+            self._raise(raised, "spread", ip_address, now,
+                        f"failed logins for {len(accounts)} accounts from {ip_address}",
+                        ip_address=ip_address)
+
+    def _check_off_hours(self, event_type, user_id, email, ip_address, actor_id, now, raised):
+        local = time.localtime(now)
+        if not _in_window(local.tm_hour * 60 + local.tm_min, *self.off_hours):
+            return
+        # Staff actions are attributed to the staff member, sign-ins to the account
+        subject_id = actor_id if actor_id is not None else user_id
+        self._raise(raised, "off_hours", f"{event_type}:{subject_id}", now,
+                    f"{event_type.replace('_', ' ')} at {time.strftime('%H:%M', local)} "
+                    f"by user {subject_id}",
+                    user_id=subject_id, email=email if actor_id is None else None,
+                    ip_address=ip_address)
+
+    def _check_sequence(self, user_id, ip_address, now, raised):
+        previous = self._grants.get(user_id)
+        _remember(self._grants, user_id, (now, ip_address), self.max_keys)
+        if previous is None:
+            return
+        seen_at, previous_ip = previous
+        if previous_ip != ip_address and now - seen_at <= self.sequence_seconds:
+            self._raise(raised, "sequence", f"user:{user_id}", now,
+                        f"user {user_id} granted at {previous_ip} and {ip_address} "
+                        f"within {now - seen_at:.1f}s",
+                        user_id=user_id, ip_address=ip_address)
+
+    # ---------------- ALERTS ----------------
+
+    def _raise(self, raised, rule, subject, now, message, user_id=None, email=None, ip_address=None):
+        key = (rule, subject)
+        last = self._alerted.get(key)
+        if last is not None and now - last < self.cooldown_seconds:
+            return
+        _remember(self._alerted, key, now, self.max_keys)
+        self.alerts_raised += 1
+        severity = SEVERITY[rule]
+        raised.append({
+            "rule": rule,
+            "severity": severity,
+            "message": message,
+            "detail": f"{rule} ({severity}): {message}",
+            "user_id": user_id,
+            "email": email,
+            "ip_address": ip_address,
+            "created": datetime.utcfromtimestamp(now).strftime("%Y-%m-%d %H:%M"),  # UTC, like created_at
+        })
+
+    def _emit(self, alert):
+        audit_log.record(events.SECURITY_ALERT, user_id=alert["user_id"], email=alert["email"],
+                         channel="detector", ip_address=alert["ip_address"], detail=alert["detail"])
+        feed.publish("alert", alert)
+
+
+detector = SuspiciousAccessDetector()
+
+
+def recent_alerts(limit=10):
+    """Latest security alerts from the audit log, newest first"""
+    rows = (
+        AccessEvent.query
+        .filter(AccessEvent.event_type == events.SECURITY_ALERT)
+        .order_by(AccessEvent.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "detail": row.detail,
+            "user_id": row.user_id,
+            "email": row.email,
+            "ip_address": row.ip_address,
+            "created": row.created_at.strftime("%Y-%m-%d %H:%M"),
+        }
+        for row in rows
+    ]
+
+
+def init_detector(app):
+    """Configure the detector and subscribe it to the audit stream"""
+    window = float(app.config.get("DETECTOR_WINDOW_SECONDS", 300))
+    detector.enabled = app.config.get("DETECTOR_ENABLED", True)
+    detector.window_seconds = window
+    detector.burst_threshold = max(1, app.config.get("DETECTOR_BURST_THRESHOLD", 5))
+    detector.spread_threshold = max(2, app.config.get("DETECTOR_SPREAD_THRESHOLD", 5))
+    detector.off_hours = tuple(app.config.get("DETECTOR_OFF_HOURS", (60, 300)))
+    detector.sequence_seconds = float(app.config.get("DETECTOR_SEQUENCE_SECONDS", 5))
+    detector.cooldown_seconds = float(app.config.get("DETECTOR_COOLDOWN_SECONDS") or window)
+    detector.max_keys = app.config.get("DETECTOR_MAX_KEYS", 10000)
+    detector.reset()
+    audit_log.add_listener(detector.on_audit_event)
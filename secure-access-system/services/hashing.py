@@ -0,0 +1,148 @@
+# services/hashing.py
+# Bounded bcrypt executor
+#
+# bcrypt is deliberately slow (tens to hundreds of ms per call). Running it
+# inline lets a burst of logins occupy every request worker. All hashing
+# goes through a small thread pool instead (bcrypt releases the GIL while
+# it works), with a hard cap on queued jobs: when the queue is full we
+# fail fast with HashingBusy (503) rather than pile up more waiting workers.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+from services.metrics import metrics
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 32
+DEFAULT_TIMEOUT = 5.0  # seconds a caller waits for its result
+DEFAULT_ROUNDS = 12  # bcrypt cost factor
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a result took too long"""
+
+
+class HashPool:
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT, rounds=DEFAULT_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Counts running + queued jobs
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _release(self, future):
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for the result"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("Password hashing queue is full")
+        with self._pending_lock:
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except RuntimeError:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy("Password hashing timed out")
+
+    def hash_password(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        start = time.perf_counter()
+        try:
+            return self.run(bcrypt.hashpw, password.encode(), salt).decode()
+        finally:
+            metrics.observe_bcrypt("hash", time.perf_counter() - start)
+
+    def check_password(self, password, password_hash):
+        start = time.perf_counter()
+        try:
+            return self.run(bcrypt.checkpw, password.encode(), password_hash.encode())
+        finally:
+            metrics.observe_bcrypt("check", time.perf_counter() - start)
+
+    def hash_many(self, passwords):
+        """
+        Hash a batch of passwords in parallel (bulk imports).
+
+        At most `workers` jobs from one batch are in flight at a time, and
+        each waits for a free queue slot, so a big batch slows itself down
+        instead of crowding out interactive logins.
+        """
+        window = threading.Semaphore(self.workers)
+        futures = []
+        start = time.perf_counter()
+
+        def job(password):
+            try:
+                salt = bcrypt.gensalt(rounds=self.rounds)
+                return bcrypt.hashpw(password.encode(), salt).decode()
+            finally:
+                window.release()
+
+        for password in passwords:
+            window.acquire()
+            if not self._slots.acquire(timeout=self.timeout):
+                window.release()
+                raise HashingBusy("Password hashing queue is full")
+            with self._pending_lock:
+                self._pending += 1
+            future = self._executor.submit(job, password)
+            future.add_done_callback(self._release)
+            futures.append(future)
+
+        try:
+            return [future.result() for future in futures]
+        finally:
+            metrics.observe_bcrypt("hash_many", time.perf_counter() - start)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_hash_pool(config):
+    """(Re)build the shared pool from a config mapping"""
+    global _pool
+    with _pool_lock:
+        old = _pool
+        _pool = HashPool(
+            workers=config.get("HASH_POOL_WORKERS", DEFAULT_WORKERS),
+            max_pending=config.get("HASH_POOL_MAX_PENDING", DEFAULT_MAX_PENDING),
+            timeout=config.get("HASH_TIMEOUT", DEFAULT_TIMEOUT),
+            rounds=config.get("BCRYPT_ROUNDS", DEFAULT_ROUNDS),
+        )
+    if old is not None:
+        old.shutdown(wait=False)
+    return _pool
+
+
+def get_hash_pool():
+    """The shared pool (created with defaults if create_app hasn't run)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashPool()
+    return _pool
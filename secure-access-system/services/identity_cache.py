@@ -0,0 +1,111 @@
+# services/identity_cache.py
+# In-process cache of "who is the caller" lookups
+#
+# Flask-Login's user_loader and the session-based login_required run on
+# almost every request. Instead of loading the User row each time they get
+# a small read-only snapshot from this cache. Entries expire after a TTL,
+# and the routes that change what a snapshot holds (activate/deactivate,
+# unlock, password change) call invalidate() so the change applies at once.
+#
+# Each worker process has its own cache and invalidate() only clears the
+# local copy. Other processes notice through the shared users_version
+# (services/data_version.py), which every change to a snapshot field
+# bumps: a cache reads it at most every IDENTITY_CACHE_SYNC_SECONDS and
+# drops all its entries when it has moved. A deactivation or role change therefore applies in
+# every worker within that second, not after the TTL.
+
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from models import db, User
+from services.data_version import users_version
+
+DEFAULT_TTL = 300  # seconds
+DEFAULT_SYNC_SECONDS = 1.0
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class CachedIdentity(UserMixin):
+    """Read-only snapshot of the User fields needed to serve a request"""
+
+    FIELDS = (
+        "id", "username", "first_name", "last_name", "email", "role",
+        "is_active", "is_locked", "created_at",
+    )
+
+    # Plain attribute, replacing UserMixin's always-True property
+    is_active = True
+
+    def __init__(self, user):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def __repr__(self):
+        return f"<CachedIdentity {self.username} ({self.role})>"
+
+
+class IdentityCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, sync_seconds=DEFAULT_SYNC_SECONDS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sync_seconds = sync_seconds
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _sync(self, now):
+        # Users changed in any process since the entries were loaded?
+        if now - self._checked_at < self.sync_seconds:
+            return
+        version = users_version()
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def get(self, user_id):
+        """Snapshot for user_id, loading it from the database on a miss"""
+        user_id = int(user_id)
+        now = time.monotonic()
+        self._sync(now)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        user = db.session.get(User, user_id)
+        if not user:
+            self.invalidate(user_id)
+            return None
+
+        identity = CachedIdentity(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._checked_at = float("-inf")
+
+
+identity_cache = IdentityCache()
+
+
+def init_identity_cache(config):
+    identity_cache.ttl = config.get("IDENTITY_CACHE_TTL", DEFAULT_TTL)
+    identity_cache.max_entries = config.get("IDENTITY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+    identity_cache.sync_seconds = config.get("IDENTITY_CACHE_SYNC_SECONDS", DEFAULT_SYNC_SECONDS)
+    identity_cache.clear()
@@ -0,0 +1,166 @@
+# services/login_guard.py
+# Login throttling and account lockout (shared by /api/login and /login)
+#
+# Every attempt first passes two in-memory token buckets: one per email
+# and one per client IP. A bucket holds `burst` tokens and refills one
+# token every `refill_seconds`, which behaves like a sliding window of
+# recent attempts. Attempts that find an empty bucket are rejected before
+# any user lookup, bcrypt work or database write. Attempts that get
+# through fall back to the existing failed_login_attempts / is_locked
+# lockout, which lives here too so both login routes share it.
+#
+# NOTE: buckets are per process. With N workers an attacker gets up to
+# N times the configured rate, which still bounds the work per worker.
+
+import threading
+import time
+from collections import OrderedDict
+from models import db
+from services import audit as events
+from services.audit import audit
+
+SWEEP_EVERY = 1000  # takes between sweeps of idle buckets
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by string, kept in LRU order.
+
+    Each entry is just (tokens, last_update). Entries that have been idle
+    long enough to be full again are indistinguishable from new ones, so
+    they are swept out; max_keys caps memory under a flood of new keys.
+    """
+
+    def __init__(self, burst, refill_seconds, max_keys=100000):
+        self.burst = float(burst)
+        self.rate = 1.0 / refill_seconds
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._full_after = self.burst / self.rate
+        self._takes = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _tokens(self, key, now):
+        entry = self._buckets.get(key)
+        if entry is None:
+            return self.burst
+        tokens, updated = entry
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key, now):
+        """Seconds until `key` may try again (0 if it may try now)"""
+        tokens = self._tokens(key, now)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate
+
+    def take(self, key, now):
+        tokens = self._tokens(key, now)
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        self._takes += 1
+        if self._takes % SWEEP_EVERY == 0:
+            self.sweep(now)
+
+    def reset(self, key):
+        self._buckets.pop(key, None)
+
+    def sweep(self, now):
+        # Oldest-updated entries come first, so stop at the first live one
+        while self._buckets:
+            key, (tokens, updated) = next(iter(self._buckets.items()))
+            if now - updated < self._full_after:
+                break
+            self._buckets.popitem(last=False)
+
+
+class LoginThrottle:
+    def __init__(self, enabled=True, email_burst=5, email_refill_seconds=60,
+                 ip_burst=30, ip_refill_seconds=2, max_keys=100000):
+        self.enabled = enabled
+        self.by_email = TokenBucketLimiter(email_burst, email_refill_seconds, max_keys)
+        self.by_ip = TokenBucketLimiter(ip_burst, ip_refill_seconds, max_keys)
+        self._lock = threading.Lock()
+
+    def check(self, email, ip):
+        """
+        Count one login attempt.
+
+        Returns 0 if it may proceed, otherwise the seconds to wait; a
+        rejected attempt doesn't use up tokens.
+        """
+        if not self.enabled:
+            return 0
+        email = (email or "").strip().lower()
+        ip = ip or "unknown"
+        now = time.monotonic()
+        with self._lock:
+            wait = max(self.by_email.retry_after(email, now), self.by_ip.retry_after(ip, now))
+            if wait:
+                return wait
+            self.by_email.take(email, now)
+            self.by_ip.take(ip, now)
+            return 0
+
+    def succeeded(self, email):
+        """A correct password clears that account's attempt history"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.by_email.reset((email or "").strip().lower())
+
+
+login_throttle = LoginThrottle()
+
+# Failed password attempts before an account is locked
+lockout_threshold = 3
+
+
+def init_login_guard(config):
+    global login_throttle, lockout_threshold
+    login_throttle = LoginThrottle(
+        enabled=config.get("LOGIN_THROTTLE_ENABLED", True),
+        email_burst=config.get("LOGIN_EMAIL_BURST", 5),
+        email_refill_seconds=config.get("LOGIN_EMAIL_REFILL_SECONDS", 60),
+        ip_burst=config.get("LOGIN_IP_BURST", 30),
+        ip_refill_seconds=config.get("LOGIN_IP_REFILL_SECONDS", 2),
+        max_keys=config.get("LOGIN_THROTTLE_MAX_KEYS", 100000),
+    )
+    lockout_threshold = config.get("LOCKOUT_THRESHOLD", 3)
+
+
+# ---------------- LOGIN FLOW HELPERS ----------------
+
+def throttle_login(email, ip):
+    """Seconds the caller must wait (0 = go ahead); audits rejections"""
+    wait = login_throttle.check(email, ip)
+    if wait:
+        audit(events.LOGIN_THROTTLED, email=email, detail=f"retry after {int(wait) + 1}s")
+    return wait
+
+
+def record_failed_login(user, lockable=True):
+    """Count a wrong password and lock the account at the threshold"""
+    audit(events.LOGIN_FAILURE, user=user, detail="wrong password")
+    if not lockable:
+        return
+    user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
+    if user.failed_login_attempts >= lockout_threshold:
+        user.is_locked = True
+        audit(events.ACCOUNT_LOCKED, user=user, detail="too many failed logins")
+    db.session.commit()
+
+
+def record_successful_login(user):
+    """Clear failed attempts (only writes if there were any)"""
+    login_throttle.succeeded(user.email)
+    if user.failed_login_attempts:
+        user.failed_login_attempts = 0
+        db.session.commit()
+    audit(events.LOGIN_SUCCESS, user=user)
@@ -0,0 +1,248 @@
+# services/metrics.py
+# Request / SQL / bcrypt instrumentation in Prometheus text format
+#
+# init_metrics() hooks into the app and the SQLAlchemy engine:
+#   * every request's latency goes into a histogram per endpoint
+#     (blueprint.view name) and method, plus a request counter by status;
+#   * every SQL statement is timed with engine cursor events and charged
+#     to the request running on the same thread (statements from
+#     background threads such as the audit writer count as "background");
+#   * bcrypt time is reported by services/hashing.py via observe_bcrypt().
+# GET /metrics renders everything for a Prometheus scrape.
+#
+# With SLOW_REQUEST_SECONDS set, requests slower than that are logged with
+# the statements they ran, slowest first.
+#
+# NOTE: metrics are per process; with several workers each one exposes
+# its own numbers (scrape them separately or aggregate by instance).
+
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+
+PREFIX = "gatekeeper"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BCRYPT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels, values, ("le", _format_number(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.request_duration = Histogram(
+            f"{PREFIX}_request_duration_seconds", "Request latency by endpoint",
+            LATENCY_BUCKETS, ("endpoint", "method"))
+        self.requests = Counter(
+            f"{PREFIX}_requests_total", "Requests by endpoint and status", ("endpoint", "method", "status"))
+        self.request_queries = Histogram(
+            f"{PREFIX}_request_sql_queries", "SQL statements per request",
+            QUERY_COUNT_BUCKETS, ("endpoint",))
+        self.sql_queries = Counter(
+            f"{PREFIX}_sql_queries_total", "SQL statements executed", ("endpoint",))
+        self.sql_seconds = Counter(
+            f"{PREFIX}_sql_duration_seconds_total", "Time spent in SQL statements", ("endpoint",))
+        self.bcrypt_duration = Histogram(
+            f"{PREFIX}_bcrypt_duration_seconds", "bcrypt time seen by the caller (including queue wait)",
+            BCRYPT_BUCKETS, ("operation",))
+        self.bcrypt_seconds = Counter(
+            f"{PREFIX}_request_bcrypt_seconds_total", "bcrypt time charged to requests", ("endpoint",))
+        self.slow_requests = Counter(
+            f"{PREFIX}_slow_requests_total", "Requests over SLOW_REQUEST_SECONDS", ("endpoint",))
+
+        self.slow_request_seconds = None
+        self.slow_request_max_queries = 20
+        self._local = threading.local()
+
+    # ---------------- PER-REQUEST STATE ----------------
+
+    def _current(self):
+        return getattr(self._local, "request", None)
+
+    def start_request(self):
+        self._local.request = {
+            "start": time.perf_counter(),
+            "queries": 0,
+            "sql_seconds": 0.0,
+            "bcrypt_seconds": 0.0,
+            "statements": [] if self.slow_request_seconds else None,
+        }
+
+    def finish_request(self, endpoint, method, status, logger=None):
+        state = self._current()
+        self._local.request = None
+        if state is None:
+            return
+        elapsed = time.perf_counter() - state["start"]
+
+        self.request_duration.observe(elapsed, endpoint, method)
+        self.requests.inc(endpoint, method, str(status))
+        self.request_queries.observe(state["queries"], endpoint)
+        if state["queries"]:
+            self.sql_queries.inc(endpoint, amount=state["queries"])
+            self.sql_seconds.inc(endpoint, amount=state["sql_seconds"])
+        if state["bcrypt_seconds"]:
+            self.bcrypt_seconds.inc(endpoint, amount=state["bcrypt_seconds"])
+
+        if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+            self.slow_requests.inc(endpoint)
+            if logger is not None:
+                self._log_slow(logger, endpoint, method, status, elapsed, state)
+
+    def _log_slow(self, logger, endpoint, method, status, elapsed, state):
+        statements = sorted(state["statements"], key=lambda item: item[1], reverse=True)
+        lines = [
+            f"Slow request: {method} {endpoint} -> {status} in {elapsed * 1000:.1f} ms "
+            f"({state['queries']} queries, {state['sql_seconds'] * 1000:.1f} ms SQL, "
+            f"{state['bcrypt_seconds'] * 1000:.1f} ms bcrypt)"
+        ]
+        for statement, seconds in statements[:self.slow_request_max_queries]:
+            lines.append(f"  {seconds * 1000:8.2f} ms  {statement}")
+        if len(statements) > self.slow_request_max_queries:
+            lines.append(f"  ... {len(statements) - self.slow_request_max_queries} more")
+        logger.warning("\n".join(lines))
+
+    # ---------------- OBSERVERS ----------------
+
+    def observe_query(self, statement, seconds):
+        state = self._current()
+        if state is None:
+            self.sql_queries.inc("background")
+            self.sql_seconds.inc("background", amount=seconds)
+            return
+        state["queries"] += 1
+        state["sql_seconds"] += seconds
+        if state["statements"] is not None:
+            state["statements"].append((" ".join(statement.split())[:300], seconds))
+
+    def observe_bcrypt(self, operation, seconds):
+        self.bcrypt_duration.observe(seconds, operation)
+        state = self._current()
+        if state is not None:
+            state["bcrypt_seconds"] += seconds
+
+    # ---------------- EXPOSITION ----------------
+
+    def render(self, extra=()):
+        """Everything in Prometheus text format; extra: (name, type, help, value)"""
+        lines = []
+        for metric in (self.request_duration, self.requests, self.request_queries, self.sql_queries,
+                       self.sql_seconds, self.bcrypt_duration, self.bcrypt_seconds, self.slow_requests):
+            lines.extend(metric.render())
+        for name, kind, help_text, value in extra:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.append(f"{PREFIX}_{name} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if starts:
+        metrics.observe_query(statement, time.perf_counter() - starts.pop())
+
+
+def init_metrics(app, engine):
+    """Install the request hooks and SQL timing listeners"""
+    metrics.slow_request_seconds = app.config.get("SLOW_REQUEST_SECONDS")
+    metrics.slow_request_max_queries = app.config.get("SLOW_REQUEST_MAX_QUERIES", 20)
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        metrics.start_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        # Unmatched URLs share one label so scans can't blow up cardinality
+        metrics.finish_request(request.endpoint or "unmatched", request.method,
+                               response.status_code, app.logger)
+        return response
@@ -0,0 +1,255 @@
+# services/migrations.py
+# Versioned schema migrations
+#
+# db.create_all() only creates missing tables; it never adds columns or
+# indexes to a table that already exists. Each migration below brings an
+# older database up to the current models and is recorded in the
+# schema_version table. Migrations run at startup, are idempotent (so two
+# workers starting at once can't break each other) and only ever add
+# things, so they are safe to apply while the app is serving.
+#
+# To add one: append a (version, description, function) entry to
+# MIGRATIONS with the next version number. Never edit an applied one.
+
+from datetime import datetime
+from sqlalchemy import MetaData, text
+from sqlalchemy.schema import CreateTable
+from models import db, DailyRollup, TokenRevocation, PresenceEvent
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def _add_column(conn, table, column, ddl_type):
+    if column not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_index(conn, name, table, columns):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _use_autoincrement(conn, table):
+    """
+    Rebuild `table` (a model's Table with sqlite_autoincrement) so SQLite
+    never hands out a deleted row's id again. ALTER TABLE can't do that,
+    so the rows are copied into a new table that then takes the old name.
+    """
+    ddl = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+    ).scalar()
+    if ddl is None or "AUTOINCREMENT" in ddl.upper():
+        return
+    staging = f"{table.name}_rebuild"
+    # Only left over from the old runner, which could die half way
+    conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+    conn.execute(CreateTable(table.to_metadata(MetaData(), name=staging)))
+    columns = ", ".join(column.name for column in table.columns)
+    # Copying the ids also starts the AUTOINCREMENT sequence after the highest
+    conn.execute(text(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {staging} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# ---------------- MIGRATIONS ----------------
+
+def _001_reset_token_columns(conn):
+    # web.forgot_password writes these but they were never in the schema
+    _add_column(conn, "users", "reset_token", "VARCHAR(100)")
+    _add_column(conn, "users", "reset_token_expiry", "DATETIME")
+    _create_index(conn, "ix_users_reset_token", "users", ["reset_token"])
+
+
+def _002_user_filter_indexes(conn):
+    # Dashboard counts, "new in 7 days" and the keyset-paginated user list
+    # all filter on role / is_active / is_locked and sort by created_at.
+    _create_index(conn, "ix_users_created_at", "users", ["created_at"])
+    _create_index(conn, "ix_users_role_created_at", "users", ["role", "created_at"])
+    _create_index(conn, "ix_users_active_created_at", "users", ["is_active", "created_at"])
+    _create_index(conn, "ix_users_locked_created_at", "users", ["is_locked", "created_at"])
+    _create_index(conn, "ix_users_role_active_locked", "users", ["role", "is_active", "is_locked", "created_at"])
+
+
+def _003_user_search_index(conn):
+    # Full-text index for services/user_search.py. External content: the
+    # text stays in users, users_fts only holds the index, and the triggers
+    # keep it in step with every write (ORM or raw SQL).
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+        "first_name, last_name, username, email, "
+        "content='users', content_rowid='id', "
+        "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts (rowid, first_name, last_name, username, email) "
+        "VALUES (new.id, new.first_name, new.last_name, new.username, new.email); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts (users_fts, rowid, first_name, last_name, username, email) "
+        "VALUES ('delete', old.id, old.first_name, old.last_name, old.username, old.email); END"
+    ))
+    # Only the indexed columns: login attempts etc. don't touch the index
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_update "
+        "AFTER UPDATE OF first_name, last_name, username, email ON users BEGIN "
+        "INSERT INTO users_fts (users_fts, rowid, first_name, last_name, username, email) "
+        "VALUES ('delete', old.id, old.first_name, old.last_name, old.username, old.email); "
+        "INSERT INTO users_fts (rowid, first_name, last_name, username, email) "
+        "VALUES (new.id, new.first_name, new.last_name, new.username, new.email); END"
+    ))
+    # Index the existing rows; names weigh more than username, then email
+    conn.execute(text("INSERT INTO users_fts (users_fts) VALUES ('rebuild')"))
+    conn.execute(text("INSERT INTO users_fts (users_fts, rank) VALUES ('rank', 'bm25(10.0, 10.0, 5.0, 2.0)')"))
+
+
+def _004_access_event_type_index(conn):
+    # The dashboard lists the latest security alerts: event_type filter,
+    # newest (highest id) first; the index carries the rowid for that order
+    _create_index(conn, "ix_access_events_event_type", "access_events", ["event_type"])
+
+
+def _005_daily_rollups(conn):
+    # Every user insert and audit batch now writes to this table, so an
+    # upgraded database must have it before the new code serves requests
+    # (bootstrap then backfills it from history)
+    DailyRollup.__table__.create(conn, checkfirst=True)
+
+
+def _006_token_revocation_autoincrement(conn):
+    # Revocations are synced incrementally (id > last seen); purging the
+    # newest rows let SQLite reuse their ids, which other workers skipped
+    _use_autoincrement(conn, TokenRevocation.__table__)
+
+
+def _007_presence_event_autoincrement(conn):
+    # Same for presence sightings, which are purged during ingestion
+    _use_autoincrement(conn, PresenceEvent.__table__)
+
+
+MIGRATIONS = [
+    (1, "Add reset_token columns to users", _001_reset_token_columns),
+    (2, "Add indexes for user filter columns", _002_user_filter_indexes),
+    (3, "Add full-text search index for users", _003_user_search_index),
+    (4, "Add event_type index for access events", _004_access_event_type_index),
+    (5, "Add daily rollups table", _005_daily_rollups),
+    (6, "Never reuse token revocation ids", _006_token_revocation_autoincrement),
+    (7, "Never reuse presence event ids", _007_presence_event_autoincrement),
+]
+
+
+# ---------------- RUNNER ----------------
+
+def current_version(conn):
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def apply_migrations(engine=None, verbose=True):
+    """Apply every pending migration, each in its own transaction (see _apply)"""
+    engine = engine or db.engine
+    applied = []
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(200) NOT NULL, "
+            "applied_at DATETIME)"
+        ))
+
+    for version, description, migrate in MIGRATIONS:
+        if not _apply(engine, version, description, migrate):
+            continue
+        applied.append(version)
+        if verbose:
+            print(f"✅ Migration {version:03d} applied: {description}")
+
+    return applied
+
+
+def _apply(engine, version, description, migrate):
+    """
+    Run one migration and record it in a single transaction; False if it
+    was already applied.
+
+    pysqlite commits on its own before DDL statements, so a rebuild such as
+    _use_autoincrement() could be left half done. Here the driver is put in
+    autocommit mode and the transaction is ours: BEGIN IMMEDIATE also takes
+    the write lock, so a second worker waits and then sees it applied.
+    """
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            if conn.execute(text("SELECT 1 FROM schema_version WHERE version = :v"), {"v": version}).first():
+                conn.exec_driver_sql("ROLLBACK")
+                return False
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()}
+            )
+            conn.exec_driver_sql("COMMIT")
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+    return True
+
+
+# ---------------- QUERY PLAN CHECK ----------------
+
+# Hot queries and the index each is expected to use
+HOT_QUERIES = [
+    ("recent users count",
+     "SELECT count(*) FROM users WHERE created_at >= :t",
+     "ix_users_created_at"),
+    ("user list (newest first)",
+     "SELECT * FROM users ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_users_created_at"),
+    ("user list by role",
+     "SELECT * FROM users WHERE role = :role ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_users_role_created_at"),
+    ("locked users",
+     "SELECT * FROM users WHERE is_locked = 1 ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_users_locked_created_at"),
+    ("inactive users",
+     "SELECT * FROM users WHERE is_active = 0 ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_users_active_created_at"),
+    ("dashboard grouped stats",
+     "SELECT role, is_active, is_locked, count(id), "
+     "sum(CASE WHEN created_at >= :t THEN 1 ELSE 0 END) "
+     "FROM users GROUP BY role, is_active, is_locked",
+     "ix_users_role_active_locked"),
+    ("reset token lookup",
+     "SELECT * FROM users WHERE reset_token = :token",
+     "ix_users_reset_token"),
+    ("latest security alerts",
+     "SELECT * FROM access_events WHERE event_type = 'security_alert' ORDER BY id DESC LIMIT 10",
+     "ix_access_events_event_type"),
+    ("trend charts (365 days)",
+     "SELECT * FROM daily_rollups WHERE day >= :d ORDER BY day",
+     "sqlite_autoindex_daily_rollups_1"),
+]
+
+
+def check_query_plans(engine=None):
+    """
+    Run EXPLAIN QUERY PLAN on each hot query.
+
+    Returns a list of (name, expected_index, plan, ok); ok is False when
+    the plan doesn't use the expected index or sorts in a temp b-tree.
+    """
+    engine = engine or db.engine
+    params = {"t": datetime.utcnow(), "role": "resident", "token": "x", "d": datetime.utcnow().date()}
+    results = []
+    with engine.connect() as conn:
+        for name, sql, index in HOT_QUERIES:
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            plan = " | ".join(row[-1] for row in rows)
+            ok = index in plan and "TEMP B-TREE" not in plan
+            results.append((name, index, plan, ok))
+    return results
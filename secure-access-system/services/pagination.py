@@ -0,0 +1,200 @@
+# services/pagination.py
+# Keyset (cursor) pagination and streaming for user listings
+#
+# Pages are fetched with "WHERE (sort_key, id) < (last_sort_key, last_id)"
+# instead of OFFSET, so every page costs the same no matter how deep the
+# client has scrolled, and nothing but the current page is held in memory.
+
+import base64
+import json
+from datetime import datetime
+from models import User
+from services.user_search import build_match, search_rows
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+
+SORT_KEYS = ("created_at", "id")
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def user_to_dict(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "role": user.role,
+        "is_active": user.is_active,
+        "is_locked": user.is_locked,
+        "failed_login_attempts": user.failed_login_attempts,
+        "created_at": user.created_at.isoformat() if user.created_at else None
+    }
+
+
+# ---------------- REQUEST PARSING ----------------
+
+def _parse_bool(value, name):
+    if value is None or value == "":
+        return None
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid value for '{name}'")
+
+
+def parse_list_args(args):
+    """
+    Read filter/paging options from request.args.
+
+    Raises ValueError with a user-facing message on bad input.
+    """
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Invalid value for 'limit'")
+    if limit < 1:
+        raise ValueError("Invalid value for 'limit'")
+
+    sort = args.get("sort", "created_at")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"'sort' must be one of: {', '.join(SORT_KEYS)}")
+
+    # Free-text search: results come best match first, whatever 'sort' says
+    q = (args.get("q") or "").strip() or None
+    if q:
+        if build_match(q) is None:
+            raise ValueError("Search text must contain at least one letter or digit")
+        sort = "rank"
+
+    return {
+        "q": q,
+        "role": args.get("role") or None,
+        "active": _parse_bool(args.get("active"), "active"),
+        "locked": _parse_bool(args.get("locked"), "locked"),
+        "sort": sort,
+        "limit": min(limit, MAX_PAGE_SIZE),
+        "cursor": decode_cursor(args.get("cursor"), sort),
+    }
+
+
+# ---------------- CURSORS ----------------
+
+def encode_cursor(user, sort, rank=None):
+    payload = {"id": user.id}
+    if sort == "created_at":
+        # Rows imported without a timestamp page by id alone (see _after_cursor)
+        payload["created_at"] = user.created_at.isoformat() if user.created_at else None
+    elif sort == "rank":
+        payload["rank"] = rank
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        position = {"id": int(payload["id"])}
+        if sort == "created_at":
+            created_at = payload["created_at"]
+            position["created_at"] = None if created_at is None else datetime.fromisoformat(created_at)
+        elif sort == "rank":
+            # None: an unranked (newest first) search, see user_search
+            rank = payload["rank"]
+            position["rank"] = None if rank is None else float(rank)
+        return position
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+# ---------------- QUERIES ----------------
+
+def apply_filters(query, options):
+    if options.get("role"):
+        query = query.filter(User.role == options["role"])
+    if options.get("active") is not None:
+        query = query.filter(User.is_active == options["active"])
+    if options.get("locked") is not None:
+        query = query.filter(User.is_locked == options["locked"])
+    return query
+
+
+def _after_cursor(query, sort, cursor):
+    """Order newest/highest first and skip everything up to the cursor"""
+    if sort == "created_at":
+        # SQLite sorts NULL lowest, so users without a created_at come last
+        # (by id) and follow every dated cursor
+        if cursor and cursor["created_at"] is None:
+            query = query.filter(User.created_at.is_(None), User.id < cursor["id"])
+        elif cursor:
+            query = query.filter(
+                (User.created_at < cursor["created_at"]) |
+                ((User.created_at == cursor["created_at"]) & (User.id < cursor["id"])) |
+                User.created_at.is_(None)
+            )
+        return query.order_by(User.created_at.desc(), User.id.desc())
+
+    if cursor:
+        query = query.filter(User.id < cursor["id"])
+    return query.order_by(User.id.desc())
+
+
+def fetch_page(query, options):
+    """
+    Fetch one page of users.
+
+    Returns (users, next_cursor); next_cursor is None on the last page.
+    """
+    query = apply_filters(query, options)
+    if options.get("q"):
+        return _fetch_search_page(query, options)
+    query = _after_cursor(query, options["sort"], options["cursor"])
+
+    # One extra row tells us whether there is another page
+    rows = query.limit(options["limit"] + 1).all()
+    users = rows[:options["limit"]]
+    next_cursor = None
+    if len(rows) > options["limit"]:
+        next_cursor = encode_cursor(users[-1], options["sort"])
+    return users, next_cursor
+
+
+def _fetch_search_page(query, options):
+    rows = search_rows(query, options["q"], options["cursor"]).limit(options["limit"] + 1).all()
+    page = rows[:options["limit"]]
+    next_cursor = None
+    if len(rows) > options["limit"]:
+        user, rank = page[-1]
+        next_cursor = encode_cursor(user, "rank", rank)
+    return [user for user, _ in page], next_cursor
+
+
+def iter_users(query, options, batch_size=STREAM_BATCH_SIZE):
+    """Yield every matching user, fetching batch_size rows at a time"""
+    batch_options = dict(options, limit=batch_size)
+    while True:
+        users, next_cursor = fetch_page(query, batch_options)
+        for user in users:
+            yield user
+        if not next_cursor:
+            return
+        batch_options["cursor"] = decode_cursor(next_cursor, options["sort"])
+
+
+def stream_users_json(query, options):
+    """Stream {"users": [...]} without building the whole list in memory"""
+    yield '{"users": ['
+    first = True
+    for user in iter_users(query, options):
+        yield ("" if first else ",") + json.dumps(user_to_dict(user))
+        first = False
+    yield "]}"
@@ -0,0 +1,246 @@
+# services/presence.py
+# Proximity validation: who is on site right now
+#
+# Access requires the resident to be on site: associated with the secured
+# Wi-Fi and seen by a beacon. Local network gear posts batches of those
+# sightings to /api/presence/events; this module keeps, per resident, the
+# latest sighting of each kind in memory. A sighting counts for
+# PRESENCE_WINDOW_SECONDS; older ones are evicted as time moves on, so
+# is_on_site() is a couple of dict lookups and no database query.
+#
+# Sightings are also appended to the presence_events table so every
+# worker process sees them: others pick up new rows with an incremental
+# query (id > last seen) at most once every PRESENCE_SYNC_SECONDS, and a
+# restarted worker reloads the latest sighting per resident still inside
+# the window. Rows older than the window can't affect anything and are
+# purged.
+
+import math
+import threading
+import time
+from collections import deque
+from sqlalchemy import func
+from models import db, PresenceEvent
+
+KINDS = ("wifi", "beacon")
+PURGE_SECONDS = 60  # how often ingestion deletes rows older than the window
+
+
+class PresenceTable:
+    def __init__(self):
+        self.window_seconds = 120.0
+        self.required_kinds = KINDS
+        self.sync_seconds = 1.0
+        self.clock_skew = 30.0
+        self.max_batch = 1000
+        self._seen = {}  # user_id -> {kind: (seen_at, source)}
+        self._expiry = deque()  # (seen_at, user_id) in arrival order, for eviction
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._last_purge = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    # ---------------- IN-MEMORY TABLE ----------------
+
+    def _observe(self, user_id, kind, seen_at, source):
+        entry = self._seen.setdefault(user_id, {})
+        current = entry.get(kind)
+        if current is None or seen_at > current[0]:
+            entry[kind] = (seen_at, source)
+            self._expiry.append((seen_at, user_id))
+
+    def _apply(self, rows):
+        for row_id, user_id, kind, seen_at, source in rows:
+            self._observe(user_id, kind, seen_at, source)
+            self._last_id = max(self._last_id, row_id)
+
+    def _evict(self, now):
+        cutoff = now - self.window_seconds
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, user_id = self._expiry.popleft()
+            entry = self._seen.get(user_id)
+            if entry is None:
+                continue
+            for kind in [kind for kind, (seen_at, _) in entry.items() if seen_at < cutoff]:
+                del entry[kind]
+            if not entry:
+                del self._seen[user_id]
+
+    def reset(self):
+        """Forget everything; the next check reloads from storage"""
+        with self._lock:
+            self._seen = {}
+            self._expiry = deque()
+            self._last_id = 0
+            self._loaded = False
+
+    # ---------------- STORAGE ----------------
+
+    def purge_expired(self, now=None):
+        """Delete rows older than the window (commits)"""
+        cutoff = (now or time.time()) - self.window_seconds
+        deleted = PresenceEvent.query.filter(PresenceEvent.seen_at < cutoff).delete()
+        db.session.commit()
+        return deleted
+
+    def _columns(self):
+        return db.session.query(
+            PresenceEvent.id, PresenceEvent.user_id, PresenceEvent.kind,
+            PresenceEvent.seen_at, PresenceEvent.source
+        )
+
+    def rebuild(self):
+        """Reload the latest sighting of each kind per resident inside the window"""
+        now = time.time()
+        last_id = db.session.query(func.max(PresenceEvent.id)).scalar() or 0
+        # SQLite returns the bare "source" column from the row holding max(seen_at)
+        rows = (
+            db.session.query(PresenceEvent.user_id, PresenceEvent.kind,
+                             func.max(PresenceEvent.seen_at), PresenceEvent.source)
+            .filter(PresenceEvent.seen_at >= now - self.window_seconds, PresenceEvent.id <= last_id)
+            .group_by(PresenceEvent.user_id, PresenceEvent.kind)
+            .all()
+        )
+        # Arrival order = seen_at order, so eviction can stop at the first live one
+        rows.sort(key=lambda row: row[2])
+        with self._lock:
+            self._seen = {}
+            self._expiry = deque()
+            for user_id, kind, seen_at, source in rows:
+                self._observe(user_id, kind, seen_at, source)
+            self._last_id = last_id
+            self._last_sync = time.monotonic()
+            self._loaded = True
+
+    def sync(self):
+        """Pick up sightings ingested by other processes (rate limited)"""
+        if not self._loaded:
+            self.rebuild()
+            return
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_seconds:
+            return
+        with self._lock:
+            if now - self._last_sync < self.sync_seconds:
+                return
+            self._last_sync = now
+            last_id = self._last_id
+
+        rows = self._columns().filter(PresenceEvent.id > last_id).order_by(PresenceEvent.id).all()
+        with self._lock:
+            self._apply(rows)
+            self._evict(time.time())
+
+    # ---------------- INGESTION ----------------
+
+    def parse_events(self, events, now=None):
+        """
+        Validate a batch of sightings from the gear.
+
+        Returns (rows, errors): rows ready for record(), errors as
+        {"index", "error"} for the events that were skipped.
+        """
+        now = now or time.time()
+        rows = []
+        errors = []
+        for index, event in enumerate(events):
+            if not isinstance(event, dict):
+                errors.append({"index": index, "error": "event must be an object"})
+                continue
+            kind = event.get("kind")
+            if kind not in KINDS:
+                errors.append({"index": index, "error": f"'kind' must be one of: {', '.join(KINDS)}"})
+                continue
+            try:
+                user_id = int(event.get("user_id"))
+                seen_at = float(event.get("ts", now))
+            except (TypeError, ValueError):
+                errors.append({"index": index, "error": "'user_id' and 'ts' must be numbers"})
+                continue
+            if not math.isfinite(seen_at):
+                # float() takes "nan" / "inf"; NaN would pass both window checks
+                errors.append({"index": index, "error": "'ts' must be a finite number"})
+                continue
+            if seen_at > now + self.clock_skew:
+                errors.append({"index": index, "error": "'ts' is in the future"})
+                continue
+            if seen_at < now - self.window_seconds:
+                errors.append({"index": index, "error": "'ts' is older than the presence window"})
+                continue
+            source = event.get("source")
+            rows.append({
+                "user_id": user_id,
+                "kind": kind,
+                "seen_at": seen_at,
+                "source": str(source)[:64] if source is not None else None,
+            })
+        return rows, errors
+
+    def record(self, rows):
+        """Store validated sightings (commits) and apply them here at once"""
+        if not rows:
+            return 0
+        db.session.execute(PresenceEvent.__table__.insert(), rows)
+        # One writer at a time, so this batch got the ids last - len + 1 .. last
+        last = db.session.query(func.max(PresenceEvent.id)).scalar()
+        db.session.commit()
+
+        now = time.time()
+        with self._lock:
+            # If nothing from other processes came in between, sync() can
+            # skip our own rows; otherwise it re-reads them (harmless)
+            if self._loaded and self._last_id == last - len(rows):
+                self._last_id = last
+            for row in rows:
+                self._observe(row["user_id"], row["kind"], row["seen_at"], row["source"])
+            self._evict(now)
+            purge = now - self._last_purge >= PURGE_SECONDS
+            if purge:
+                self._last_purge = now
+        if purge:
+            self.purge_expired(now)
+        return len(rows)
+
+    # ---------------- CHECKS ----------------
+
+    def is_on_site(self, user_id, now=None):
+        """True if every required kind of sighting is inside the window"""
+        self.sync()
+        entry = self._seen.get(user_id)
+        if not entry:
+            return False
+        cutoff = (now or time.time()) - self.window_seconds
+        for kind in self.required_kinds:
+            seen = entry.get(kind)
+            if seen is None or seen[0] < cutoff:
+                return False
+        return True
+
+    def status(self, user_id, now=None):
+        """Latest sighting of each kind still inside the window"""
+        now = now or time.time()
+        on_site = self.is_on_site(user_id, now)
+        cutoff = now - self.window_seconds
+        signals = {
+            kind: {"seen_at": seen_at, "source": source, "age_seconds": round(now - seen_at, 1)}
+            for kind, (seen_at, source) in dict(self._seen.get(user_id, {})).items()
+            if seen_at >= cutoff
+        }
+        return {"user_id": user_id, "on_site": on_site, "signals": signals}
+
+
+presence = PresenceTable()
+
+
+def init_presence(app):
+    """Configure the presence table (loaded on first check)"""
+    presence.window_seconds = float(app.config.get("PRESENCE_WINDOW_SECONDS", 120))
+    presence.required_kinds = tuple(app.config.get("PRESENCE_REQUIRED_SIGNALS", KINDS))
+    presence.sync_seconds = float(app.config.get("PRESENCE_SYNC_SECONDS", 1))
+    presence.clock_skew = float(app.config.get("PRESENCE_CLOCK_SKEW", 30))
+    presence.max_batch = app.config.get("PRESENCE_MAX_BATCH", 1000)
+    presence.reset()
@@ -0,0 +1,170 @@
+# services/revocation.py
+# Early revocation of API access tokens and virtual door keys
+#
+# Access tokens and door keys are self-contained signed tokens, so without
+# this a deactivated user keeps access until they expire. Revoking a user records
+# "every token for this user issued before time T is invalid" in the
+# token_revocations table and in an in-memory dict {user_id: T}.
+# flask_jwt_extended's blocklist callback checks that dict on every
+# protected request: a dict lookup, no database query.
+#
+# The dict is built from the table on the first check. Other worker
+# processes pick up new rows with a small incremental query (id > last
+# seen) at most once every REVOCATION_SYNC_SECONDS. A row is kept for as
+# long as anything it revokes could still be valid: the longer of the JWT
+# lifetime and the virtual key TTL (a day by default). After that it can no
+# longer match a valid credential; the bootstrap command purges it.
+
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db, TokenRevocation
+from services.virtual_keys import DEFAULT_TTL as KEY_TTL, CLOCK_SKEW as KEY_CLOCK_SKEW
+
+
+class RevocationList:
+    def __init__(self):
+        self.credential_lifetime = 3600  # seconds; see init_revocation()
+        self.sync_seconds = 5.0
+        self._cutoffs = {}  # user_id -> tokens with iat < cutoff are revoked
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cutoffs)
+
+    def _apply(self, rows):
+        for row_id, user_id, revoked_before in rows:
+            if revoked_before > self._cutoffs.get(user_id, 0):
+                self._cutoffs[user_id] = revoked_before
+            self._last_id = max(self._last_id, row_id)
+
+    def reset(self):
+        """Forget everything; the next check reloads from storage"""
+        with self._lock:
+            self._cutoffs = {}
+            self._last_id = 0
+            self._loaded = False
+
+    def purge_expired(self):
+        """Delete rows older than any live token (commits)"""
+        deleted = TokenRevocation.query.filter(TokenRevocation.expires_at < datetime.utcnow()).delete()
+        db.session.commit()
+        return deleted
+
+    def rebuild(self):
+        """Reload every unexpired row from storage"""
+        rows = db.session.query(
+            TokenRevocation.id, TokenRevocation.user_id, TokenRevocation.revoked_before
+        ).filter(TokenRevocation.expires_at >= datetime.utcnow()).all()
+        with self._lock:
+            self._cutoffs = {}
+            self._last_id = 0
+            self._apply(rows)
+            self._last_sync = time.monotonic()
+            self._loaded = True
+
+    def sync(self):
+        """Pick up revocations made by other processes (rate limited)"""
+        if not self._loaded:
+            self.rebuild()
+            return
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_seconds:
+            return
+        with self._lock:
+            if now - self._last_sync < self.sync_seconds:
+                return
+            self._last_sync = now
+            last_id = self._last_id
+
+        rows = (
+            db.session.query(TokenRevocation.id, TokenRevocation.user_id, TokenRevocation.revoked_before)
+            .filter(TokenRevocation.id > last_id)
+            .all()
+        )
+        if rows:
+            with self._lock:
+                self._apply(rows)
+
+    def is_revoked(self, user_id, issued_at):
+        self.sync()
+        cutoff = self._cutoffs.get(user_id)
+        return cutoff is not None and issued_at < cutoff
+
+    def revoke_user(self, user_id, reason=None):
+        """Invalidate every token issued to user_id up to now (commits)"""
+        # +1: iat has one-second resolution, so also cover tokens issued
+        # earlier in the current second
+        revoked_before = int(time.time()) + 1
+        row = TokenRevocation(
+            user_id=user_id,
+            revoked_before=revoked_before,
+            reason=reason,
+            expires_at=datetime.utcnow() + timedelta(seconds=self.credential_lifetime + 1)
+        )
+        db.session.add(row)
+        db.session.flush()
+        row_id = row.id
+        db.session.commit()
+        with self._lock:
+            self._apply([(row_id, user_id, revoked_before)])
+
+    def revoke_users(self, user_ids, reason=None):
+        """revoke_user() for many users with one INSERT (commits)"""
+        if not user_ids:
+            return
+        revoked_before = int(time.time()) + 1
+        expires_at = datetime.utcnow() + timedelta(seconds=self.credential_lifetime + 1)
+        db.session.execute(TokenRevocation.__table__.insert(), [
+            {"user_id": user_id, "revoked_before": revoked_before, "reason": reason,
+             "expires_at": expires_at, "created_at": datetime.utcnow()}
+            for user_id in user_ids
+        ])
+        db.session.commit()
+        # Row ids aren't known here; sync() reading the rows again is harmless
+        with self._lock:
+            self._apply([(0, user_id, revoked_before) for user_id in user_ids])
+
+
+revocation_list = RevocationList()
+
+
+def _token_lifetime(config):
+    expires = config.get("JWT_ACCESS_TOKEN_EXPIRES", 3600)
+    if isinstance(expires, timedelta):
+        return int(expires.total_seconds())
+    return int(expires)
+
+
+def _credential_lifetime(config):
+    # Virtual keys are checked against the same cutoffs and usually live
+    # much longer than API tokens; dropping a row before the keys it
+    # revokes expire would make them valid again after a restart
+    key_lifetime = config.get("VIRTUAL_KEY_TTL", KEY_TTL) + config.get("VIRTUAL_KEY_CLOCK_SKEW", KEY_CLOCK_SKEW)
+    return max(_token_lifetime(config), int(key_lifetime))
+
+
+def init_revocation(app, jwt):
+    """Hook the revocation list into JWT verification (loaded on first check)"""
+    revocation_list.credential_lifetime = _credential_lifetime(app.config)
+    revocation_list.sync_seconds = app.config.get("REVOCATION_SYNC_SECONDS", 5.0)
+    revocation_list.reset()
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        try:
+            user_id = int(jwt_payload["sub"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return revocation_list.is_revoked(user_id, jwt_payload.get("iat", 0))
+
+
+def revoke_user_tokens(user_id, reason=None):
+    revocation_list.revoke_user(user_id, reason)
+
+
+def revoke_tokens_for_users(user_ids, reason=None):
+    revocation_list.revoke_users(user_ids, reason)
@@ -0,0 +1,167 @@
+# services/rollups.py
+# Daily rollups behind the dashboard trend charts
+#
+# The trend charts plot signups by role, logins, failed logins and
+# lockouts per day over the last 30 or 365 days. Counting those from users
+# and access_events on every view would group months of raw rows, so
+# daily_rollups keeps one row per (UTC) day with a column per metric: a
+# year of history is 365 primary-key rows.
+#
+# Rows are kept current as things happen, each in the transaction that
+# writes the underlying data, so a rollup never counts something that was
+# rolled back or never stored:
+#
+#   signups      an after_flush hook adds the users inserted by the flush
+#   logins etc.  the audit writer adds each batch of login_success,
+#                login_failure and account_locked events as it inserts it
+#
+# Either way it is one upsert per day touched (col = col + excluded.col).
+# backfill() recomputes days from the raw tables with two grouped queries;
+# run it with scripts/backfill_rollups.py (bootstrap does when the table is
+# empty, e.g. right after upgrading).
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from models import db, User, AccessEvent, DailyRollup
+from services import audit as events
+from services.audit import audit_log
+
+ROLES = ("management", "concierge", "resident")
+
+SIGNUP_METRICS = {role: f"signups_{role}" for role in ROLES}
+EVENT_METRICS = {
+    events.LOGIN_SUCCESS: "logins",
+    events.LOGIN_FAILURE: "login_failures",
+    events.ACCOUNT_LOCKED: "lockouts",
+}
+METRICS = tuple(SIGNUP_METRICS.values()) + tuple(EVENT_METRICS.values())
+
+TREND_RANGES = (30, 365)  # days the dashboard charts offer
+
+_table = DailyRollup.__table__
+
+
+def _count(counts, day, metric, n=1):
+    row = counts.get(day)
+    if row is None:
+        row = counts[day] = dict.fromkeys(METRICS, 0)
+    row[metric] += n
+
+
+def add_counts(connection, counts):
+    """Add {day: {metric: n}} to the rollups in one upsert"""
+    if not counts:
+        return
+    statement = insert(_table).values([{"day": day, **row} for day, row in counts.items()])
+    statement = statement.on_conflict_do_update(
+        index_elements=[_table.c.day],
+        set_={metric: _table.c[metric] + statement.excluded[metric] for metric in METRICS},
+    )
+    connection.execute(statement)
+
+
+# ---------------- INCREMENTAL UPDATES ----------------
+
+def _add_signups(session, flush_context):
+    counts = {}
+    for obj in session.new:
+        if isinstance(obj, User) and obj.role in SIGNUP_METRICS:
+            created = obj.created_at or datetime.utcnow()
+            _count(counts, created.date(), SIGNUP_METRICS[obj.role])
+    add_counts(session.connection(), counts)
+
+
+def _add_audit_batch(connection, rows):
+    counts = {}
+    for row in rows:
+        metric = EVENT_METRICS.get(row["event_type"])
+        if metric is not None:
+            _count(counts, row["created_at"].date(), metric)
+    add_counts(connection, counts)
+
+
+def register_rollup_hooks():
+    """Count new users per flush and login events per audit batch"""
+    if not event.contains(db.session, "after_flush", _add_signups):
+        event.listen(db.session, "after_flush", _add_signups)
+    audit_log.add_batch_hook(_add_audit_batch)
+
+
+# ---------------- BACKFILL ----------------
+
+def _as_date(value):
+    # func.date() comes back from SQLite as 'YYYY-MM-DD'
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def backfill(days=None, today=None):
+    """
+    Recompute rollups from users and access_events: every day on record,
+    or only the last `days` days (today included). Signups are recounted
+    from the users that still exist. Returns the number of days written.
+    """
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1) if days else None
+    since = datetime.combine(start, datetime.min.time()) if start else None
+
+    signups = select(func.date(User.created_at), User.role, func.count()).where(
+        User.created_at.is_not(None), User.role.in_(SIGNUP_METRICS)
+    ).group_by(func.date(User.created_at), User.role)
+    activity = select(func.date(AccessEvent.created_at), AccessEvent.event_type, func.count()).where(
+        AccessEvent.event_type.in_(EVENT_METRICS)
+    ).group_by(func.date(AccessEvent.created_at), AccessEvent.event_type)
+    clear = _table.delete()
+    if since is not None:
+        signups = signups.where(User.created_at >= since)
+        activity = activity.where(AccessEvent.created_at >= since)
+        clear = clear.where(_table.c.day >= start)
+
+    # Delete first: holding the write lock from the start means no live
+    # update can land between the recount and the rewrite
+    with db.engine.begin() as conn:
+        conn.execute(clear)
+        counts = {}
+        for day, role, n in conn.execute(signups):
+            _count(counts, _as_date(day), SIGNUP_METRICS[role], n)
+        for day, event_type, n in conn.execute(activity):
+            _count(counts, _as_date(day), EVENT_METRICS[event_type], n)
+        add_counts(conn, counts)
+    return len(counts)
+
+
+def rollups_empty():
+    return db.session.query(DailyRollup.day).first() is None
+
+
+# ---------------- TRENDS ----------------
+
+def daily_trends(days, today=None):
+    """
+    Per-day series for the last `days` days (today included), with zeros
+    for days without activity:
+    {"days", "labels": [iso dates], "series": {metric: [...]}, "totals": {metric: n}}
+    """
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        row.day: row
+        for row in db.session.execute(
+            select(_table).where(_table.c.day >= start, _table.c.day <= today)
+        )
+    }
+
+    labels = []
+    series = {metric: [] for metric in METRICS}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        labels.append(day.isoformat())
+        row = rows.get(day)
+        for metric in METRICS:
+            series[metric].append(getattr(row, metric) if row is not None else 0)
+    return {
+        "days": days,
+        "labels": labels,
+        "series": series,
+        "totals": {metric: sum(values) for metric, values in series.items()},
+    }
@@ -0,0 +1,312 @@
+# services/sessions.py
+# Server-side web sessions: the browser only gets a short opaque id
+#
+# Flask's default session signs the whole dict into the cookie, so every
+# page and dashboard poll uploaded the user's name, email and JWT and had
+# its signature re-verified, and a session could not be ended from the
+# server. With SESSION_BACKEND = "server" the cookie holds a random id
+# and the data lives here instead:
+#
+#   memory   an LRU of recently used sessions per process (the hot path:
+#            one dict lookup per request)
+#   SQLite   the web_sessions table, written through on every change, so
+#            sessions evicted from memory (or created by another worker)
+#            are read back from disk with a primary-key lookup
+#
+# Sessions expire SESSION_IDLE_TIMEOUT seconds after their last use; the
+# expiry is pushed back at most every SESSION_REFRESH_SECONDS so reads
+# don't turn into writes. invalidate_user() ends every session of one user
+# (deactivation, password change) with one indexed DELETE. Other
+# processes notice within SESSION_SYNC_SECONDS, the longest a cached
+# entry is trusted without re-reading its row.
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin, SecureCookieSessionInterface
+from werkzeug.datastructures import CallbackDict
+from models import db, WebSession
+
+BACKENDS = ("server", "cookie")
+SID_BYTES = 32  # 43 characters of URL-safe base64
+PURGE_SECONDS = 300  # how often writes also delete expired rows
+
+_serializer = TaggedJSONSerializer()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that tracks changes; the data is stored server-side under `sid`"""
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.rotate = False
+        self.modified = False
+        self.accessed = False
+
+    # Reads mark the session accessed so responses vary on the cookie
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def regenerate(self):
+        """Move the data to a new id when saved (sign-in, so a planted id is useless)"""
+        self.rotate = True
+        self.modified = True
+
+
+class SessionStore:
+    def __init__(self):
+        self.lifetime = 12 * 60 * 60
+        self.refresh_seconds = 300.0
+        self.sync_seconds = 5.0
+        self.max_entries = 10000
+        self.hits = 0
+        self.misses = 0
+        self._engine = None
+        self._table = WebSession.__table__
+        self._entries = OrderedDict()  # sid -> [user_id, data, expires_at, checked_at]
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def configure(self, engine, lifetime, refresh_seconds, sync_seconds, max_entries):
+        self._engine = engine
+        self.lifetime = lifetime
+        self.refresh_seconds = refresh_seconds
+        self.sync_seconds = sync_seconds
+        self.max_entries = max_entries
+        self.clear()
+
+    def clear(self):
+        """Forget the in-memory copies (storage is untouched)"""
+        with self._lock:
+            self._entries.clear()
+
+    # ---------------- MEMORY ----------------
+
+    def _remember(self, sid, user_id, data, expires_at, now):
+        with self._lock:
+            self._entries[sid] = [user_id, data, expires_at, now]
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    # ---------------- READ / WRITE ----------------
+
+    def load(self, sid, now=None):
+        """Session data for sid, or None if unknown, expired or invalidated"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries.move_to_end(sid)
+        if entry is not None and now - entry[3] < self.sync_seconds:
+            if entry[2] < now:
+                self.delete(sid)
+                return None
+            self.hits += 1
+            self._touch(sid, entry, now)
+            return dict(entry[1])
+
+        # Not cached here, or cached long enough that another worker may
+        # have ended it: read the row
+        self.misses += 1
+        with self._engine.connect() as conn:
+            row = conn.execute(
+                self._table.select().where(self._table.c.sid == sid)
+            ).first()
+        if row is None or row.expires_at < now:
+            self._forget(sid)
+            if row is not None:
+                self.delete(sid)
+            return None
+        data = _serializer.loads(row.data)
+        entry = [row.user_id, data, row.expires_at, now]
+        self._remember(sid, *entry)
+        self._touch(sid, entry, now)
+        return dict(data)
+
+    def _touch(self, sid, entry, now):
+        # Sliding expiry, written back only every refresh_seconds
+        expires_at = now + self.lifetime
+        if expires_at - entry[2] < self.refresh_seconds:
+            return
+        entry[2] = expires_at
+        with self._engine.begin() as conn:
+            conn.execute(
+                self._table.update().where(self._table.c.sid == sid).values(expires_at=expires_at)
+            )
+
+    def save(self, sid, data, now=None):
+        """Store data under sid (insert or replace)"""
+        now = now or time.time()
+        data = dict(data)
+        user_id = data.get("user_id")
+        expires_at = now + self.lifetime
+        values = {"user_id": user_id, "data": _serializer.dumps(data), "expires_at": expires_at}
+        with self._engine.begin() as conn:
+            updated = conn.execute(
+                self._table.update().where(self._table.c.sid == sid).values(**values)
+            ).rowcount
+            if not updated:
+                conn.execute(self._table.insert().values(sid=sid, **values))
+        self._remember(sid, user_id, data, expires_at, now)
+
+        if now - self._last_purge >= PURGE_SECONDS:
+            self._last_purge = now
+            self.purge_expired(now)
+
+    def delete(self, sid):
+        self._forget(sid)
+        with self._engine.begin() as conn:
+            conn.execute(self._table.delete().where(self._table.c.sid == sid))
+
+    def invalidate_user(self, user_id, keep=None):
+        """End every session of user_id (except `keep`); returns how many rows went"""
+        return self.invalidate_users([user_id], keep=keep)
+
+    def invalidate_users(self, user_ids, keep=None):
+        """End every session of these users with one DELETE"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return 0
+        query = self._table.delete().where(self._table.c.user_id.in_(user_ids))
+        if keep:
+            query = query.where(self._table.c.sid != keep)
+        with self._engine.begin() as conn:
+            deleted = conn.execute(query).rowcount
+        with self._lock:
+            for sid in [sid for sid, entry in self._entries.items() if entry[0] in user_ids and sid != keep]:
+                del self._entries[sid]
+        return deleted
+
+    def purge_expired(self, now=None):
+        """Delete expired rows (also run by bootstrap, whatever the backend)"""
+        now = now or time.time()
+        with (self._engine or db.engine).begin() as conn:
+            return conn.execute(self._table.delete().where(self._table.c.expires_at < now)).rowcount
+
+
+session_store = SessionStore()
+
+
+# ---------------- FLASK INTERFACE ----------------
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data in session_store; the cookie carries only the id"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) <= 64:
+            data = self.store.load(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        # No id is handed out until something is stored
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+        if not session.modified:
+            return
+
+        if not session:
+            # Cleared (logout): end it server-side too
+            if session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       httponly=self.get_cookie_httponly(app),
+                                       samesite=self.get_cookie_samesite(app))
+            return
+
+        sid = session.sid
+        if sid is None or session.rotate:
+            if sid is not None:
+                self.store.delete(sid)
+            sid = secrets.token_urlsafe(SID_BYTES)
+        self.store.save(sid, session)
+
+        if sid != session.sid:
+            response.set_cookie(
+                name, sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+            session.sid = sid
+            session.rotate = False
+
+
+def start_session(**values):
+    """Fresh session for a sign-in: old contents dropped and, server-side, a new id"""
+    session.clear()
+    regenerate = getattr(session, "regenerate", None)
+    if regenerate is not None:
+        regenerate()
+    session.update(values)
+
+
+def end_user_sessions(user_id, keep_current=False):
+    """Sign user_id out everywhere, optionally except this request's session"""
+    if not isinstance(current_app.session_interface, ServerSessionInterface):
+        return 0  # cookie sessions can't be ended server-side
+    keep = getattr(session, "sid", None) if keep_current else None
+    return session_store.invalidate_user(user_id, keep=keep)
+
+
+def end_sessions_for_users(user_ids):
+    """end_user_sessions() for many users at once"""
+    if not isinstance(current_app.session_interface, ServerSessionInterface):
+        return 0
+    return session_store.invalidate_users(user_ids)
+
+
+def init_sessions(app, engine):
+    """Pick the session backend (SESSION_BACKEND)"""
+    backend = app.config.get("SESSION_BACKEND", "server")
+    if backend not in BACKENDS:
+        raise ValueError(f"SESSION_BACKEND must be one of: {', '.join(BACKENDS)}")
+    if backend == "cookie":
+        app.session_interface = SecureCookieSessionInterface()
+        return
+    session_store.configure(
+        engine,
+        lifetime=app.config.get("SESSION_IDLE_TIMEOUT", 12 * 60 * 60),
+        refresh_seconds=app.config.get("SESSION_REFRESH_SECONDS", 300),
+        sync_seconds=app.config.get("SESSION_SYNC_SECONDS", 5),
+        max_entries=app.config.get("SESSION_CACHE_SIZE", 10000),
+    )
+    app.session_interface = ServerSessionInterface(session_store)
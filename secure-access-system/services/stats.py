@@ -0,0 +1,210 @@
+# services/stats.py
+# Dashboard statistics engine
+#
+# All counters are computed with ONE grouped query over the users table.
+# When Config.USE_STATS_COUNTERS is on, the counters are also kept in the
+# user_stats table and updated in the same transaction as every user
+# insert/update/delete, so reading them never scans the users table.
+# Bulk UPDATEs bypass the flush hook and call invalidate_counters().
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, event, func, inspect
+from models import db, User, UserStat
+
+ROLES = ("management", "concierge", "resident")
+
+COUNTER_KEYS = (
+    "total_users",
+    "active_users",
+    "locked_users",
+    "management_count",
+    "concierge_count",
+    "resident_count",
+)
+
+# Column defaults are only applied on INSERT, so a brand new User may still
+# have None here when the flush hook looks at it.
+_COLUMN_DEFAULTS = {"is_active": True, "is_locked": False}
+
+
+def _empty_stats():
+    return {key: 0 for key in COUNTER_KEYS}
+
+
+def _recent_cutoff():
+    return datetime.utcnow() - timedelta(days=7)
+
+
+def _counters_enabled():
+    return current_app.config.get("USE_STATS_COUNTERS", False)
+
+
+# ---------------- SINGLE-PASS AGGREGATION ----------------
+
+def compute_user_stats():
+    """Compute every dashboard counter in a single grouped query"""
+    rows = (
+        db.session.query(
+            User.role,
+            User.is_active,
+            User.is_locked,
+            func.count(User.id),
+            func.sum(case((User.created_at >= _recent_cutoff(), 1), else_=0)),
+        )
+        .group_by(User.role, User.is_active, User.is_locked)
+        .all()
+    )
+
+    stats = _empty_stats()
+    stats["recent_users"] = 0
+    for role, is_active, is_locked, count, recent in rows:
+        stats["total_users"] += count
+        stats["recent_users"] += recent or 0
+        if is_active:
+            stats["active_users"] += count
+        if is_locked:
+            stats["locked_users"] += count
+        if role in ROLES:
+            stats[f"{role}_count"] += count
+    return stats
+
+
+# ---------------- MAINTAINED COUNTERS ----------------
+
+def rebuild_counters():
+    """Recompute the user_stats table from scratch (one grouped query)"""
+    stats = compute_user_stats()
+    # Only the counters: user_stats also holds the users data version
+    UserStat.query.filter(UserStat.key.in_(COUNTER_KEYS)).delete(synchronize_session=False)
+    for key in COUNTER_KEYS:
+        db.session.add(UserStat(key=key, value=stats[key]))
+    db.session.commit()
+    return stats
+
+
+def read_counters():
+    """Read the maintained counters, rebuilding them if missing or stale"""
+    rows = {row.key: row.value for row in UserStat.query.all()}
+    if any(key not in rows for key in COUNTER_KEYS):
+        stats = rebuild_counters()
+        return {key: stats[key] for key in COUNTER_KEYS}
+    return {key: rows[key] for key in COUNTER_KEYS}
+
+
+def get_user_stats():
+    """Dashboard stats, from the counters table if enabled"""
+    if not _counters_enabled():
+        return compute_user_stats()
+
+    stats = read_counters()
+    # "New in the last 7 days" moves with the clock, so it can't be a
+    # stored counter; it is a single range count on created_at instead.
+    stats["recent_users"] = User.query.filter(User.created_at >= _recent_cutoff()).count()
+    return stats
+
+
+# Pre-flush value that was never loaded (or was expired) before the flush
+UNKNOWN = object()
+
+
+def _flag_state(user, name, use_old):
+    """Current (or pre-flush) value of a boolean/role column on a User"""
+    history = inspect(user).attrs[name].history
+    if use_old:
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return UNKNOWN
+    value = getattr(user, name)
+    if value is None:
+        value = _COLUMN_DEFAULTS.get(name)
+    return value
+
+
+def _counter_deltas(user, sign, use_old=False):
+    """Counter changes for adding (+1) or removing (-1) user; None if unknown"""
+    is_active = _flag_state(user, "is_active", use_old)
+    is_locked = _flag_state(user, "is_locked", use_old)
+    role = _flag_state(user, "role", use_old)
+    if UNKNOWN in (is_active, is_locked, role):
+        return None
+    deltas = {"total_users": sign}
+    if is_active:
+        deltas["active_users"] = sign
+    if is_locked:
+        deltas["locked_users"] = sign
+    if role in ROLES:
+        deltas[f"{role}_count"] = sign
+    return deltas
+
+
+def _merge(total, deltas):
+    for key, value in deltas.items():
+        total[key] = total.get(key, 0) + value
+
+
+def collect_user_deltas(session):
+    """
+    Work out how the pending flush changes each counter.
+
+    Returns None when an old value can't be determined (it was expired or
+    never loaded, e.g. an expired attribute was overwritten); callers
+    should then force a rebuild.
+    """
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, User):
+            changes.append(_counter_deltas(obj, +1))
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes.append(_counter_deltas(obj, -1, use_old=True))
+
+    for obj in session.dirty:
+        if not isinstance(obj, User) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in ("is_active", "is_locked", "role")):
+            continue
+        changes.append(_counter_deltas(obj, -1, use_old=True))
+        changes.append(_counter_deltas(obj, +1))
+
+    deltas = {}
+    for change in changes:
+        if change is None:
+            return None
+        _merge(deltas, change)
+    return {key: value for key, value in deltas.items() if value}
+
+
+def invalidate_counters(connection):
+    """Drop the counters so the next read rebuilds them from the users table"""
+    table = UserStat.__table__
+    connection.execute(table.delete().where(table.c.key.in_(COUNTER_KEYS)))
+
+
+def _apply_counter_deltas(session, flush_context):
+    if not _counters_enabled():
+        return
+
+    deltas = collect_user_deltas(session)
+    if deltas is None:
+        # Can't trust an incremental update
+        invalidate_counters(session.connection())
+        return
+
+    table = UserStat.__table__
+    for key, value in deltas.items():
+        session.connection().execute(
+            table.update()
+            .where(table.c.key == key)
+            .values(value=table.c.value + value)
+        )
+
+
+def register_counter_hooks():
+    """Keep user_stats in step with every flush that touches users"""
+    if not event.contains(db.session, "after_flush", _apply_counter_deltas):
+        event.listen(db.session, "after_flush", _apply_counter_deltas)
@@ -0,0 +1,78 @@
+# services/user_search.py
+# Ranked prefix search over first name, last name, username and email
+#
+# Backed by the users_fts FTS5 index (migration 003), which triggers keep
+# in step with the users table. Every word typed is matched as a prefix
+# and all of them must match, so "jo smi" finds "John Smith" and
+# "john.sm" finds john.smith@... Results come best match first (bm25,
+# names weighted over username over email) and page with a (rank, id)
+# cursor, like the rest of the user listings.
+#
+# bm25 has to score every matching row before the first page can be
+# returned, which is cheap for a name but not for "s" or "jo" matching
+# half the building. Searches matching more than RANK_LIMIT rows are
+# returned newest first instead (FTS5 walks its index in rowid order and
+# stops at the page size); the cursor remembers which order it belongs to.
+
+import re
+from sqlalchemy import Table, Column, Integer, Float, String, MetaData, select, func, null
+from models import db, User
+
+MAX_TERMS = 8
+RANK_LIMIT = 500
+
+# Not part of db.metadata: created by the migration, never by create_all()
+users_fts = Table(
+    "users_fts", MetaData(),
+    Column("rowid", Integer),
+    Column("users_fts", String),  # hidden column used as the MATCH target
+    Column("rank", Float),
+)
+
+
+def build_match(text):
+    """FTS5 query for free text: each word as a quoted prefix, ANDed; None if no words"""
+    terms = re.findall(r"\w+", (text or "").lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _match(match):
+    return users_fts.c.users_fts.op("MATCH")(match)
+
+
+def should_rank(match):
+    """True if few enough rows match for bm25 ranking to stay cheap"""
+    matches = select(users_fts.c.rowid).where(_match(match)).limit(RANK_LIMIT + 1).subquery()
+    return db.session.execute(select(func.count()).select_from(matches)).scalar() <= RANK_LIMIT
+
+
+def matching_ids(text):
+    """SELECT of the ids of every user matching text (unranked), for IN (...) filters"""
+    return select(users_fts.c.rowid).where(_match(build_match(text)))
+
+
+def search_rows(query, text, cursor=None):
+    """
+    Narrow a User query to rows matching text, best match first.
+
+    Returns a query of (User, rank) rows; rank is None when the match set
+    was too large to rank. cursor is {"rank", "id"} of the last row shown.
+    """
+    match = build_match(text)
+    ranked = should_rank(match) if cursor is None else cursor["rank"] is not None
+    query = query.join(users_fts, users_fts.c.rowid == User.id).filter(_match(match))
+
+    if not ranked:
+        if cursor:
+            query = query.filter(users_fts.c.rowid < cursor["id"])
+        return query.add_columns(null().label("rank")).order_by(users_fts.c.rowid.desc())
+
+    query = query.add_columns(users_fts.c.rank)
+    if cursor:
+        query = query.filter(
+            (users_fts.c.rank > cursor["rank"]) |
+            ((users_fts.c.rank == cursor["rank"]) & (User.id > cursor["id"]))
+        )
+    return query.order_by(users_fts.c.rank, User.id)
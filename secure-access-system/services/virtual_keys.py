@@ -0,0 +1,255 @@
+# services/virtual_keys.py
+# Signed virtual keys (issue + offline verification)
+#
+# A virtual key is a compact Ed25519-signed token a resident presents at a
+# door:  gk1.<payload>.<signature>  (both parts base64url). The payload is
+# a small JSON object with the signing key id, user id, role, door group,
+# issue/expiry times and a unique key id. Doors only need the public keys
+# (GET /api/keys/public-keys), so a controller can verify presentations
+# offline without touching the users table.
+#
+# This module has no Flask or database imports so door-side code can use
+# KeyVerifier on its own. Requires the `cryptography` package.
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+KEY_PREFIX = "gk1"
+DEFAULT_TTL = 24 * 60 * 60  # seconds a key stays valid
+CLOCK_SKEW = 30  # seconds of leeway for door controller clocks
+
+VerifiedKey = namedtuple("VerifiedKey", ["key_id", "user_id", "role", "door_group", "issued_at", "expires_at", "signing_key_id"])
+
+
+class InvalidKey(Exception):
+    """The presented key is malformed, forged, expired or for another door"""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def key_id_for(public_key):
+    """Short stable id for a public key (first 8 bytes of its SHA-256)"""
+    raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+# ---------------- SIGNING (server side) ----------------
+
+class KeySigner:
+    def __init__(self, private_key, ttl=DEFAULT_TTL):
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.kid = key_id_for(self.public_key)
+        self.ttl = ttl
+
+    def issue(self, user_id, door_group, role=None, ttl=None, now=None):
+        """Return (token, VerifiedKey) for a new key"""
+        now = int(now if now is not None else time.time())
+        payload = {
+            "k": self.kid,
+            "u": user_id,
+            "r": role,
+            "g": door_group,
+            "i": now,
+            "e": now + (ttl or self.ttl),
+            "j": uuid.uuid4().hex,
+        }
+        body = f"{KEY_PREFIX}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+        signature = self.private_key.sign(body.encode())
+        token = f"{body}.{_b64encode(signature)}"
+        return token, VerifiedKey(payload["j"], user_id, role, door_group, payload["i"], payload["e"], self.kid)
+
+
+def load_or_create_signing_keys(directory):
+    """
+    Load every Ed25519 private key (*.pem) in `directory`, creating one if
+    there are none. Returns signers newest first; the first one is used for
+    issuing, the rest stay valid for verification until their keys expire.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".pem")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    if not paths:
+        private_key = Ed25519PrivateKey.generate()
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        path = os.path.join(directory, f"{key_id_for(private_key.public_key())}.pem")
+        # Private key: readable by the server account only
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        paths = [path]
+
+    signers = []
+    for path in paths:
+        with open(path, "rb") as f:
+            signers.append(KeySigner(serialization.load_pem_private_key(f.read(), password=None)))
+    return signers
+
+
+def export_public_keys(signers):
+    """Public keys for door controllers: [{"kid": ..., "key": base64url}]"""
+    return [
+        {
+            "kid": signer.kid,
+            "alg": "Ed25519",
+            "key": _b64encode(signer.public_key.public_bytes(
+                serialization.Encoding.Raw, serialization.PublicFormat.Raw
+            )),
+        }
+        for signer in signers
+    ]
+
+
+# ---------------- VERIFICATION (door side) ----------------
+
+class KeyVerifier:
+    """
+    Verifies presented keys against cached public keys.
+
+    Public keys are parsed once into Ed25519PublicKey objects. Signatures
+    that already verified are remembered (bounded LRU), so a resident
+    presenting the same key again only costs a dict lookup plus the
+    expiry / door checks.
+    """
+
+    def __init__(self, public_keys, cache_size=50000, clock_skew=CLOCK_SKEW):
+        self.clock_skew = clock_skew
+        self.cache_size = cache_size
+        self._keys = {}
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+        self.update_public_keys(public_keys)
+
+    @classmethod
+    def from_signers(cls, signers, **kwargs):
+        return cls({signer.kid: signer.public_key for signer in signers}, **kwargs)
+
+    @classmethod
+    def from_exported(cls, exported, **kwargs):
+        """Build from the JSON list returned by GET /api/keys/public-keys"""
+        return cls({
+            item["kid"]: Ed25519PublicKey.from_public_bytes(_b64decode(item["key"]))
+            for item in exported
+        }, **kwargs)
+
+    def update_public_keys(self, public_keys):
+        with self._lock:
+            self._keys = dict(public_keys)
+            self._verified.clear()
+
+    def _check_signature(self, token):
+        with self._lock:
+            payload = self._verified.get(token)
+            if payload is not None:
+                self._verified.move_to_end(token)
+                return payload
+
+        try:
+            prefix, body, signature = token.split(".")
+        except ValueError:
+            raise InvalidKey("malformed key")
+        if prefix != KEY_PREFIX:
+            raise InvalidKey("unsupported key version")
+
+        try:
+            payload = json.loads(_b64decode(body))
+            public_key = self._keys.get(payload["k"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidKey("malformed key")
+        if public_key is None:
+            raise InvalidKey("unknown signing key")
+
+        try:
+            public_key.verify(_b64decode(signature), f"{prefix}.{body}".encode())
+        except (InvalidSignature, ValueError):
+            raise InvalidKey("bad signature")
+
+        with self._lock:
+            self._verified[token] = payload
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return payload
+
+    def verify(self, token, door_group=None, now=None):
+        """Return a VerifiedKey or raise InvalidKey"""
+        payload = self._check_signature(token)
+        now = now if now is not None else time.time()
+
+        if payload["e"] + self.clock_skew < now:
+            raise InvalidKey("key expired")
+        if payload["i"] - self.clock_skew > now:
+            raise InvalidKey("key not yet valid")
+        if door_group is not None and payload["g"] != door_group:
+            raise InvalidKey("key not valid for this door")
+
+        return VerifiedKey(payload["j"], payload["u"], payload.get("r"), payload["g"], payload["i"], payload["e"], payload["k"])
+
+
+# ---------------- APP WIRING ----------------
+
+_settings = {"directory": None, "ttl": DEFAULT_TTL, "cache_size": 50000, "clock_skew": CLOCK_SKEW}
+_signers = None  # newest first; _signers[0] issues new keys
+_verifier = None
+_load_lock = threading.Lock()
+
+
+def init_virtual_keys(app):
+    """Remember where the signing keys live; they are loaded on first use"""
+    global _signers, _verifier
+    _settings.update(
+        directory=app.config.get("VIRTUAL_KEY_DIR") or os.path.join(app.instance_path, "keys"),
+        ttl=app.config.get("VIRTUAL_KEY_TTL", DEFAULT_TTL),
+        cache_size=app.config.get("VIRTUAL_KEY_CACHE_SIZE", 50000),
+        clock_skew=app.config.get("VIRTUAL_KEY_CLOCK_SKEW", CLOCK_SKEW),
+    )
+    with _load_lock:
+        _signers = None
+        _verifier = None
+
+
+def _load():
+    global _signers, _verifier
+    with _load_lock:
+        if _signers is None:
+            signers = load_or_create_signing_keys(_settings["directory"])
+            for signer in signers:
+                signer.ttl = _settings["ttl"]
+            _verifier = KeyVerifier.from_signers(
+                signers, cache_size=_settings["cache_size"], clock_skew=_settings["clock_skew"]
+            )
+            _signers = signers
+
+
+def get_signers():
+    """Signing keys, newest (the one that issues) first"""
+    if _signers is None:
+        _load()
+    return _signers
+
+
+def get_verifier():
+    if _verifier is None:
+        _load()
+    return _verifier
@@ -0,0 +1,34 @@
+# tests/conftest.py
+# Shared fixtures: an app on a throwaway SQLite database
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from config import Config
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build a bootstrapped app; keyword arguments override config settings"""
+    def make(**settings):
+        class TestConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+            VIRTUAL_KEY_DIR = str(tmp_path / "keys")
+            BCRYPT_ROUNDS = 4
+            AUDIT_ENABLED = False
+            METRICS_ENABLED = False
+        for name, value in settings.items():
+            setattr(TestConfig, name, value)
+
+        from app import create_app
+        from services.bootstrap import bootstrap
+        app = create_app(TestConfig, bootstrap=False)
+        bootstrap(app, verbose=False)
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
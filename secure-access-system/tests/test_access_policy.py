@@ -0,0 +1,47 @@
+# tests/test_access_policy.py
+# Door rules compiled into minute-of-week tables
+from datetime import datetime
+from models import db, AccessPolicy
+from services.access_policy import compile_door_rules, minute_of_week, policy, MINUTES_PER_DAY
+
+MONDAY = datetime(2026, 10, 12)  # a Monday
+GROUPS = ["main-entrance", "parking"]
+
+
+def at(day, hour, minute=0):
+    """Minute of the week for weekday `day` (Monday = 0) at hour:minute"""
+    return minute_of_week(MONDAY.replace(day=MONDAY.day + day, hour=hour, minute=minute))
+
+
+def test_window_covers_start_but_not_end():
+    index = compile_door_rules([("resident", "parking", "01", 6 * 60, 23 * 60)], GROUPS)
+    table = index[("resident", "parking")]
+    assert not table[at(0, 5, 59)] and table[at(0, 6)] and table[at(1, 22, 59)]
+    assert not table[at(1, 23)]
+    assert not table[at(2, 12)]  # Wednesday isn't in the rule
+
+
+def test_window_past_midnight_wraps_into_the_next_day():
+    index = compile_door_rules([("concierge", "main-entrance", "6", 22 * 60, 2 * 60)], GROUPS)
+    table = index[("concierge", "main-entrance")]
+    assert table[at(6, 23)]
+    assert table[at(0, 1, 59)]  # Sunday night runs into Monday
+    assert not table[at(0, 2)] and not table[at(6, 21, 59)]
+
+
+def test_wildcard_expands_to_every_group():
+    index = compile_door_rules([("management", "*", "0123456", 0, MINUTES_PER_DAY)], GROUPS)
+    assert set(index) == {("management", group) for group in GROUPS}
+    assert all(index[("management", group)].count(1) == 7 * MINUTES_PER_DAY for group in GROUPS)
+
+
+def test_default_rules_and_hot_reload(app):
+    with app.app_context():
+        assert not policy.can_role("resident", "amenities", MONDAY.replace(hour=5, minute=59))
+        assert policy.can_role("resident", "amenities", MONDAY.replace(hour=6))
+        assert not policy.can_role("resident", "amenities", MONDAY.replace(hour=23))
+
+        db.session.add(AccessPolicy(role="resident", door_group="amenities", days="0",
+                                    start_minute=23 * 60, end_minute=MINUTES_PER_DAY))
+        db.session.commit()
+        assert policy.can_role("resident", "amenities", MONDAY.replace(hour=23))
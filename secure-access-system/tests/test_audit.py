@@ -0,0 +1,69 @@
+# tests/test_audit.py
+# Batched audit writer and its overflow policies
+import threading
+import pytest
+from models import db, AccessEvent
+from services.audit import AuditLog
+
+
+@pytest.fixture
+def audit_log(app):
+    log = AuditLog()
+    with app.app_context():
+        yield log, db.engine
+        log.shutdown()
+
+
+def hold_writer(log):
+    """Batch hook that parks the writer in its first batch until released"""
+    entered, gate = threading.Event(), threading.Event()
+
+    def hook(conn, rows):
+        entered.set()
+        gate.wait(5)
+
+    log.add_batch_hook(hook)
+    return entered, gate
+
+
+def written_details():
+    return [e.detail for e in AccessEvent.query.order_by(AccessEvent.id)]
+
+
+def test_events_are_written_in_batches(audit_log):
+    log, engine = audit_log
+    log.configure(engine, batch_size=3, flush_interval=0.01)
+    batches = []
+    log.add_batch_hook(lambda conn, rows: batches.append(len(rows)))
+    entered, gate = hold_writer(log)
+
+    log.record("login_failure", detail="e0")  # the writer takes this one and waits
+    assert entered.wait(5)
+    for i in range(1, 8):
+        log.record("login_failure", detail=f"e{i}")
+    gate.set()
+    log.flush()
+
+    assert written_details() == [f"e{i}" for i in range(8)]
+    assert batches == [1, 3, 3, 1]
+    assert log.written == 8 and log.dropped == 0
+
+
+@pytest.mark.parametrize("overflow, kept", [
+    ("drop_oldest", ["e0", "e2", "e3"]),
+    ("drop_newest", ["e0", "e1", "e2"]),
+])
+def test_full_queue_drops_by_policy(audit_log, overflow, kept):
+    log, engine = audit_log
+    log.configure(engine, queue_size=2, flush_interval=0.01, overflow=overflow)
+    entered, gate = hold_writer(log)
+
+    log.record("login_failure", detail="e0")
+    assert entered.wait(5)
+    for i in range(1, 4):
+        log.record("login_failure", detail=f"e{i}")
+    gate.set()
+    log.flush()
+
+    assert written_details() == kept
+    assert log.dropped == 1
@@ -0,0 +1,54 @@
+# tests/test_bulk_admin.py
+# Bulk deactivate: one UPDATE over the targets, never the caller
+import pytest
+from config import Config
+from models import db, User
+
+
+@pytest.fixture
+def staff(app):
+    """Signed-in demo manager plus everyone else's id"""
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {"first_name": "Res", "last_name": str(n), "username": f"res{n}", "email": f"res{n}@bulk.local",
+             "role": "resident", "password_hash": "x", "is_active": True, "is_locked": False}
+            for n in range(3)
+        ])
+        db.session.commit()
+        me = User.query.filter_by(email=Config.DEMO_USER_EMAIL).first()
+        others = [user.id for user in User.query.filter(User.id != me.id)]
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = me.id
+        session["user_role"] = me.role
+    return client, me.id, others
+
+
+def deactivate(client, body):
+    response = client.post("/users/bulk/deactivate", json=body)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def active_ids(app):
+    with app.app_context():
+        return {user.id for user in User.query.filter_by(is_active=True)}
+
+
+def test_deactivate_by_ids_skips_the_caller(app, staff):
+    client, me, others = staff
+    result = deactivate(client, {"ids": [me] + others})
+    assert result["requested"] == len(others) + 1
+    assert sorted(result["user_ids"]) == sorted(others)
+    assert active_ids(app) == {me}
+    # Still signed in, and repeating the request changes nothing
+    assert deactivate(client, {"ids": [me] + others})["updated"] == 0
+
+
+def test_deactivate_by_filter_skips_the_caller(app, staff):
+    client, me, others = staff
+    result = deactivate(client, {"filters": {"role": "management"}})
+    with app.app_context():
+        managers = {user.id for user in User.query.filter_by(role="management")}
+    assert result["updated"] and set(result["user_ids"]) == managers - {me}
+    assert active_ids(app) == set(others) - managers | {me}
@@ -0,0 +1,41 @@
+# tests/test_bulk_import.py
+# Bulk user import: row limit and progress reporting
+import pytest
+from models import User
+from services.bulk_import import import_users, ImportTooLarge
+
+
+def rows(count):
+    return [{"first_name": "Bulk", "last_name": f"User{i}", "email": f"bulk{i}@building.local", "role": "resident"}
+            for i in range(count)]
+
+
+def test_too_many_rows_are_rejected_before_writing(app):
+    with app.app_context():
+        before = User.query.count()
+        with pytest.raises(ImportTooLarge):
+            import_users(iter(rows(6)), "management", batch_size=2, max_rows=5)
+        assert User.query.count() == before
+
+
+def test_progress_after_each_batch(app):
+    calls = []
+    with app.app_context():
+        report = import_users(iter(rows(5)), "management", batch_size=2, max_rows=5,
+                              progress=lambda done, created: calls.append((done, created)))
+    assert report["created"] == 5 and report["failed"] == 0
+    assert calls == [(2, 2), (4, 4), (5, 5)]
+
+
+def test_api_answers_413_over_the_limit(app):
+    from flask_jwt_extended import create_access_token
+    app.config["BULK_IMPORT_MAX_ROWS"] = 2
+    with app.app_context():
+        manager = User.query.filter_by(role="management").first()
+        token = create_access_token(identity=str(manager.id), additional_claims={"role": "management"})
+    body = "first_name,last_name,email,role\n" + "".join(
+        f"{r['first_name']},{r['last_name']},{r['email']},{r['role']}\n" for r in rows(3))
+    response = app.test_client().post("/api/users/import", data=body, content_type="text/csv",
+                                      headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 413
+    assert "scripts/import_users.py" in response.get_json()["error"]
@@ -0,0 +1,34 @@
+# tests/test_change_feed.py
+# Shared dashboard stats for the live stream
+import services.change_feed as change_feed
+from services.change_feed import ChangeFeed, dashboard_event_stream
+
+
+def test_stats_follow_the_clock_bucket(monkeypatch):
+    feed = ChangeFeed()
+    bucket = [100]
+    monkeypatch.setattr(change_feed, "clock_bucket", lambda: bucket[0])
+    computed = []
+
+    def compute():
+        computed.append(1)
+        return {"recent_users": len(computed)}
+
+    assert feed.stats_for(7, compute) == {"recent_users": 1}
+    assert feed.stats_for(7, compute) == {"recent_users": 1}
+    bucket[0] += 1
+    assert feed.stats_for(7, compute) == {"recent_users": 2}
+
+
+def test_stream_sends_clock_driven_changes(app, monkeypatch):
+    bucket = [100]
+    monkeypatch.setattr(change_feed, "clock_bucket", lambda: bucket[0])
+    monkeypatch.setattr(change_feed, "feed", ChangeFeed())
+    recent = [3]
+    stream = dashboard_event_stream(app, lambda: {"recent_users": recent[0]}, lambda: 1,
+                                    poll_seconds=0.01, max_seconds=5)
+    assert '"recent_users": 3' in next(stream)
+    recent[0] = 2  # a signup aged out of the 7-day window; no user was written
+    bucket[0] += 1
+    assert 'event: stats\ndata: {"recent_users": 2}' in next(stream)
+    stream.close()
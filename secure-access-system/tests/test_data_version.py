@@ -0,0 +1,26 @@
+# tests/test_data_version.py
+# What bumps the users data version
+from models import db, User
+from services.data_version import users_version
+
+
+def test_failed_login_bookkeeping_keeps_the_version(app):
+    with app.app_context():
+        user = User.query.filter_by(role="management").first()
+        before = users_version()
+        user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
+        user.reset_token = "abc"
+        db.session.commit()
+        assert users_version() == before
+
+
+def test_displayed_changes_bump_the_version(app):
+    with app.app_context():
+        user = User.query.filter_by(role="management").first()
+        before = users_version()
+        user.is_locked = True
+        db.session.commit()
+        assert users_version() == before + 1
+        user.first_name = "Renamed"
+        db.session.commit()
+        assert users_version() == before + 2
@@ -0,0 +1,47 @@
+# tests/test_detector.py
+# Windowed detection rules and the per-(rule, subject) alert cooldown
+import pytest
+from services import audit as events
+from services.detector import SuspiciousAccessDetector
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    detector = SuspiciousAccessDetector()
+    detector.burst_threshold = 3
+    detector.window_seconds = 60.0
+    detector.cooldown_seconds = 120.0
+    detector.off_hours = (0, 0)
+    emitted = detector.emitted = []
+    monkeypatch.setattr(detector, "_emit", emitted.append)
+    return detector
+
+
+def fail(detector, email, now, ip_address="10.0.0.1"):
+    return detector.observe(events.LOGIN_FAILURE, email=email, ip_address=ip_address, now=now)
+
+
+def test_burst_alerts_once_per_cooldown(detector):
+    raised = [fail(detector, "a@x.local", START + i) for i in range(6)]
+    assert [len(alerts) for alerts in raised] == [0, 0, 1, 0, 0, 0]
+    assert raised[2][0]["rule"] == "burst"
+
+    # A fresh burst after the cooldown is alerted again
+    later = [fail(detector, "a@x.local", START + 130 + i) for i in range(3)]
+    assert [len(alerts) for alerts in later] == [0, 0, 1]
+    assert detector.alerts_raised == 2 and len(detector.emitted) == 2
+
+
+def test_cooldown_is_per_subject(detector):
+    for i in range(3):
+        fail(detector, "a@x.local", START + i, ip_address="10.0.0.1")
+    raised = [fail(detector, "b@x.local", START + 3 + i, ip_address="10.0.0.2") for i in range(3)]
+    assert [len(alerts) for alerts in raised] == [0, 0, 1]
+    assert {alert["email"] for alert in detector.emitted} == {"a@x.local", "b@x.local"}
+
+
+def test_failures_outside_the_window_do_not_burst(detector):
+    raised = [fail(detector, "a@x.local", START + i * 40) for i in range(4)]
+    assert all(alerts == [] for alerts in raised)
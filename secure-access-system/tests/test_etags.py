@@ -0,0 +1,37 @@
+# tests/test_etags.py
+# Conditional dashboard responses keyed on the users data version
+from models import db, User
+
+
+def manager_client(app):
+    with app.app_context():
+        manager_id = User.query.filter_by(role="management").first().id
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = manager_id
+        s["user_role"] = "management"
+    return client
+
+
+def test_matching_etag_gets_304(app):
+    client = manager_client(app)
+    for path in ("/api/dashboard/stats", "/api/dashboard/recent-users"):
+        first = client.get(path)
+        assert first.status_code == 200 and first.headers["ETag"]
+        again = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        assert again.status_code == 304
+        assert again.data == b""
+        assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_user_change_changes_the_etag(app):
+    client = manager_client(app)
+    first = client.get("/api/dashboard/stats")
+    with app.app_context():
+        user = User.query.filter_by(role="management").first()
+        user.is_locked = True
+        db.session.commit()
+    after = client.get("/api/dashboard/stats", headers={"If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert after.get_json()["locked_users"] == first.get_json()["locked_users"] + 1
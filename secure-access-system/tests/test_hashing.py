@@ -0,0 +1,60 @@
+# tests/test_hashing.py
+# Bounded bcrypt pool and its back-pressure
+import threading
+import time
+import pytest
+from services.hashing import HashPool, HashingBusy
+
+
+@pytest.fixture
+def pool():
+    pool = HashPool(workers=1, max_pending=2, timeout=5.0, rounds=4)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def occupy(pool, count, release):
+    """Start `count` jobs that hold their slot until `release` is set"""
+    threads = [threading.Thread(target=pool.run, args=(release.wait, 5)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while pool.pending < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return threads
+
+
+def test_full_queue_fails_fast(pool):
+    release = threading.Event()
+    threads = occupy(pool, 2, release)
+    try:
+        with pytest.raises(HashingBusy):
+            pool.hash_password("Secret123")
+        assert pool.pending == 2
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert pool.pending == 0
+    assert pool.check_password("Secret123", pool.hash_password("Secret123"))
+
+
+def test_slow_result_times_out(pool):
+    pool.timeout = 0.05
+    release = threading.Event()
+    try:
+        with pytest.raises(HashingBusy):
+            pool.run(release.wait, 5)
+    finally:
+        release.set()
+
+
+def test_busy_pool_answers_503(app, monkeypatch):
+    import services.hashing
+    class FullPool:
+        def check_password(self, password, password_hash):
+            raise HashingBusy("Password hashing queue is full")
+    monkeypatch.setattr(services.hashing, "_pool", FullPool())
+    response = app.test_client().post("/api/login", json={"email": "demo@building.local", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
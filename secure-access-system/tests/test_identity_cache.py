@@ -0,0 +1,47 @@
+# tests/test_identity_cache.py
+# Cached caller identities and their expiry
+from sqlalchemy import update
+from models import db, User
+from services.data_version import bump_users_version
+from services.identity_cache import IdentityCache
+
+
+def deactivate_elsewhere(user_id, bump):
+    """What another worker's write looks like from this process"""
+    with db.engine.begin() as conn:
+        conn.execute(update(User.__table__).where(User.id == user_id).values(is_active=False))
+        if bump:
+            bump_users_version(conn)
+
+
+def test_version_change_expires_every_entry(app):
+    cache = IdentityCache(ttl=300, sync_seconds=0)
+    with app.app_context():
+        user_id = User.query.filter_by(role="management").first().id
+        assert cache.get(user_id).is_active
+
+        deactivate_elsewhere(user_id, bump=False)
+        assert cache.get(user_id).is_active  # still the cached snapshot
+
+        deactivate_elsewhere(user_id, bump=True)
+        db.session.expire_all()
+        assert not cache.get(user_id).is_active
+
+
+def test_version_is_checked_at_most_every_sync_seconds(app):
+    cache = IdentityCache(ttl=300, sync_seconds=60)
+    with app.app_context():
+        user_id = User.query.filter_by(role="management").first().id
+        assert cache.get(user_id).is_active
+        deactivate_elsewhere(user_id, bump=True)
+        assert cache.get(user_id).is_active
+
+
+def test_entries_expire_after_the_ttl(app):
+    cache = IdentityCache(ttl=0, sync_seconds=60)
+    with app.app_context():
+        user_id = User.query.filter_by(role="management").first().id
+        assert cache.get(user_id).is_active
+        deactivate_elsewhere(user_id, bump=False)
+        db.session.expire_all()
+        assert not cache.get(user_id).is_active
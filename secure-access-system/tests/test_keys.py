@@ -0,0 +1,63 @@
+# tests/test_keys.py
+# Door-side verification of virtual keys
+import pytest
+from flask_jwt_extended import create_access_token
+from models import User
+
+DOOR = {"X-Door-Token": "door-secret"}
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(DOOR_CONTROLLER_TOKEN="door-secret")
+
+
+@pytest.fixture
+def door_key(app):
+    with app.app_context():
+        user = User.query.filter_by(role="management").first()
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+    response = app.test_client().post("/api/keys/issue", json={"door_group": "main-entrance"},
+                                      headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["key"]
+
+
+@pytest.fixture
+def door_events(monkeypatch):
+    import routes.keys
+    recorded = []
+    monkeypatch.setattr(routes.keys, "audit", lambda event_type, **fields: recorded.append(event_type))
+    return recorded
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Door-Token": "guess"}])
+def test_verify_needs_the_door_token(app, door_key, door_events, headers):
+    response = app.test_client().post("/api/keys/verify", json={"key": door_key, "door_group": "main-entrance"},
+                                      headers=headers)
+    assert response.status_code == 401
+    assert door_events == []
+
+
+def test_verify_disabled_without_a_token(make_app):
+    app = make_app()
+    assert app.test_client().post("/api/keys/verify", json={}, headers=DOOR).status_code == 503
+
+
+@pytest.mark.parametrize("door_group", [None, "", "no-such-door"])
+def test_verify_requires_known_door_group(app, door_key, door_group):
+    body = {"key": door_key}
+    if door_group is not None:
+        body["door_group"] = door_group
+    response = app.test_client().post("/api/keys/verify", json=body, headers=DOOR)
+    assert response.status_code == 400
+    assert response.get_json() == {"valid": False, "reason": "unknown door group"}
+
+
+def test_verify_checks_the_door_group(app, door_key, door_events):
+    client = app.test_client()
+    granted = client.post("/api/keys/verify", json={"key": door_key, "door_group": "main-entrance"}, headers=DOOR)
+    assert granted.status_code == 200
+    denied = client.post("/api/keys/verify", json={"key": door_key, "door_group": "parking"}, headers=DOOR)
+    assert denied.status_code == 403
+    assert door_events == ["door_access_granted", "door_access_denied"]
@@ -0,0 +1,27 @@
+# tests/test_metrics.py
+# Who may scrape /metrics
+import pytest
+
+
+@pytest.mark.parametrize("hops", [0, 1])
+def test_forwarded_loopback_is_not_local(make_app, hops):
+    app = make_app(METRICS_ENABLED=True, TRUSTED_PROXY_HOPS=hops)
+    response = app.test_client().get("/metrics", headers={"X-Forwarded-For": "127.0.0.1"},
+                                     environ_base={"REMOTE_ADDR": "198.51.100.7"})
+    assert response.status_code == 403
+
+
+def test_local_scrape_without_proxy(make_app):
+    app = make_app(METRICS_ENABLED=True)
+    assert app.test_client().get("/metrics").status_code == 200
+
+
+def test_proxy_needs_the_token(make_app):
+    app = make_app(METRICS_ENABLED=True, TRUSTED_PROXY_HOPS=1)
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 403
+
+    app = make_app(METRICS_ENABLED=True, TRUSTED_PROXY_HOPS=1, METRICS_TOKEN="s3cret")
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,39 @@
+# tests/test_migrations.py
+# Migrations apply completely or not at all
+import pytest
+from sqlalchemy import text
+import services.migrations as migrations
+from models import db
+
+
+def tables(conn):
+    return {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+
+
+def test_failing_migration_changes_nothing(app, monkeypatch):
+    def half_done(conn):
+        # The shape of a table rebuild that dies before the rename back
+        conn.execute(text("CREATE TABLE access_policies_rebuild AS SELECT * FROM access_policies"))
+        conn.execute(text("DROP TABLE access_policies"))
+        conn.execute(text("ALTER TABLE users ADD COLUMN nickname VARCHAR(50)"))
+        raise RuntimeError("killed mid-migration")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [(99, "Half done", half_done)])
+    with app.app_context():
+        with db.engine.connect() as conn:
+            before = tables(conn)
+            rules = conn.execute(text("SELECT count(*) FROM access_policies")).scalar()
+
+        with pytest.raises(RuntimeError):
+            migrations.apply_migrations(verbose=False)
+
+        with db.engine.connect() as conn:
+            assert tables(conn) == before
+            assert conn.execute(text("SELECT count(*) FROM access_policies")).scalar() == rules
+            assert "nickname" not in migrations._columns(conn, "users")
+            assert migrations.current_version(conn) == migrations.MIGRATIONS[-2][0]
+
+
+def test_applied_migrations_are_skipped(app):
+    with app.app_context():
+        assert migrations.apply_migrations(verbose=False) == []
@@ -0,0 +1,42 @@
+# tests/test_pagination.py
+# Keyset pagination over the user list
+from werkzeug.datastructures import MultiDict
+from models import db, User
+from services.pagination import fetch_page, parse_list_args
+
+
+def add_users(count, created_at=True):
+    rows = [
+        {"first_name": "Page", "last_name": f"User{i}", "username": f"page.{created_at}.{i}",
+         "email": f"page.{created_at}.{i}@building.local", "role": "resident",
+         "password_hash": "x", "is_active": True, "is_locked": False}
+        for i in range(count)
+    ]
+    db.session.execute(User.__table__.insert(), rows)
+    if not created_at:
+        db.session.execute(User.__table__.update().where(User.username.like("page.False.%")).values(created_at=None))
+    db.session.commit()
+
+
+def all_pages(limit):
+    seen = []
+    args = MultiDict({"limit": str(limit)})
+    while True:
+        users, next_cursor = fetch_page(User.query, parse_list_args(args))
+        seen.extend(user.id for user in users)
+        if not next_cursor:
+            return seen
+        args["cursor"] = next_cursor
+
+
+def test_pages_cover_users_without_created_at(app):
+    with app.app_context():
+        add_users(5)
+        add_users(7, created_at=False)
+        undated = [u.id for u in User.query.filter(User.created_at.is_(None)).order_by(User.id.desc())]
+        assert len(undated) == 7
+
+        seen = all_pages(limit=3)
+        assert len(seen) == len(set(seen)) == User.query.count()
+        # Newest first, then the undated rows by id
+        assert seen[-len(undated):] == undated
@@ -0,0 +1,59 @@
+# tests/test_presence.py
+# Presence ingestion and the sliding window
+import time
+import pytest
+
+GEAR = {"X-Presence-Token": "gear-secret"}
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(PRESENCE_INGEST_TOKEN="gear-secret")
+
+
+@pytest.mark.parametrize("ts", ["nan", "inf", "-inf", float("nan")])
+def test_non_finite_timestamps_are_rejected_per_event(app, ts):
+    events = [{"user_id": 1, "kind": "wifi", "ts": ts}, {"user_id": 1, "kind": "beacon"}]
+    response = app.test_client().post("/api/presence/events", json={"events": events}, headers=GEAR)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["accepted"] == 1 and body["rejected"] == 1
+    assert body["errors"][0]["index"] == 0
+
+
+def sightings(user_id, seen_at, kinds=("wifi", "beacon")):
+    return [{"user_id": user_id, "kind": kind, "seen_at": seen_at, "source": "test"} for kind in kinds]
+
+
+def test_sightings_count_only_inside_the_window(app):
+    from services.presence import presence
+    now = time.time()
+    with app.app_context():
+        presence.record(sightings(1, now - 100))
+        presence.record(sightings(1, now - 10, kinds=("wifi",)))
+        assert presence.is_on_site(1, now)
+        # The beacon sighting leaves the window first
+        assert not presence.is_on_site(1, now + 30)
+        assert list(presence.status(1, now + 30)["signals"]) == ["wifi"]
+
+
+def test_expired_residents_are_evicted(app, monkeypatch):
+    import services.presence
+    from services.presence import presence
+    now = time.time()
+    with app.app_context():
+        presence.record(sightings(1, now - 100) + sightings(2, now - 5))
+        assert len(presence) == 2
+        monkeypatch.setattr(services.presence.time, "time", lambda: now + 60)
+        presence.record(sightings(3, now + 60))
+    assert sorted(presence._seen) == [2, 3]
+
+
+def test_restart_reloads_the_window_from_storage(app):
+    from services.presence import presence
+    now = time.time()
+    with app.app_context():
+        presence.record(sightings(1, now - 10) + sightings(2, now - 10, kinds=("wifi",)))
+        presence.reset()
+        assert presence.is_on_site(1, now)
+        assert not presence.is_on_site(2, now)
@@ -0,0 +1,28 @@
+# tests/test_proxy.py
+# Client IPs from X-Forwarded-For only when a proxy is configured
+from config import Config
+
+
+def failed_logins(app, count, forwarded_for=None):
+    """POST count wrong logins (a new email each); return the status codes"""
+    client = app.test_client()
+    statuses = []
+    for i in range(count):
+        headers = {"X-Forwarded-For": forwarded_for(i)} if forwarded_for else {}
+        response = client.post("/api/login", json={"email": f"nobody{i}@x.y", "password": "wrong"}, headers=headers)
+        statuses.append(response.status_code)
+    return statuses
+
+
+def test_direct_clients_cannot_spoof_their_ip(make_app):
+    assert Config.TRUSTED_PROXY_HOPS == 0
+    app = make_app(LOGIN_IP_BURST=5)
+    statuses = failed_logins(app, 8, forwarded_for=lambda i: f"203.0.113.{i}")
+    assert statuses[:5] == [401] * 5
+    assert statuses[5:] == [429] * 3
+
+
+def test_proxied_clients_are_throttled_apart(make_app):
+    app = make_app(LOGIN_IP_BURST=5, TRUSTED_PROXY_HOPS=1)
+    statuses = failed_logins(app, 8, forwarded_for=lambda i: f"203.0.113.{i}")
+    assert 429 not in statuses
@@ -0,0 +1,66 @@
+# tests/test_revocation.py
+# API tokens stop working once their user is deactivated or changes password
+import time
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from models import db, User, TokenRevocation
+from services.revocation import revocation_list
+
+
+@pytest.fixture
+def resident(app):
+    with app.app_context():
+        user = User(first_name="Rev", last_name="Oked", username="rev.oked", email="rev@building.local",
+                    role="resident")
+        user.set_password("OldPass123")
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+        return user.id, token
+
+
+def protected_status(app, token):
+    return app.test_client().get("/api/protected", headers={"Authorization": f"Bearer {token}"}).status_code
+
+
+def signed_in(app, user_id, role):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+        s["user_role"] = role
+    return client
+
+
+def test_deactivation_revokes_tokens(app, resident):
+    user_id, token = resident
+    assert protected_status(app, token) == 200
+    with app.app_context():
+        manager_id = User.query.filter_by(role="management").first().id
+    signed_in(app, manager_id, "management").get(f"/users/toggle/{user_id}")
+    assert protected_status(app, token) == 401
+
+
+def test_password_change_revokes_older_tokens(app, resident):
+    user_id, token = resident
+    response = signed_in(app, user_id, "resident").post("/reset-password", data={
+        "current_password": "OldPass123", "new_password": "NewPass123", "confirm_password": "NewPass123"})
+    assert b"Password updated" in response.data
+    assert protected_status(app, token) == 401
+
+    # Tokens issued after the cutoff (which rounds up to the next second) work
+    cutoff = int(time.time()) + 1
+    assert not revocation_list.is_revoked(user_id, cutoff)
+    assert revocation_list.is_revoked(user_id, cutoff - 1)
+
+
+def test_other_workers_pick_up_revocations(app, resident):
+    user_id, token = resident
+    with app.app_context():
+        revocation_list.sync_seconds = 0
+        assert not revocation_list.is_revoked(user_id, int(time.time()) - 5)
+        # Written by another process: only the row, nothing in this list
+        db.session.add(TokenRevocation(user_id=user_id, revoked_before=int(time.time()) + 1, reason="elsewhere",
+                                       expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+        assert revocation_list.is_revoked(user_id, int(time.time()) - 5)
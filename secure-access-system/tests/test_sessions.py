@@ -0,0 +1,60 @@
+# tests/test_sessions.py
+# Server-side sessions: new id on sign-in, ended from the server
+from config import Config
+from services.sessions import end_user_sessions, session_store
+
+
+def sign_in(app, client=None, password=Config.DEMO_USER_PASSWORD):
+    client = client or app.test_client()
+    response = client.post("/login", data={"email": Config.DEMO_USER_EMAIL, "password": password})
+    assert response.status_code == 302, response.get_data(as_text=True)
+    return client
+
+
+def sid(client):
+    return client.get_cookie("session").value
+
+
+def signed_in(client):
+    return client.get("/dashboard").status_code == 200
+
+
+def test_sign_in_moves_the_session_to_a_new_id(app):
+    client = sign_in(app)
+    first = sid(client)
+    assert len(first) == 43
+
+    sign_in(app, client)
+    assert sid(client) != first
+    assert session_store.load(first) is None
+    assert signed_in(client)
+
+
+def test_password_change_ends_the_other_sessions(app):
+    here, elsewhere = sign_in(app), sign_in(app)
+    assert signed_in(here) and signed_in(elsewhere)
+
+    response = here.post("/reset-password", data={
+        "current_password": Config.DEMO_USER_PASSWORD,
+        "new_password": "NewPass456", "confirm_password": "NewPass456",
+    })
+    assert b"Password updated" in response.data
+    assert signed_in(here)
+    assert not signed_in(elsewhere)
+
+
+def test_end_user_sessions_signs_out_everywhere(app):
+    clients = [sign_in(app), sign_in(app)]
+    with app.test_request_context():
+        from models import User
+        user_id = User.query.filter_by(email=Config.DEMO_USER_EMAIL).first().id
+        assert end_user_sessions(user_id) == 2
+    assert not any(signed_in(client) for client in clients)
+
+
+def test_cookie_backend_has_nothing_to_end(make_app):
+    app = make_app(SESSION_BACKEND="cookie")
+    client = sign_in(app)
+    with app.test_request_context():
+        assert end_user_sessions(1) == 0
+    assert signed_in(client)
@@ -0,0 +1,46 @@
+# tests/test_stats.py
+# Maintained dashboard counters stay equal to the real counts
+from models import db, User
+from services.stats import compute_user_stats, read_counters, COUNTER_KEYS
+
+
+def counted():
+    stats = compute_user_stats()
+    return {key: stats[key] for key in COUNTER_KEYS}
+
+
+def resident(name):
+    return User(first_name="Stat", last_name=name, username=f"stat.{name}", email=f"{name}@stats.local",
+                role="resident", password_hash="x")
+
+
+def test_counters_follow_ordinary_changes(app):
+    with app.app_context():
+        db.session.add_all([resident("a"), resident("b")])
+        db.session.commit()
+        user = User.query.filter_by(username="stat.a").first()
+        user.is_locked = True
+        user.role = "concierge"
+        db.session.commit()
+        db.session.delete(User.query.filter_by(username="stat.b").first())
+        db.session.commit()
+        assert read_counters() == counted()
+
+
+def test_unloaded_old_values_force_a_rebuild(app):
+    with app.app_context():
+        db.session.add(resident("c"))
+        db.session.commit()
+        read_counters()
+        user = User.query.filter_by(username="stat.c").first()
+        # The old role is unknown when is_locked changes
+        db.session.expire(user, ["role"])
+        user.is_locked = True
+        db.session.commit()
+        assert read_counters() == counted()
+
+        user = User.query.filter_by(username="stat.c").first()
+        db.session.expire(user)
+        db.session.delete(user)
+        db.session.commit()
+        assert read_counters() == counted()
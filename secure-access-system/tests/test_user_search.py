@@ -0,0 +1,59 @@
+# tests/test_user_search.py
+# Prefix search over the FTS index, ranked and paged
+import pytest
+from werkzeug.datastructures import MultiDict
+from models import db, User
+import services.user_search as user_search
+from services.pagination import fetch_page, parse_list_args
+
+PEOPLE = [
+    ("John", "Smith"), ("Joanna", "Smithers"), ("Jo", "Brown"), ("Anna", "Smith"),
+    ("Johan", "Smithson"), ("Mark", "Jones"), ("Jonah", "Smit"),
+]
+
+
+@pytest.fixture
+def people(app):
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {"first_name": first, "last_name": last, "username": f"{first}.{last}".lower(),
+             "email": f"{first}.{last}@search.local".lower(), "role": "resident", "password_hash": "x",
+             "is_active": True, "is_locked": False}
+            for first, last in PEOPLE
+        ])
+        db.session.commit()
+    return app
+
+
+def search(text, limit):
+    """Every page of a search; returns the list of pages (user names)"""
+    pages = []
+    args = MultiDict({"q": text, "limit": str(limit)})
+    while True:
+        users, next_cursor = fetch_page(User.query, parse_list_args(args))
+        pages.append([f"{u.first_name} {u.last_name}" for u in users])
+        if not next_cursor:
+            return pages
+        args["cursor"] = next_cursor
+
+
+def test_every_word_matches_as_a_prefix(people):
+    with people.app_context():
+        found = sum(search("jo smi", limit=50), [])
+    assert sorted(found) == ["Joanna Smithers", "Johan Smithson", "John Smith", "Jonah Smit"]
+
+
+@pytest.mark.parametrize("rank_limit", [500, 2])
+def test_pages_neither_skip_nor_repeat(people, monkeypatch, rank_limit):
+    # rank_limit=2: too many matches to rank, so newest first instead
+    monkeypatch.setattr(user_search, "RANK_LIMIT", rank_limit)
+    with people.app_context():
+        pages = search("smi", limit=2)
+    found = sum(pages, [])
+    assert all(len(page) <= 2 for page in pages) and len(pages) == 3
+    assert sorted(found) == sorted(f"{f} {l}" for f, l in PEOPLE if l.lower().startswith("smi"))
+
+
+def test_exact_name_ranks_first(people):
+    with people.app_context():
+        assert search("john smith", limit=1)[0] == ["John Smith"]
@@ -0,0 +1,132 @@
+# utils.py
+# Shared helpers for generating user credentials
+
+import secrets
+import string
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from models import db, User
+
+# Every "<base><digits>" username sorts between base and base + ":"
+# (":" is the character right after "9"), so one range scan on the
+# unique username index finds all of them.
+_SUFFIX_RANGE_END = ":"
+
+
+def generate_password(length=10):
+    chars = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(chars) for _ in range(length))
+
+
+def username_base(first_name, last_name):
+    return f"{first_name.lower()}.{last_name.lower()}"
+
+
+def candidate_bases(name):
+    """Every base that `name` could be a "<base><digits>" variant of"""
+    end = len(name)
+    yield name
+    while end > 0 and name[end - 1].isdigit():
+        end -= 1
+        yield name[:end]
+
+
+def next_username(base, taken):
+    """Pick base, or base + (highest numeric suffix in use + 1)"""
+    if base not in taken:
+        return base
+
+    highest = 0
+    for name in taken:
+        suffix = name[len(base):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return f"{base}{highest + 1}"
+
+
+def taken_usernames(base):
+    """Existing usernames that are base or base followed by digits (one query)"""
+    rows = (
+        db.session.query(User.username)
+        .filter(User.username >= base, User.username < base + _SUFFIX_RANGE_END)
+        .all()
+    )
+    return {name for (name,) in rows if base in candidate_bases(name)}
+
+
+def generate_username(first_name, last_name, reserved=None):
+    """
+    Generate username as first.last, first.last1, first.last2, ...
+
+    `reserved` is an optional set of names already handed out but not yet
+    committed (e.g. earlier rows of a bulk import); it is updated in place.
+    """
+    base = username_base(first_name, last_name)
+    taken = taken_usernames(base)
+    if reserved:
+        taken |= {name for name in reserved if base in candidate_bases(name)}
+
+    username = next_username(base, taken)
+    if reserved is not None:
+        reserved.add(username)
+    return username
+
+
+def generate_usernames(names, reserved=None):
+    """
+    Allocate usernames for many (first_name, last_name) pairs at once.
+
+    All bases are looked up in a single query; returns the usernames in
+    the same order as `names`.
+    """
+    bases = [username_base(first, last) for first, last in names]
+    unique_bases = sorted(set(bases))
+    taken = {base: set() for base in unique_bases}
+
+    if unique_bases:
+        rows = (
+            db.session.query(User.username)
+            .filter(or_(*[
+                (User.username >= base) & (User.username < base + _SUFFIX_RANGE_END)
+                for base in unique_bases
+            ]))
+            .all()
+        )
+        for (name,) in rows:
+            for base in candidate_bases(name):
+                if base in taken:
+                    taken[base].add(name)
+
+    reserved = reserved if reserved is not None else set()
+    for name in reserved:
+        for base in candidate_bases(name):
+            if base in taken:
+                taken[base].add(name)
+
+    usernames = []
+    for base in bases:
+        username = next_username(base, taken[base])
+        taken[base].add(username)
+        reserved.add(username)
+        usernames.append(username)
+    return usernames
+
+
+def save_new_user(user, max_attempts=5):
+    """
+    Add and commit a new user.
+
+    If another request committed the same username in the meantime the
+    unique constraint rejects ours; pick the next free name and retry.
+    """
+    for attempt in range(max_attempts):
+        db.session.add(user)
+        try:
+            db.session.commit()
+            return user
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == max_attempts - 1 or not User.query.filter_by(username=user.username).first():
+                # Out of retries, or the conflict wasn't the username (e.g. email)
+                raise
+            user.username = generate_username(user.first_name, user.last_name)
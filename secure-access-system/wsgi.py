@@ -0,0 +1,8 @@
+# wsgi.py
+# WSGI entry point for production servers (serve.py, or any other server)
+#
+# Workers never bootstrap the database themselves: run
+# `python scripts/bootstrap.py` once per deploy (serve.py does it for you).
+from app import create_app
+
+app = create_app(bootstrap=False)